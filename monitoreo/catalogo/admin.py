@@ -1,7 +1,7 @@
-import csv
-from django.http import HttpResponse
 from django.contrib import admin
 
+from reportes.exportacion import accion_exportar_csv
+
 # --- ¡Importaciones Corregidas! ---
 from .forms import ProductoForm
 from .models import (
@@ -10,22 +10,7 @@ from .models import (
 )
 
 # --- Acción personalizada: exportar productos ---
-def exportar_productos_csv(modeladmin, request, queryset):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="productos.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Nombre', 'Marca', 'Precio', 'Stock', 'Caducidad', 'Categoría'])
-    for producto in queryset:
-        writer.writerow([
-            producto.nombre,
-            producto.marca,
-            producto.precio,
-            producto.stock_actual,
-            producto.caducidad,
-            producto.Categorias.nombre if producto.Categorias else 'Sin categoría'
-        ])
-    return response
-exportar_productos_csv.short_description = "📤 Exportar productos seleccionados a CSV"
+exportar_productos_csv = accion_exportar_csv('productos', "📤 Exportar productos seleccionados a CSV")
 
 # --- Admin para Categoría ---
 @admin.register(Categoria)
@@ -47,6 +32,10 @@ class ProductoAdmin(admin.ModelAdmin):
     actions = [exportar_productos_csv]
     def has_module_permission(self, request): return request.user.is_staff
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        form.procesar_imagen()
+
 # --- Admin para Regla de Alerta ---
 @admin.register(ReglaAlertaVencimiento)
 class ReglaAlertaVencimientoAdmin(admin.ModelAdmin):
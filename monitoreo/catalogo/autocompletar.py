@@ -0,0 +1,171 @@
+"""
+Autocompletado de la tienda con un trie de prefijos en memoria.
+
+El trie se construye de forma perezosa la primera vez que se consulta y se
+reconstruye solo cuando cambian los nombres, las marcas o el conjunto de
+productos (version_nombres, ver version.py); las ventas no lo invalidan.
+Cada nodo guarda ya calculadas las mejores sugerencias de su subárbol, por
+lo que responder es recorrer tantos nodos como letras tenga el prefijo. El
+stock cambia a cada venta, así que no se guarda en el trie: los productos
+sugeridos se filtran por stock con una consulta por pk.
+"""
+import threading
+
+from django.db.models import F
+
+from .busqueda import normalizar
+from .models import Producto
+from .version import version_nombres
+
+MAX_SUGERENCIAS = 8
+
+
+class _Nodo:
+    __slots__ = ('hijos', 'mejores')
+
+    def __init__(self):
+        self.hijos = {}
+        self.mejores = []
+
+
+class TriePrefijos:
+    """
+    Trie sobre textos normalizados (sin tildes, minúsculas). Cada texto se
+    inserta completo y por el comienzo de cada una de sus palabras, de modo
+    que "choco" sugiere "Torta de Chocolate Belga". Las sugerencias se
+    ordenan por `puntaje` (mayor primero) y luego alfabéticamente.
+    """
+
+    def __init__(self, max_sugerencias=MAX_SUGERENCIAS):
+        self.raiz = _Nodo()
+        self.max_sugerencias = max_sugerencias
+
+    def insertar(self, texto, puntaje=0, dato=None):
+        entrada = (-puntaje, texto, dato)
+        normalizado = normalizar(texto)
+        # El texto completo ("pan de pascua") y cada palabra sola ("de",
+        # "pascua"), no cada sufijo de frase: el trie crece con el largo
+        # de las palabras y no con el cuadrado del largo del nombre.
+        claves = {' '.join(normalizado.split())} | set(normalizado.split())
+        for clave in claves:
+            self._insertar_clave(clave, entrada)
+
+    def _insertar_clave(self, clave, entrada):
+        # La entrada queda solo en el nodo final; compactar() la sube
+        nodo = self.raiz
+        for letra in clave:
+            nodo = nodo.hijos.setdefault(letra, _Nodo())
+        nodo.mejores.append(entrada)
+
+    def compactar(self):
+        """
+        Calcula, de las hojas hacia la raíz, las mejores sugerencias de cada
+        nodo a partir de las propias y las de sus hijos. Se llama una vez al
+        terminar de construir; `sugerir` no ordena nada.
+        """
+        orden, pendientes = [], [self.raiz]
+        while pendientes:
+            nodo = pendientes.pop()
+            orden.append(nodo)
+            pendientes.extend(nodo.hijos.values())
+        for nodo in reversed(orden):
+            candidatos = nodo.mejores + [e for hijo in nodo.hijos.values() for e in hijo.mejores]
+            # Un texto llega por varias claves ("torta" y "torta de ..."):
+            # la misma tupla se cuenta una vez
+            unicos = {id(e): e for e in candidatos}.values()
+            nodo.mejores = sorted(unicos, key=lambda e: (e[0], e[1]))[:self.max_sugerencias]
+
+    def _nodo(self, prefijo):
+        nodo = self.raiz
+        for letra in prefijo:
+            nodo = nodo.hijos.get(letra)
+            if nodo is None:
+                return None
+        return nodo
+
+    def sugerir(self, prefijo, limite=None):
+        limite = limite or self.max_sugerencias
+        prefijo = ' '.join(normalizar(prefijo).split())
+        nodo = self._nodo(prefijo)
+        if nodo is not None:
+            return [(texto, dato) for _, texto, dato in nodo.mejores[:limite]]
+        if ' ' not in prefijo:
+            return []
+        # Varias palabras desde el medio del nombre ("de pasc"): se parte de
+        # la primera y se filtra por el prefijo completo
+        nodo = self._nodo(prefijo.split(' ', 1)[0])
+        if nodo is None:
+            return []
+        return [
+            (texto, dato) for _, texto, dato in nodo.mejores
+            if f' {prefijo}' in ' ' + ' '.join(normalizar(texto).split())
+        ][:limite]
+
+
+# --------------------
+# Instancia compartida del proceso
+# --------------------
+
+_trie = None
+_version_trie = None
+_candado = threading.Lock()
+
+
+def construir_trie():
+    """
+    Construye el trie con los nombres y marcas de todos los productos. Los
+    nombres pesan más que las marcas.
+    """
+    trie = TriePrefijos()
+    marcas = set()
+    productos = Producto.objects.only('id', 'nombre', 'marca').order_by().iterator(chunk_size=2000)
+    for producto in productos:
+        trie.insertar(producto.nombre, puntaje=2, dato={'tipo': 'producto', 'id': producto.pk})
+        if producto.marca:
+            marcas.add(producto.marca)
+    for marca in marcas:
+        trie.insertar(marca, puntaje=1, dato={'tipo': 'marca'})
+    trie.compactar()
+    return trie
+
+
+def obtener_trie():
+    """
+    Devuelve el trie vigente, reconstruyéndolo si cambió version_nombres().
+    Solo un hilo reconstruye; el resto sigue usando el anterior.
+    """
+    global _trie, _version_trie
+    version = version_nombres()
+    if _trie is not None and _version_trie == version:
+        return _trie
+
+    if _trie is None:
+        # Primera vez: todos esperan a que exista un trie
+        with _candado:
+            if _trie is None:
+                _trie, _version_trie = construir_trie(), version
+        return _trie
+
+    if _candado.acquire(blocking=False):
+        try:
+            _trie, _version_trie = construir_trie(), version
+        finally:
+            _candado.release()
+    return _trie
+
+
+def sugerencias(prefijo, limite=MAX_SUGERENCIAS):
+    """
+    Sugerencias para `prefijo`, sin los productos agotados ni los que están
+    completamente reservados en carritos, igual que ver_productos (una
+    consulta por pk sobre los candidatos del trie).
+    """
+    candidatos = obtener_trie().sugerir(prefijo)
+    ids = [dato['id'] for _, dato in candidatos if dato and dato.get('tipo') == 'producto']
+    disponibles = Producto.objects.filter(pk__in=ids, stock_actual__gt=F('stock_reservado'))
+    con_stock = set(disponibles.values_list('pk', flat=True)) if ids else set()
+    return [
+        {'texto': texto, **(dato or {})}
+        for texto, dato in candidatos
+        if not dato or dato.get('tipo') != 'producto' or dato['id'] in con_stock
+    ][:limite]
@@ -0,0 +1,203 @@
+"""
+Búsqueda de productos basada en un índice invertido (tabla TerminosBusqueda).
+
+En vez de filtrar con `icontains` sobre nombre y descripción (lo que obliga a
+recorrer toda la tabla Productos), cada producto se descompone en raíces
+normalizadas que se guardan en una tabla indexada. Buscar es entonces un
+`IN` / prefijo (LIKE 'raiz%') sobre ese índice por cada palabra, y el
+resultado se ordena por relevancia sumando los pesos de los términos que
+coinciden.
+"""
+import re
+import unicodedata
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Q, Subquery, Sum, Value
+
+from .models import Producto, TerminoBusqueda
+
+# Campos indexados y el peso de cada uno en la relevancia
+PESOS_CAMPOS = {
+    'nombre': 3,
+    'marca': 2,
+    'tipo': 2,
+    'descripcion': 1,
+}
+
+# Palabras vacías del español que no aportan a la búsqueda
+STOPWORDS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'para', 'por', 'sin', 'su', 'un', 'una', 'unos', 'unas', 'y', 'o',
+}
+
+# Sufijos que se recortan (del más largo al más corto) para obtener la raíz
+SUFIJOS = (
+    'citos', 'citas', 'cito', 'cita',
+    'itos', 'itas', 'ito', 'ita',
+    'es', 's',
+)
+
+LARGO_MINIMO_RAIZ = 3
+LARGO_MAXIMO_TERMINO = 60
+
+_RE_PALABRA = re.compile(r'[a-z0-9]+')
+
+
+def normalizar(texto):
+    """
+    Pasa a minúsculas y elimina tildes/diéresis ("Té Chai" -> "te chai").
+    La ñ se conserva como 'n'.
+    """
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def raiz(palabra):
+    """
+    Stemmer liviano para español: quita plurales y diminutivos y la vocal
+    final, de modo que "tortas", "torta" y "tortita" comparten raíz.
+    """
+    for sufijo in SUFIJOS:
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= LARGO_MINIMO_RAIZ:
+            palabra = palabra[:-len(sufijo)]
+            break
+    if len(palabra) > LARGO_MINIMO_RAIZ and palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+    return palabra[:LARGO_MAXIMO_TERMINO]
+
+
+def tokenizar(texto):
+    """
+    Devuelve la lista de raíces de un texto, sin palabras vacías y en el
+    orden en que aparecen (puede contener repetidos).
+    """
+    return [
+        raiz(palabra)
+        for palabra in _RE_PALABRA.findall(normalizar(texto))
+        if palabra not in STOPWORDS
+    ]
+
+
+def terminos_producto(producto):
+    """
+    Calcula el diccionario {raiz: peso} de un producto. Si una raíz aparece
+    en varios campos se suman los pesos.
+    """
+    terminos = {}
+    for campo, peso in PESOS_CAMPOS.items():
+        for termino in set(tokenizar(getattr(producto, campo, None))):
+            terminos[termino] = terminos.get(termino, 0) + peso
+    return terminos
+
+
+# --------------------
+# Mantenimiento del índice
+# --------------------
+
+def indexar_producto(producto):
+    """
+    Actualiza de forma incremental los términos de un producto: solo se
+    borran, insertan o modifican las filas que realmente cambiaron.
+    Devuelve (agregados, quitados) para que el vocabulario de trigramas
+    pueda actualizarse con la misma diferencia.
+    """
+    nuevos = terminos_producto(producto)
+    actuales = dict(
+        TerminoBusqueda.objects.filter(producto=producto).values_list('termino', 'peso')
+    )
+    if nuevos == actuales:
+        return [], []
+
+    agregados = [t for t in nuevos if t not in actuales]
+    quitados = [t for t in actuales if t not in nuevos]
+    with transaction.atomic():
+        if quitados:
+            TerminoBusqueda.objects.filter(producto=producto, termino__in=quitados).delete()
+
+        TerminoBusqueda.objects.bulk_create([
+            TerminoBusqueda(termino=t, producto=producto, peso=nuevos[t])
+            for t in agregados
+        ])
+
+        for termino, peso in nuevos.items():
+            if termino in actuales and actuales[termino] != peso:
+                TerminoBusqueda.objects.filter(producto=producto, termino=termino).update(peso=peso)
+    return agregados, quitados
+
+
+def reindexar(productos=None, batch_size=1000):
+    """
+    Reconstruye el índice para `productos` (queryset) o para todo el catálogo.
+    Recorre los productos en bloques para no cargar la tabla completa en memoria.
+    Devuelve la cantidad de términos insertados.
+    """
+    if productos is None:
+        productos = Producto.objects.all()
+    productos = productos.only('id', *PESOS_CAMPOS).order_by('pk')
+
+    insertados = 0
+    with transaction.atomic():
+        if productos.query.where:
+            TerminoBusqueda.objects.filter(producto__in=productos.values('pk')).delete()
+        else:
+            TerminoBusqueda.objects.all().delete()
+
+        lote = []
+        for producto in productos.iterator(chunk_size=batch_size):
+            lote.extend(
+                TerminoBusqueda(termino=t, producto_id=producto.pk, peso=p)
+                for t, p in terminos_producto(producto).items()
+            )
+            if len(lote) >= batch_size:
+                TerminoBusqueda.objects.bulk_create(lote, batch_size=batch_size)
+                insertados += len(lote)
+                lote = []
+        if lote:
+            TerminoBusqueda.objects.bulk_create(lote, batch_size=batch_size)
+            insertados += len(lote)
+    return insertados
+
+
+# --------------------
+# Consultas
+# --------------------
+
+def filtro_termino(termino, prefijo=False):
+    """
+    Q sobre TerminoBusqueda.termino para una raíz. Con `prefijo` se usa
+    LIKE 'raiz%' (startswith), que MySQL resuelve con un rango sobre el
+    índice y que respeta la collation de la columna.
+    """
+    if prefijo:
+        return Q(termino__startswith=termino)
+    return Q(termino=termino)
+
+
+def buscar(queryset, consulta):
+    """
+    Filtra `queryset` (de Producto) con el índice invertido y lo anota con
+    `relevancia` (suma de pesos de los términos coincidentes).
+
+    El producto debe contener todas las palabras de la consulta. La última
+    se busca por prefijo para soportar la búsqueda mientras se escribe
+    ("croiss" encuentra "Croissant").
+    """
+    terminos = list(dict.fromkeys(tokenizar(consulta)))
+    if not terminos:
+        return queryset.annotate(relevancia=Value(0, output_field=IntegerField()))
+
+    filtros = [filtro_termino(t) for t in terminos[:-1]] + [filtro_termino(terminos[-1], prefijo=True)]
+    for filtro in filtros:
+        queryset = queryset.filter(pk__in=TerminoBusqueda.objects.filter(filtro).values('producto_id'))
+
+    relevancia = (
+        TerminoBusqueda.objects.filter(reduce(or_, filtros), producto=OuterRef('pk'))
+        .values('producto')
+        .annotate(total=Sum('peso'))
+        .values('total')
+    )
+    return queryset.annotate(relevancia=Subquery(relevancia, output_field=IntegerField()))
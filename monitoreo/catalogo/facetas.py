@@ -0,0 +1,204 @@
+"""
+Navegación por facetas (categoría, marca, tipo y rango de precio) para la tienda.
+
+Todas las facetas salen de UNA consulta agrupada por la combinación
+(categoría, marca, tipo, rango de precio). Como la cantidad de combinaciones
+depende de la variedad del catálogo y no del número de productos, el
+resultado es pequeño y el conteo de cada faceta se arma en Python.
+
+Los conteos siguen la semántica habitual de las tiendas: cada faceta respeta
+los filtros activos de las *otras* facetas (así se puede seguir marcando
+valores de la misma faceta, que se combinan con OR).
+
+El resultado se cachea con la versión del catálogo. Como los conteos solo
+miran productos con stock disponible, las ventas, cancelaciones y reservas
+(que cambian el stock con update()) incrementan la versión únicamente
+cuando algún producto se agota o vuelve a estar disponible
+(invalidar_si_cambia_disponibilidad); el resto del tráfico no la mueve.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Q, Value, When
+
+from .models import Producto
+from .version import incrementar_version_catalogo, version_catalogo
+
+FACETAS = ('categoria', 'marca', 'tipo', 'precio')
+
+# (clave, mínimo incluido, máximo excluido, etiqueta)
+RANGOS_PRECIO = (
+    ('0-1000', 0, 1000, 'Hasta $1.000'),
+    ('1000-3000', 1000, 3000, '$1.000 a $3.000'),
+    ('3000-6000', 3000, 6000, '$3.000 a $6.000'),
+    ('6000-10000', 6000, 10000, '$6.000 a $10.000'),
+    ('10000-', 10000, None, 'Más de $10.000'),
+)
+SIN_PRECIO = 'sin-precio'
+# Valor de la opción "Sin marca" / "Sin tipo" (marca o tipo nulo o vacío)
+NINGUNO = '__ninguna__'
+
+TTL_FACETAS = 60 * 10
+
+
+def _expresion_rango_precio():
+    return Case(
+        *[
+            When(Q(precio__gte=minimo) & (Q(precio__lt=maximo) if maximo else Q()), then=Value(clave))
+            for clave, minimo, maximo, _ in RANGOS_PRECIO
+        ],
+        default=Value(SIN_PRECIO),
+        output_field=CharField(),
+    )
+
+
+def seleccion_desde_request(querydict):
+    """
+    Lee la selección de facetas de request.GET (?categoria=1&categoria=3&marca=X...).
+    """
+    seleccion = {}
+    for faceta in FACETAS:
+        valores = [v for v in querydict.getlist(faceta) if v != '']
+        if valores:
+            seleccion[faceta] = sorted(set(valores))
+    return seleccion
+
+
+def aplicar_filtros(queryset, seleccion):
+    """
+    Restringe `queryset` a los productos que cumplen todas las facetas marcadas.
+    """
+    if seleccion.get('categoria'):
+        ids = [v for v in seleccion['categoria'] if v.isdigit()]
+        queryset = queryset.filter(Categorias_id__in=ids)
+    for faceta in ('marca', 'tipo'):
+        if seleccion.get(faceta):
+            filtro = Q(**{f'{faceta}__in': [v for v in seleccion[faceta] if v != NINGUNO]})
+            if NINGUNO in seleccion[faceta]:
+                filtro |= Q(**{f'{faceta}__isnull': True}) | Q(**{faceta: ''})
+            queryset = queryset.filter(filtro)
+    if seleccion.get('precio'):
+        filtro = Q()
+        for clave, minimo, maximo, _ in RANGOS_PRECIO:
+            if clave in seleccion['precio']:
+                rango = Q(precio__gte=minimo)
+                if maximo:
+                    rango &= Q(precio__lt=maximo)
+                filtro |= rango
+        if SIN_PRECIO in seleccion['precio']:
+            filtro |= Q(precio__isnull=True)
+        queryset = queryset.filter(filtro)
+    return queryset
+
+
+def _combinaciones(queryset):
+    """
+    La única consulta SQL: cuenta productos por combinación de facetas.
+    """
+    return list(
+        queryset.annotate(rango_precio=_expresion_rango_precio())
+        .values('Categorias_id', 'Categorias__nombre', 'marca', 'tipo', 'rango_precio')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+
+
+def _plegar(combinaciones, seleccion):
+    conteos = {faceta: {} for faceta in FACETAS}
+    etiquetas = {faceta: {} for faceta in FACETAS}
+    etiquetas['precio'] = {clave: etiqueta for clave, _, _, etiqueta in RANGOS_PRECIO}
+    etiquetas['precio'][SIN_PRECIO] = 'Sin precio'
+
+    for fila in combinaciones:
+        valores = {
+            'categoria': str(fila['Categorias_id']),
+            'marca': fila['marca'] or NINGUNO,
+            'tipo': fila['tipo'] or NINGUNO,
+            'precio': fila['rango_precio'],
+        }
+        etiquetas['categoria'][valores['categoria']] = fila['Categorias__nombre']
+        etiquetas['marca'][valores['marca']] = fila['marca'] or 'Sin marca'
+        etiquetas['tipo'][valores['tipo']] = fila['tipo'] or 'Sin tipo'
+
+        for faceta in FACETAS:
+            # La fila cuenta para `faceta` si cumple la selección de las demás
+            cumple = all(
+                valores[otra] in seleccion[otra]
+                for otra in FACETAS
+                if otra != faceta and seleccion.get(otra)
+            )
+            if cumple:
+                conteos[faceta][valores[faceta]] = conteos[faceta].get(valores[faceta], 0) + fila['n']
+
+    resultado = {}
+    orden_precio = [clave for clave, _, _, _ in RANGOS_PRECIO] + [SIN_PRECIO]
+    for faceta in FACETAS:
+        marcados = set(seleccion.get(faceta, []))
+        opciones = [
+            {
+                'valor': valor,
+                'etiqueta': etiquetas[faceta].get(valor, valor),
+                'conteo': conteo,
+                'activo': valor in marcados,
+            }
+            for valor, conteo in conteos[faceta].items()
+        ]
+        if faceta == 'precio':
+            opciones.sort(key=lambda o: orden_precio.index(o['valor']))
+        else:
+            opciones.sort(key=lambda o: (-o['conteo'], str(o['etiqueta'])))
+        resultado[faceta] = opciones
+    return resultado
+
+
+def calcular_facetas(queryset, seleccion, clave_filtros=''):
+    """
+    Devuelve {faceta: [opciones]} para `queryset` (ya filtrado por búsqueda
+    y stock, pero SIN los filtros de facetas).
+
+    El resultado se cachea por (versión del catálogo, filtros). `clave_filtros`
+    identifica los filtros que no son facetas (texto buscado, etc.).
+    """
+    firma = json.dumps([clave_filtros, seleccion], sort_keys=True)
+    clave = 'facetas:%s:%s' % (version_catalogo(), hashlib.sha1(firma.encode()).hexdigest())
+
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = _plegar(_combinaciones(queryset), seleccion)
+        cache.set(clave, resultado, TTL_FACETAS)
+    return resultado
+
+
+def invalidar_si_cambia_disponibilidad(cambios, disponibles=None):
+    """
+    Incrementa la versión del catálogo (al confirmar) si algún producto pasó
+    de agotado a disponible o al revés. `cambios` es {pk: cuánto cambió lo
+    disponible}; `disponibles`, {pk: disponible después}, si ya se leyó.
+    """
+    if disponibles is None:
+        disponibles = {
+            pk: (actual or 0) - reservado
+            for pk, actual, reservado in Producto.objects.filter(pk__in=list(cambios))
+            .values_list('pk', 'stock_actual', 'stock_reservado')
+        }
+    if any((disponible > 0) != (disponible - cambios[pk] > 0) for pk, disponible in disponibles.items()):
+        transaction.on_commit(incrementar_version_catalogo)
+
+
+def enlaces_facetas(facetas, querydict):
+    """
+    Agrega a cada opción la URL (querystring) que la activa o desactiva,
+    conservando el resto de los parámetros y volviendo a la primera página.
+    """
+    for faceta, opciones in facetas.items():
+        for opcion in opciones:
+            params = querydict.copy()
+            params.pop('cursor', None)
+            valores = [v for v in params.getlist(faceta) if v != opcion['valor']]
+            if not opcion['activo']:
+                valores.append(opcion['valor'])
+            params.setlist(faceta, valores)
+            opcion['url'] = '?' + params.urlencode()
+    return facetas
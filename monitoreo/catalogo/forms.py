@@ -1,6 +1,7 @@
 from django import forms
 from .models import Producto, Categoria
 from django.core.exceptions import ValidationError
+from .imagenes import procesar_imagen_producto
 
 class ProductoForm(forms.ModelForm):
     class Meta:
@@ -18,6 +19,18 @@ class ProductoForm(forms.ModelForm):
             'elaboracion': forms.DateInput(attrs={'type': 'date'}, format='%Y-%m-%d'),
         }
 
+    def save(self, commit=True):
+        producto = super().save(commit=commit)
+        if commit:
+            self.procesar_imagen()
+        return producto
+
+    def procesar_imagen(self):
+        # Los derivados (card/detalle/retina) se generan solo si cambió la imagen.
+        # Con save(commit=False) hay que llamarlo después de guardar el producto.
+        if 'imagen' in self.changed_data:
+            procesar_imagen_producto(self.instance)
+
     def clean_nombre(self):
         nombre = self.cleaned_data.get('nombre', '').strip()
         if not nombre:
@@ -68,4 +81,15 @@ class CategoriaForm(forms.ModelForm):
         nombre = self.cleaned_data.get('nombre', '').strip()
         if not nombre:
             raise ValidationError('El nombre de la categoría no puede estar vacío.')
-        return nombre
\ No newline at end of file
+        return nombre
+
+
+class ImportarProductosForm(forms.Form):
+    archivo = forms.FileField()
+    solo_validar = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}))
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError('Formato no soportado: use un archivo .csv o .xlsx.')
+        return archivo
@@ -0,0 +1,151 @@
+"""
+Derivados redimensionados de las imágenes de producto.
+
+Al subir una imagen se generan versiones WebP y JPEG en los anchos de
+VARIANTES (tarjeta, detalle y retina) y se guardan junto a las demás en el
+storage, en una ruta determinista derivada del archivo original:
+
+    productos/torta.png -> derivados/productos/torta/400.webp
+                           derivados/productos/torta/400.jpg ...
+
+Los anchos efectivamente generados se guardan en Producto.imagen_anchos, así
+los templates arman el `srcset` sin consultar el disco en cada render.
+Nunca se amplía una imagen: si el original mide 600px, las variantes más
+grandes se reemplazan por una sola de 600px.
+"""
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from core.storage import es_inmutable
+
+VARIANTES = {
+    'card': 400,
+    'detalle': 800,
+    'retina': 1600,
+}
+
+# formato Pillow -> (extensión, opciones de guardado)
+FORMATOS = {
+    'WEBP': ('webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Atributo `sizes` de cada uso: cuánto ancho de pantalla ocupa la imagen
+TAMANOS = {
+    'card': '(min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw',
+    'detalle': '(min-width: 768px) 50vw, 100vw',
+    'miniatura': '50px',
+}
+
+CARPETA_DERIVADOS = 'derivados'
+
+
+def carpeta_derivados(nombre):
+    """
+    'productos/torta.png' -> 'derivados/productos/torta'
+    """
+    base, _ = posixpath.splitext(nombre)
+    return posixpath.join(CARPETA_DERIVADOS, base)
+
+
+def ruta_derivado(nombre, ancho, extension):
+    return posixpath.join(carpeta_derivados(nombre), f'{ancho}.{extension}')
+
+
+def anchos_para(ancho_original):
+    return sorted({min(ancho, ancho_original) for ancho in VARIANTES.values()})
+
+
+def _aplanar(imagen):
+    """
+    JPEG no admite transparencia: se compone sobre fondo blanco.
+    """
+    if imagen.mode in ('RGBA', 'LA') or (imagen.mode == 'P' and 'transparency' in imagen.info):
+        imagen = imagen.convert('RGBA')
+        fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+        fondo.paste(imagen, mask=imagen.getchannel('A'))
+        return fondo
+    return imagen.convert('RGB')
+
+
+def generar_derivados(nombre, storage=None):
+    """
+    Genera todas las variantes de la imagen `nombre` (ruta relativa en el
+    storage) y devuelve la lista de anchos generados. Sobrescribe derivados
+    previos con la misma ruta, salvo los de blobs inmutables.
+    """
+    storage = storage or default_storage
+    with storage.open(nombre, 'rb') as archivo:
+        original = Image.open(archivo)
+        original.load()
+    # Respeta la orientación EXIF de las fotos de celular
+    original = ImageOps.exif_transpose(original)
+    con_alfa = original.mode in ('RGBA', 'LA', 'P')
+    opaca = _aplanar(original)
+
+    # Un blob direccionado por contenido nunca cambia: si sus derivados ya
+    # existen (otra fila subió el mismo archivo) no se vuelven a generar.
+    inmutable = es_inmutable(nombre)
+    anchos = anchos_para(original.width)
+    for ancho in anchos:
+        alto = max(1, round(original.height * ancho / original.width))
+        for formato, (extension, opciones) in FORMATOS.items():
+            ruta = ruta_derivado(nombre, ancho, extension)
+            if storage.exists(ruta):
+                if inmutable:
+                    continue
+                storage.delete(ruta)
+            fuente = original if (formato == 'WEBP' and con_alfa) else opaca
+            if fuente.mode not in ('RGB', 'RGBA'):
+                fuente = fuente.convert('RGBA')
+            copia = fuente.resize((ancho, alto), Image.LANCZOS) if ancho != original.width else fuente
+            buffer = BytesIO()
+            copia.save(buffer, formato, **opciones)
+            storage.save(ruta, ContentFile(buffer.getvalue()))
+    return anchos
+
+
+def procesar_imagen_producto(producto):
+    """
+    Regenera los derivados del producto y guarda los anchos resultantes.
+    Se llama después de guardar el producto (la imagen ya está en el storage).
+    """
+    anchos = generar_derivados(producto.imagen.name) if producto.imagen else []
+    if anchos != producto.imagen_anchos:
+        producto.imagen_anchos = anchos
+        producto.save(update_fields=['imagen_anchos'])
+    return anchos
+
+
+def srcset(nombre, anchos, extension, storage=None):
+    storage = storage or default_storage
+    return ', '.join(
+        f'{storage.url(ruta_derivado(nombre, ancho, extension))} {ancho}w'
+        for ancho in anchos
+    )
+
+
+def fuentes_imagen(producto, uso='card'):
+    """
+    Datos para un <picture>: srcset WebP y JPEG, `sizes` y la URL de respaldo
+    (la variante JPEG más cercana al ancho del uso, o el original si todavía
+    no hay derivados).
+    """
+    if not producto.imagen:
+        return None
+    anchos = producto.imagen_anchos or []
+    if not anchos:
+        return {'src': producto.imagen.url, 'webp': '', 'jpeg': '', 'sizes': ''}
+    nombre = producto.imagen.name
+    objetivo = VARIANTES.get(uso, VARIANTES['card'])
+    respaldo = min(anchos, key=lambda ancho: abs(ancho - objetivo))
+    return {
+        'src': default_storage.url(ruta_derivado(nombre, respaldo, FORMATOS['JPEG'][0])),
+        'webp': srcset(nombre, anchos, FORMATOS['WEBP'][0]),
+        'jpeg': srcset(nombre, anchos, FORMATOS['JPEG'][0]),
+        'sizes': TAMANOS.get(uso, TAMANOS['card']),
+    }
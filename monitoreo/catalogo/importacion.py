@@ -0,0 +1,366 @@
+"""
+Importación masiva de productos desde CSV o XLSX.
+
+El archivo se recorre fila a fila (módulo csv / openpyxl en modo
+read_only) y se procesa en lotes: cada lote se valida con las mismas reglas
+que ProductoForm, resuelve categorías y fichas nutricionales con una consulta
+por lote (y caché para el resto del archivo) y se escribe con bulk_create /
+bulk_update. En memoria solo vive el lote actual, así que el consumo no
+depende del tamaño del archivo.
+
+Columnas reconocidas (mismo formato que la exportación a Excel): ID, Nombre,
+Descripción, Marca, Precio, Caducidad, Elaboración, Tipo, Categoría,
+Nutricional, Stock Actual, Stock Mínimo, Stock Máximo, Presentación, Formato.
+Las filas con ID actualizan ese producto (solo las columnas presentes); las
+demás crean productos nuevos.
+"""
+import csv
+import io
+import os
+import time
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from .busqueda import normalizar, reindexar, terminos_producto
+from .forms import ProductoForm
+from .models import Categoria, Nutricional, Producto
+from .trigramas import actualizar_vocabulario
+from .version import incrementar_version_catalogo, incrementar_version_nombres
+
+EXTENSIONES = ('.csv', '.xlsx')
+MAX_ERRORES_EN_MEMORIA = 200
+
+# encabezado normalizado -> campo
+COLUMNAS = {
+    'id': 'id',
+    'nombre': 'nombre',
+    'descripcion': 'descripcion',
+    'marca': 'marca',
+    'precio': 'precio',
+    'caducidad': 'caducidad',
+    'elaboracion': 'elaboracion',
+    'tipo': 'tipo',
+    'categoria': 'categoria',
+    'categorias': 'categoria',
+    'nutricional': 'nutricional',
+    'stock_actual': 'stock_actual',
+    'stock_minimo': 'stock_minimo',
+    'stock_maximo': 'stock_maximo',
+    'presentacion': 'presentacion',
+    'formato': 'formato',
+}
+
+
+class ArchivoInvalido(ValueError):
+    pass
+
+
+class ProductoImportForm(ProductoForm):
+    """
+    ProductoForm sin los campos que se resuelven aparte (FK por nombre) ni
+    la imagen. Conserva clean_nombre, clean_precio y clean.
+    """
+
+    class Meta(ProductoForm.Meta):
+        fields = [
+            campo for campo in ProductoForm.Meta.fields
+            if campo not in ('Categorias', 'Nutricional', 'imagen')
+        ]
+
+    def validate_unique(self):
+        # Producto no tiene campos únicos: se evita una consulta por fila
+        pass
+
+    def revalidar(self, datos, instancia):
+        """
+        Reutiliza el formulario para otra fila. Construir un ModelForm copia
+        todos sus campos, y en importaciones grandes eso pesa tanto como
+        validar.
+        """
+        self.data = datos
+        self.instance = instancia
+        self._errors = None
+        self.cleaned_data = {}
+        return self.is_valid()
+
+
+# --------------------
+# Lectura
+# --------------------
+
+def _columna(encabezado):
+    clave = normalizar(str(encabezado or '')).strip().replace(' ', '_')
+    return COLUMNAS.get(clave)
+
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(texto, dialecto)
+    encabezados = next(lector, None)
+    if not encabezados:
+        raise ArchivoInvalido('El archivo está vacío.')
+    yield [_columna(e) for e in encabezados]
+    for fila in lector:
+        yield fila
+    texto.detach()
+
+
+def _filas_xlsx(archivo):
+    import openpyxl
+
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezados = next(filas, None)
+        if not encabezados:
+            raise ArchivoInvalido('La planilla está vacía.')
+        yield [_columna(e) for e in encabezados]
+        yield from filas
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """
+    Genera (número de fila, {campo: valor}) desde un archivo binario. Las
+    columnas desconocidas se ignoran y las filas vacías se saltan.
+    """
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension not in EXTENSIONES:
+        raise ArchivoInvalido('Formato no soportado: use un archivo .csv o .xlsx.')
+    filas = _filas_xlsx(archivo) if extension == '.xlsx' else _filas_csv(archivo)
+
+    columnas = next(filas)
+    if 'nombre' not in columnas and 'id' not in columnas:
+        raise ArchivoInvalido('Falta la columna "Nombre" (o "ID" para actualizar).')
+    for numero, fila in enumerate(filas, start=2):
+        datos = {
+            campo: valor
+            for campo, valor in zip(columnas, fila)
+            if campo and valor not in (None, '')
+        }
+        if datos:
+            yield numero, datos
+
+
+# --------------------
+# Resolución de llaves foráneas
+# --------------------
+
+class ResolutorNombres:
+    """
+    Traduce el valor de una columna (id o texto) a la pk de `modelo`.
+    Cada lote consulta solo los valores que todavía no están en caché.
+    """
+
+    def __init__(self, modelo, campo_texto):
+        self.modelo = modelo
+        self.campo_texto = campo_texto
+        self.cache = {}
+        self._tabla_cargada = False
+
+    @staticmethod
+    def clave(valor):
+        if isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        return normalizar(str(valor)).strip()
+
+    def precargar(self, valores):
+        faltantes = {self.clave(v) for v in valores} - set(self.cache)
+        if not faltantes:
+            return
+        ids = [int(c) for c in faltantes if c.isdigit()]
+        textos = {c for c in faltantes if not c.isdigit()}
+        for pk in self.modelo.objects.filter(pk__in=ids).values_list('pk', flat=True):
+            self.cache[str(pk)] = pk
+        if textos:
+            # El filtro exacto trae candidatos; la comparación final ignora
+            # mayúsculas y tildes
+            candidatos = self.modelo.objects.filter(
+                **{f'{self.campo_texto}__in': self._variantes(v for v in valores if self.clave(v) in textos)}
+            ).values_list('pk', self.campo_texto)
+            for pk, texto in candidatos:
+                self.cache.setdefault(self.clave(texto), pk)
+            if not self._tabla_cargada and textos - set(self.cache):
+                # Algún nombre difiere solo en tildes: se carga la tabla una
+                # única vez (categorías y fichas son pocas comparadas con
+                # los productos)
+                for pk, texto in self.modelo.objects.values_list('pk', self.campo_texto).iterator():
+                    self.cache.setdefault(self.clave(texto), pk)
+                self._tabla_cargada = True
+        for clave in faltantes:
+            self.cache.setdefault(clave, None)
+
+    def _variantes(self, valores):
+        variantes = set()
+        for valor in valores:
+            texto = str(valor).strip()
+            variantes.update({texto, texto.lower(), texto.title(), texto.capitalize()})
+        return list(variantes)
+
+    def resolver(self, valor):
+        return self.cache.get(self.clave(valor))
+
+
+# --------------------
+# Resultado
+# --------------------
+
+class ResultadoImportacion:
+    """
+    Conteos y errores por fila. Guarda en memoria solo los primeros
+    MAX_ERRORES_EN_MEMORIA; si se entrega `reporte` (archivo de texto) los
+    escribe todos ahí como CSV.
+    """
+
+    def __init__(self, reporte=None):
+        self.leidas = self.creadas = self.actualizadas = self.total_errores = 0
+        self.errores = []
+        self.inicio = time.perf_counter()
+        self._escritor = csv.writer(reporte) if reporte else None
+        if self._escritor:
+            self._escritor.writerow(['fila', 'campo', 'error'])
+
+    def error(self, fila, campo, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES_EN_MEMORIA:
+            self.errores.append((fila, campo, mensaje))
+        if self._escritor:
+            self._escritor.writerow([fila, campo, mensaje])
+
+    @property
+    def duracion(self):
+        return time.perf_counter() - self.inicio
+
+    @property
+    def filas_por_segundo(self):
+        return self.leidas / self.duracion if self.duracion else 0
+
+
+# --------------------
+# Importación
+# --------------------
+
+def _pk(valor):
+    try:
+        return int(float(str(valor).strip()))
+    except ValueError:
+        return None
+
+
+def _lotes(iterable, tamano):
+    lote = []
+    for elemento in iterable:
+        lote.append(elemento)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _validar_fila(form, numero, datos, existente, categorias, nutricionales, resultado):
+    if existente is not None:
+        # Solo se reemplazan las columnas presentes en el archivo
+        base = model_to_dict(existente, fields=ProductoImportForm.Meta.fields)
+        base.update(datos)
+        datos = base
+    ok = form.revalidar(datos, existente if existente is not None else Producto())
+    for campo, mensajes in form.errors.items():
+        for mensaje in mensajes:
+            resultado.error(numero, campo if campo != '__all__' else '', mensaje)
+
+    producto = form.instance
+    for columna, atributo, resolutor, etiqueta in (
+        ('categoria', 'Categorias_id', categorias, 'Categoría'),
+        ('nutricional', 'Nutricional_id', nutricionales, 'Nutricional'),
+    ):
+        if columna in datos:
+            pk = resolutor.resolver(datos[columna])
+            if pk is None:
+                resultado.error(numero, columna, f'{etiqueta} "{datos[columna]}" no existe.')
+                ok = False
+            else:
+                setattr(producto, atributo, pk)
+        elif existente is None:
+            resultado.error(numero, columna, f'{etiqueta} es obligatoria para productos nuevos.')
+            ok = False
+    return producto if ok else None
+
+
+def importar_productos(archivo, nombre, batch_size=1000, solo_validar=False, reporte=None, progreso=None):
+    """
+    Importa productos desde `archivo` (binario). Devuelve ResultadoImportacion.
+    `progreso(resultado)` se llama después de cada lote.
+    """
+    resultado = ResultadoImportacion(reporte)
+    form = ProductoImportForm(data={})
+    categorias = ResolutorNombres(Categoria, 'nombre')
+    nutricionales = ResolutorNombres(Nutricional, 'ingredientes')
+    campos_actualizables = ProductoImportForm.Meta.fields + ['Categorias', 'Nutricional', 'modificado']
+    max_pk_previo = Producto.objects.aggregate(m=Max('pk'))['m'] or 0
+    devuelve_pks = connection.features.can_return_rows_from_bulk_insert
+    hubo_cambios = False
+
+    for lote in _lotes(leer_filas(archivo, nombre), batch_size):
+        resultado.leidas += len(lote)
+        existentes = Producto.objects.in_bulk({_pk(d['id']) for _, d in lote if 'id' in d} - {None})
+        categorias.precargar([d['categoria'] for _, d in lote if 'categoria' in d])
+        nutricionales.precargar([d['nutricional'] for _, d in lote if 'nutricional' in d])
+
+        nuevos, modificados = [], []
+        ahora = timezone.now()
+        for numero, datos in lote:
+            pk = datos.pop('id', None)
+            existente = None
+            if pk is not None:
+                existente = existentes.get(_pk(pk))
+                if existente is None:
+                    resultado.error(numero, 'id', f'No existe un producto con ID {pk}.')
+                    continue
+            producto = _validar_fila(form, numero, datos, existente, categorias, nutricionales, resultado)
+            if producto is None:
+                continue
+            if existente is None:
+                producto.creado = ahora
+                nuevos.append(producto)
+            else:
+                producto.modificado = ahora
+                modificados.append(producto)
+
+        if not solo_validar and (nuevos or modificados):
+            with transaction.atomic():
+                Producto.objects.bulk_create(nuevos, batch_size=batch_size)
+                Producto.objects.bulk_update(modificados, campos_actualizables, batch_size=batch_size)
+                # bulk_* no dispara señales: el índice se actualiza por lote
+                reindexar_pks = [p.pk for p in modificados]
+                if devuelve_pks:
+                    reindexar_pks += [p.pk for p in nuevos]
+                if reindexar_pks:
+                    reindexar(Producto.objects.filter(pk__in=reindexar_pks), batch_size=batch_size)
+                actualizar_vocabulario(agregados=list({
+                    termino for p in nuevos + modificados for termino in terminos_producto(p)
+                }))
+            hubo_cambios = True
+        resultado.creadas += len(nuevos)
+        resultado.actualizadas += len(modificados)
+        if progreso:
+            progreso(resultado)
+
+    if hubo_cambios:
+        if not devuelve_pks and resultado.creadas:
+            # MySQL no devuelve las pk de bulk_create: los nuevos son los
+            # que quedaron por encima del máximo previo
+            reindexar(Producto.objects.filter(pk__gt=max_pk_previo), batch_size=batch_size)
+        incrementar_version_catalogo()
+        incrementar_version_nombres()
+    return resultado
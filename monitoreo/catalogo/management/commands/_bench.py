@@ -0,0 +1,82 @@
+"""
+Utilidades compartidas por los comandos de benchmark de 'catalogo'.
+El prefijo '_' evita que Django lo registre como comando.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from catalogo.models import Categoria, Nutricional, Producto
+
+PALABRAS_NOMBRE = [
+    'pan', 'marraqueta', 'hallulla', 'empanada', 'torta', 'kuchen', 'croissant',
+    'queque', 'berlin', 'alfajor', 'galleta', 'pie', 'brownie', 'chilenita',
+    'dobladita', 'coliza', 'sopaipilla', 'trenza', 'calzon roto', 'cafe', 'te',
+]
+PALABRAS_DETALLE = [
+    'chocolate', 'manjar', 'mantequilla', 'integral', 'queso', 'pino', 'nuez',
+    'frambuesa', 'limon', 'manzana', 'vainilla', 'canela', 'masa madre',
+    'aceituna', 'ricota', 'espinaca', 'coco', 'almendra', 'lucuma',
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def catalogo_sintetico(cantidad, semilla=42, batch_size=2000):
+    """
+    Inserta `cantidad` productos sintéticos dentro de una transacción que se
+    revierte al salir, de modo que el benchmark no deja rastros en la base.
+    Los productos se crean con bulk_create, por lo que las señales no se
+    disparan: cada benchmark construye los índices que necesite.
+    """
+    rnd = random.Random(semilla)
+    try:
+        with transaction.atomic():
+            categoria = Categoria.objects.create(nombre='Benchmark')
+            nutricional = Nutricional.objects.create(ingredientes='Benchmark')
+            hoy = date.today()
+            lote = []
+            for i in range(cantidad):
+                nombre = f"{rnd.choice(PALABRAS_NOMBRE).title()} de {rnd.choice(PALABRAS_DETALLE)} {i}"
+                descripcion = ' '.join(rnd.sample(PALABRAS_DETALLE, 4))
+                lote.append(Producto(
+                    nombre=nombre,
+                    descripcion=descripcion,
+                    marca=f"Marca {i % 50}",
+                    precio=rnd.randint(500, 25000),
+                    caducidad=hoy + timedelta(days=rnd.randint(1, 60)),
+                    tipo=rnd.choice(['Panadería', 'Pastelería', 'Cafetería']),
+                    Categorias=categoria,
+                    Nutricional=nutricional,
+                    stock_actual=rnd.randint(0, 100),
+                ))
+                if len(lote) >= batch_size:
+                    Producto.objects.bulk_create(lote)
+                    lote = []
+            if lote:
+                Producto.objects.bulk_create(lote)
+            yield Producto.objects.filter(Categorias=categoria)
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def cronometrar(funcion, repeticiones):
+    """
+    Ejecuta `funcion` `repeticiones` veces y devuelve (mediana_ms, p95_ms).
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+    return statistics.median(tiempos), p95
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from catalogo.busqueda import buscar, reindexar
+from catalogo.models import Producto
+
+from ._bench import catalogo_sintetico, cronometrar
+
+CONSULTAS_POR_DEFECTO = ['pan', 'torta chocolate', 'empanada pino', 'croiss', 'manjar nuez']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda con icontains (ruta antigua de ver_productos) '
+        'contra el índice invertido TerminosBusqueda.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sinteticos', type=int, default=0,
+            help='Agrega N productos sintéticos (se revierten al terminar).',
+        )
+        parser.add_argument('--repeticiones', type=int, default=50)
+        parser.add_argument('--limite', type=int, default=9, help='Tamaño de página simulado.')
+        parser.add_argument('consultas', nargs='*', default=CONSULTAS_POR_DEFECTO)
+
+    def handle(self, *args, **options):
+        if options['sinteticos']:
+            with catalogo_sintetico(options['sinteticos']) as sinteticos:
+                self.stdout.write(f"Indexando {options['sinteticos']} productos sintéticos...")
+                reindexar(sinteticos)
+                self.comparar(options)
+        else:
+            self.comparar(options)
+
+    def comparar(self, options):
+        limite = options['limite']
+        base = Producto.objects.filter(stock_actual__gt=0)
+        self.stdout.write(f"Catálogo: {Producto.objects.count()} productos\n")
+        self.stdout.write(f"{'consulta':<20} {'icontains (ms)':>16} {'índice (ms)':>14} {'resultados':>12}")
+
+        for consulta in options['consultas']:
+            def ruta_icontains():
+                return list(base.filter(
+                    Q(nombre__icontains=consulta) | Q(descripcion__icontains=consulta)
+                ).order_by('nombre')[:limite])
+
+            def ruta_indice():
+                return list(buscar(base, consulta).order_by('-relevancia', 'nombre')[:limite])
+
+            med_a, p95_a = cronometrar(ruta_icontains, options['repeticiones'])
+            med_b, p95_b = cronometrar(ruta_indice, options['repeticiones'])
+            encontrados = buscar(base, consulta).count()
+            self.stdout.write(
+                f"{consulta:<20} {med_a:>7.2f} / {p95_a:<6.2f} {med_b:>6.2f} / {p95_b:<6.2f} {encontrados:>12}"
+            )
+
+        self.stdout.write(self.style.SUCCESS("\nValores: mediana / p95 en milisegundos."))
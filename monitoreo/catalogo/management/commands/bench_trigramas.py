@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from catalogo.busqueda import reindexar, tokenizar
+from catalogo.models import Producto
+from catalogo.trigramas import buscar_aproximado, reconstruir_vocabulario, similitud, UMBRAL_SIMILITUD
+
+from ._bench import catalogo_sintetico, cronometrar
+
+CONSULTAS_POR_DEFECTO = ['marraketa', 'kuchen manjar', 'alfajores', 'hayulla', 'brauni', 'frambueza']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda tolerante a errores de tipeo: icontains, un recorrido '
+        'lineal calculando similitud por producto y el índice de trigramas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sinteticos', type=int, default=50000,
+            help='Agrega N productos sintéticos (se revierten al terminar).',
+        )
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--limite', type=int, default=9, help='Tamaño de página simulado.')
+        parser.add_argument('consultas', nargs='*', default=CONSULTAS_POR_DEFECTO)
+
+    def handle(self, *args, **options):
+        if options['sinteticos']:
+            with catalogo_sintetico(options['sinteticos']) as sinteticos:
+                self.stdout.write(f"Indexando {options['sinteticos']} productos sintéticos...")
+                reindexar(sinteticos)
+                reconstruir_vocabulario()
+                self.comparar(options)
+        else:
+            self.comparar(options)
+
+    def comparar(self, options):
+        limite = options['limite']
+        base = Producto.objects.filter(stock_actual__gt=0)
+        self.stdout.write(f"Catálogo: {Producto.objects.count()} productos\n")
+        self.stdout.write(
+            f"{'consulta':<16} {'icontains (ms)':>16} {'lineal (ms)':>16} {'trigramas (ms)':>16} {'resultados':>11}"
+        )
+
+        for consulta in options['consultas']:
+            terminos = tokenizar(consulta)
+
+            def ruta_icontains():
+                return list(base.filter(
+                    Q(nombre__icontains=consulta) | Q(descripcion__icontains=consulta)
+                ).order_by('nombre')[:limite])
+
+            def ruta_lineal():
+                # Lo que habría que hacer sin índice: comparar con cada producto
+                puntuados = []
+                for pk, nombre in base.values_list('pk', 'nombre').iterator(chunk_size=2000):
+                    palabras = tokenizar(nombre)
+                    puntaje = sum(
+                        max((similitud(t, p) for p in palabras), default=0) for t in terminos
+                    )
+                    if puntaje >= UMBRAL_SIMILITUD:
+                        puntuados.append((puntaje, pk))
+                puntuados.sort(reverse=True)
+                return puntuados[:limite]
+
+            def ruta_trigramas():
+                qs, _ = buscar_aproximado(base, consulta)
+                return list(qs.order_by('-relevancia', 'nombre')[:limite])
+
+            med_a, p95_a = cronometrar(ruta_icontains, options['repeticiones'])
+            med_b, p95_b = cronometrar(ruta_lineal, max(1, options['repeticiones'] // 5))
+            med_c, p95_c = cronometrar(ruta_trigramas, options['repeticiones'])
+            encontrados = buscar_aproximado(base, consulta)[0].count()
+            self.stdout.write(
+                f"{consulta:<16} {med_a:>7.2f} / {p95_a:<7.2f} {med_b:>7.1f} / {p95_b:<7.1f} "
+                f"{med_c:>7.2f} / {p95_c:<7.2f} {encontrados:>11}"
+            )
+
+        self.stdout.write(self.style.SUCCESS("\nValores: mediana / p95 en milisegundos."))
@@ -0,0 +1,81 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from catalogo.models import Producto
+from catalogo.version import incrementar_version_catalogo
+
+
+def _inicializar_proceso():
+    # Con el método 'spawn' el proceso hijo arranca sin Django configurado
+    import django
+    django.setup()
+
+
+def _procesar(pk, nombre):
+    """
+    Se ejecuta en un proceso del pool: solo toca el storage, nunca la base
+    de datos (las conexiones no se comparten entre procesos).
+    """
+    from catalogo.imagenes import generar_derivados
+    try:
+        return pk, generar_derivados(nombre), None
+    except Exception as error:  # una imagen corrupta no debe frenar el resto
+        return pk, None, f'{type(error).__name__}: {error}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera los derivados WebP/JPEG (card, detalle, retina) de las imágenes '
+        'de producto existentes, repartiendo el trabajo en varios procesos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos', type=int, default=os.cpu_count() or 2,
+            help='Cantidad de procesos del pool (por defecto, los núcleos disponibles).',
+        )
+        parser.add_argument(
+            '--todos', action='store_true',
+            help='Regenera también los productos que ya tienen derivados.',
+        )
+        parser.add_argument(
+            '--batch', type=int, default=200,
+            help='Productos por bloque de actualización en la base (por defecto 200).',
+        )
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        if not options['todos']:
+            productos = productos.filter(imagen_anchos=[])
+        pendientes = list(productos.values_list('pk', 'imagen'))
+        if not pendientes:
+            self.stdout.write("No hay imágenes pendientes.")
+            return
+
+        self.stdout.write(f"Procesando {len(pendientes)} imágenes con {options['procesos']} procesos...")
+        inicio = time.perf_counter()
+        listos, errores = [], 0
+        with ProcessPoolExecutor(max_workers=options['procesos'], initializer=_inicializar_proceso) as pool:
+            futuros = [pool.submit(_procesar, pk, nombre) for pk, nombre in pendientes]
+            for futuro in as_completed(futuros):
+                pk, anchos, error = futuro.result()
+                if error:
+                    errores += 1
+                    self.stderr.write(f"  ✘ Producto {pk}: {error}")
+                    continue
+                listos.append(Producto(pk=pk, imagen_anchos=anchos))
+                if len(listos) >= options['batch']:
+                    Producto.objects.bulk_update(listos, ['imagen_anchos'])
+                    listos = []
+        if listos:
+            Producto.objects.bulk_update(listos, ['imagen_anchos'])
+        # bulk_update no dispara señales: se invalida a mano lo cacheado
+        incrementar_version_catalogo()
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ {len(pendientes) - errores} imágenes procesadas en {duracion:.2f}s ({errores} con error)."
+        ))
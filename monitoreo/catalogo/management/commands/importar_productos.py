@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalogo.importacion import ArchivoInvalido, importar_productos
+
+
+class Command(BaseCommand):
+    help = 'Importa productos desde un archivo CSV o XLSX (crea o actualiza por ID).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx.')
+        parser.add_argument(
+            '--batch', type=int, default=1000,
+            help='Filas por lote de validación y escritura (por defecto 1000).',
+        )
+        parser.add_argument(
+            '--validar', action='store_true',
+            help='Solo valida el archivo y reporta los errores, sin escribir en la base.',
+        )
+        parser.add_argument(
+            '--errores', default=None,
+            help='Escribe el reporte completo de errores (CSV: fila, campo, error) en esta ruta.',
+        )
+
+    def handle(self, *args, **options):
+        def progreso(resultado):
+            self.stdout.write(
+                f"  {resultado.leidas} filas leídas · {resultado.creadas} nuevas · "
+                f"{resultado.actualizadas} actualizadas · {resultado.total_errores} errores "
+                f"({resultado.filas_por_segundo:,.0f} filas/s)"
+            )
+
+        reporte = open(options['errores'], 'w', encoding='utf-8', newline='') if options['errores'] else None
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_productos(
+                    archivo, options['archivo'],
+                    batch_size=options['batch'],
+                    solo_validar=options['validar'],
+                    reporte=reporte,
+                    progreso=progreso,
+                )
+        except FileNotFoundError:
+            raise CommandError(f"✖ Archivo {options['archivo']} no encontrado")
+        except ArchivoInvalido as e:
+            raise CommandError(f"✖ {e}")
+        finally:
+            if reporte:
+                reporte.close()
+
+        for fila, campo, mensaje in resultado.errores[:20]:
+            self.stdout.write(self.style.WARNING(f"  Fila {fila}{f' [{campo}]' if campo else ''}: {mensaje}"))
+        if resultado.total_errores > 20:
+            self.stdout.write(f"  ... y {resultado.total_errores - 20} errores más.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ {resultado.leidas} filas en {resultado.duracion:.2f}s: "
+            f"{resultado.creadas} nuevas, {resultado.actualizadas} actualizadas, "
+            f"{resultado.total_errores} errores."
+            + (" (solo validación)" if options['validar'] else "")
+        ))
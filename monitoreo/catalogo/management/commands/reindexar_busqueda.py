@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+
+from catalogo.busqueda import reindexar
+from catalogo.trigramas import reconstruir_vocabulario
+from catalogo.models import Producto
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye el índice de búsqueda (TerminosBusqueda) de todos los productos '
+        'y el vocabulario de trigramas (TrigramasTerminos).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=1000,
+            help='Cantidad de filas por bloque de lectura/inserción (por defecto 1000).',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        total_productos = Producto.objects.count()
+        self.stdout.write(f"Reindexando {total_productos} productos...")
+
+        insertados = reindexar(batch_size=options['batch'])
+        vocabulario = reconstruir_vocabulario(batch_size=options['batch'] * 2)
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ Índice reconstruido: {insertados} términos "
+            f"({vocabulario} distintos con trigramas) en {duracion:.2f}s."
+        ))
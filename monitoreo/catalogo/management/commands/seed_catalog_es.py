@@ -1,62 +1,206 @@
 import json
 import os
-from django.core.management.base import BaseCommand
-from django.db import transaction
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
+
+from catalogo.busqueda import reindexar
+from catalogo.trigramas import reconstruir_vocabulario
+from catalogo.version import incrementar_version_catalogo, incrementar_version_nombres
+
+ARCHIVOS_POR_DEFECTO = [
+    '00_nutricional.json',
+    '01_categorias_productos.json',
+    '02_reglas_alerta.json',
+    '03_productos_reglas.json',
+]
+
+# Orden de dependencias (FK): antes de insertar un lote de un modelo se
+# vacían los lotes pendientes de todos los modelos anteriores.
+ORDEN_MODELOS = [
+    'catalogo.nutricional',
+    'catalogo.categoria',
+    'catalogo.reglaalertavencimiento',
+    'catalogo.producto',
+    'catalogo.productoreglaalerta',
+]
+
+TAMANO_BLOQUE_LECTURA = 64 * 1024
+
+
+def iterar_fixture(archivo):
+    """
+    Lee un fixture (arreglo JSON de objetos) elemento por elemento, sin
+    cargar el archivo completo en memoria.
+    """
+    decodificador = json.JSONDecoder()
+    buffer = archivo.read(TAMANO_BLOQUE_LECTURA).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('el fixture debe ser un arreglo JSON')
+    buffer = buffer[1:]
+    fin_archivo = False
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            objeto, consumido = decodificador.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if fin_archivo:
+                raise
+            bloque = archivo.read(TAMANO_BLOQUE_LECTURA)
+            fin_archivo = not bloque
+            buffer += bloque
+            continue
+        yield objeto
+        buffer = buffer[consumido:]
+
+
+class CargaMasiva:
+    """
+    Acumula filas por modelo y las inserta con bulk_create en lotes de
+    `batch_size`, respetando ORDEN_MODELOS.
+    """
+
+    def __init__(self, batch_size, upsert=False):
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.pendientes = {etiqueta: [] for etiqueta in ORDEN_MODELOS}
+        self.insertadas = {etiqueta: 0 for etiqueta in ORDEN_MODELOS}
+        self._campos = {}
+
+    def _convertir(self, modelo, datos):
+        """
+        {'Categorias': 21} -> {'Categorias_id': 21}, sin consultar la base.
+        """
+        campos = {}
+        for nombre, valor in datos.items():
+            campo = modelo._meta.get_field(nombre)
+            campos[campo.attname] = valor
+        return campos
+
+    def agregar(self, item):
+        etiqueta = item['model'].lower()
+        if etiqueta not in self.pendientes:
+            raise ValueError(f"modelo no soportado: {item['model']}")
+        modelo = apps.get_model(etiqueta)
+        campos = self._convertir(modelo, item.get('fields', {}))
+        self._campos.setdefault(etiqueta, set()).update(campos)
+        self.pendientes[etiqueta].append(modelo(pk=item.get('pk'), **campos))
+        if len(self.pendientes[etiqueta]) >= self.batch_size:
+            self.vaciar(hasta=etiqueta)
+
+    def vaciar(self, hasta=None):
+        for etiqueta in ORDEN_MODELOS:
+            self._insertar(etiqueta)
+            if etiqueta == hasta:
+                break
+
+    def _insertar(self, etiqueta):
+        objetos = self.pendientes[etiqueta]
+        if not objetos:
+            return
+        modelo = type(objetos[0])
+        opciones = {'batch_size': self.batch_size}
+        if self.upsert:
+            opciones['update_conflicts'] = True
+            # auto_now (Producto.modificado) también se reescribe en el upsert
+            tocados = {c.attname for c in modelo._meta.concrete_fields if getattr(c, 'auto_now', False)}
+            opciones['update_fields'] = sorted(self._campos[etiqueta] | tocados)
+            # MySQL no acepta indicar la clave del conflicto (ON DUPLICATE KEY)
+            if connection.features.supports_update_conflicts_with_target:
+                opciones['unique_fields'] = [modelo._meta.pk.name]
+        modelo.objects.bulk_create(objetos, **opciones)
+        self.insertadas[etiqueta] += len(objetos)
+        self.pendientes[etiqueta] = []
+
+    def reiniciar_secuencias(self):
+        # Se insertaron pk explícitas: las secuencias (PostgreSQL, Oracle)
+        # deben continuar desde el máximo, igual que hace loaddata
+        modelos = [apps.get_model(e) for e, n in self.insertadas.items() if n]
+        sentencias = connection.ops.sequence_reset_sql(no_style(), modelos)
+        if sentencias:
+            with connection.cursor() as cursor:
+                for sql in sentencias:
+                    cursor.execute(sql)
 
-# --- IMPORTACIÓN CORREGIDA ---
-# Importa directamente desde la app 'catalogo'
-from catalogo.models import Nutricional, Categoria, Producto, ReglaAlertaVencimiento, ProductoReglaAlerta
 
 class Command(BaseCommand):
     help = 'Carga los datos iniciales de catálogos de productos y alertas.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'archivos', nargs='*', default=ARCHIVOS_POR_DEFECTO,
+            help='Fixtures a cargar, en orden (por defecto los de catalogo/fixtures).',
+        )
+        parser.add_argument(
+            '--directorio', default=None,
+            help='Carpeta de los fixtures (por defecto catalogo/fixtures).',
+        )
+        parser.add_argument(
+            '--batch', type=int, default=1000,
+            help='Filas por bulk_create (por defecto 1000).',
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Actualiza las filas que ya existen (misma pk) en vez de fallar. Permite re-ejecutar la siembra.',
+        )
+        parser.add_argument(
+            '--sin-indice', action='store_true',
+            help='No reconstruye el índice de búsqueda al terminar.',
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS("Iniciando la siembra de datos..."))
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        
+
         # Sube 3 niveles (commands -> management -> catalogo) y luego baja a 'fixtures'
-        fixtures_dir = os.path.join(base_dir, '..', '..', 'fixtures')
-        
-        files = [
-            '00_nutricional.json',
-            '01_categorias_productos.json',
-            '02_reglas_alerta.json',
-            '03_productos_reglas.json',
-        ]
+        fixtures_dir = options['directorio'] or os.path.join(base_dir, '..', '..', 'fixtures')
+
+        carga = CargaMasiva(options['batch'], upsert=options['upsert'])
+        inicio_total = time.perf_counter()
 
+        # Todo o nada: si un archivo falla se revierte la siembra completa y
+        # el comando termina con error (antes se seguía dentro de una
+        # transacción ya rota).
         with transaction.atomic():
-            for filename in files:
+            for filename in options['archivos']:
                 file_path = os.path.join(fixtures_dir, filename)
+                antes = sum(carga.insertadas.values())
+                inicio = time.perf_counter()
                 try:
                     with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        self.process_fixture_data(data)
-                        self.stdout.write(self.style.SUCCESS(f"✔ Datos de {filename} cargados correctamente."))
+                        for item in iterar_fixture(f):
+                            carga.agregar(item)
+                    carga.vaciar()
                 except FileNotFoundError:
-                    self.stdout.write(self.style.ERROR(f"✖ Archivo {filename} no encontrado en {file_path}"))
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"✖ Error al procesar {filename}: {e}"))
-
-        self.stdout.write(self.style.SUCCESS("\n¡Siembra de datos completada!"))
-
-    def process_fixture_data(self, data):
-        # --- LÓGICA SIMPLIFICADA Y CORREGIDA ---
-        for item in data:
-            model_name = item['model'].split('.')[-1].lower()
-            fields = item['fields']
-            pk = item.get('pk')
-
-            if model_name == 'nutricional':
-                Nutricional.objects.create(pk=pk, **fields)
-            elif model_name == 'categoria':
-                Categoria.objects.create(pk=pk, **fields)
-            elif model_name == 'producto':
-                fields['Categorias_id'] = fields.pop('Categorias')
-                fields['Nutricional_id'] = fields.pop('Nutricional')
-                Producto.objects.create(pk=pk, **fields)
-            elif model_name == 'reglaalertavencimiento':
-                ReglaAlertaVencimiento.objects.create(pk=pk, **fields)
-            elif model_name == 'productoreglaalerta':
-                producto = Producto.objects.get(pk=fields['producto'])
-                regla = ReglaAlertaVencimiento.objects.get(pk=fields['regla'])
-                ProductoReglaAlerta.objects.create(producto=producto, regla=regla)
\ No newline at end of file
+                    raise CommandError(f"✖ Archivo {filename} no encontrado en {file_path}")
+                except (ValueError, KeyError, LookupError, DatabaseError) as e:
+                    raise CommandError(f"✖ Error al procesar {filename}: {e}")
+
+                filas = sum(carga.insertadas.values()) - antes
+                duracion = time.perf_counter() - inicio
+                self.stdout.write(self.style.SUCCESS(
+                    f"✔ {filename}: {filas} filas en {duracion:.2f}s "
+                    f"({filas / duracion if duracion else 0:,.0f} filas/s)"
+                ))
+            carga.reiniciar_secuencias()
+
+            # bulk_create no dispara señales: índice y versión se actualizan a mano
+            if not options['sin_indice']:
+                inicio = time.perf_counter()
+                terminos = reindexar(batch_size=options['batch'])
+                reconstruir_vocabulario()
+                self.stdout.write(f"  Índice de búsqueda: {terminos} términos en {time.perf_counter() - inicio:.2f}s")
+            transaction.on_commit(incrementar_version_catalogo)
+            transaction.on_commit(incrementar_version_nombres)
+
+        total = sum(carga.insertadas.values())
+        duracion = time.perf_counter() - inicio_total
+        self.stdout.write(self.style.SUCCESS(
+            f"\n¡Siembra de datos completada! {total} filas en {duracion:.2f}s "
+            f"({total / duracion if duracion else 0:,.0f} filas/s)"
+        ))
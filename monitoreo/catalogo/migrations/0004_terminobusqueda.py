@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0003_alter_producto_precio_alter_producto_stock_actual_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=60)),
+                ('peso', models.PositiveSmallIntegerField(default=1)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos', to='catalogo.producto')),
+            ],
+            options={
+                'db_table': 'TerminosBusqueda',
+                'unique_together': {('termino', 'producto')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0004_terminobusqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrigramaTermino',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('termino', models.CharField(db_index=True, max_length=60)),
+            ],
+            options={
+                'db_table': 'TrigramasTerminos',
+                'unique_together': {('trigrama', 'termino')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0005_trigramatermino'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_anchos',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:58
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0006_producto_imagen_anchos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producto',
+            name='imagen',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.obtener_almacenamiento_contenido, upload_to='productos/', verbose_name='Imagen'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0007_almacenamiento_contenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='stock_reservado',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
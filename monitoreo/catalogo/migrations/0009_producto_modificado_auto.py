@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0008_stock_reservado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producto',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
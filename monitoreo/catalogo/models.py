@@ -2,6 +2,8 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from core.storage import obtener_almacenamiento_contenido
+
 # Validador genérico para campos numéricos no negativos
 def no_negativo(value):
     if value is not None and value < 0:
@@ -49,14 +51,25 @@ class Producto(models.Model):
     tipo = models.CharField(max_length=100)
     Categorias = models.ForeignKey(Categoria, on_delete=models.DO_NOTHING, db_column='Categorias_id')
     Nutricional = models.ForeignKey(Nutricional, on_delete=models.DO_NOTHING, db_column='Nutricional_id')
-    imagen = models.ImageField(upload_to='productos/', null=True, blank=True, verbose_name='Imagen')
+    imagen = models.ImageField(
+        upload_to='productos/',
+        storage=obtener_almacenamiento_contenido,
+        null=True, blank=True, verbose_name='Imagen',
+    )
+    # Anchos de los derivados generados (ver catalogo/imagenes.py)
+    imagen_anchos = models.JSONField(default=list, blank=True, editable=False)
     stock_actual = models.IntegerField(blank=True, null=True, validators=[no_negativo])
     stock_minimo = models.IntegerField(blank=True, null=True, validators=[no_negativo])
     stock_maximo = models.IntegerField(blank=True, null=True, validators=[no_negativo])
+    # Unidades retenidas por carritos (pedidos.ReservaStock). Contador
+    # mantenido con UPDATE condicionales; lo vendible es stock_disponible.
+    stock_reservado = models.IntegerField(default=0, editable=False)
     presentacion = models.CharField(max_length=100, blank=True, null=True)
     formato = models.CharField(max_length=100, blank=True, null=True)
     creado = models.DateTimeField(blank=True, null=True)
-    modificado = models.DateTimeField(blank=True, null=True)
+    # Se actualiza en cada save() (y en bulk_create); las alertas de
+    # vencimiento lo usan para reevaluar solo lo que cambió (pedidos/alertas.py)
+    modificado = models.DateTimeField(auto_now=True, null=True)
     eliminado = models.DateTimeField(blank=True, null=True)
 
     class Meta:
@@ -66,6 +79,10 @@ class Producto(models.Model):
     def __str__(self):
         return self.nombre
 
+    @property
+    def stock_disponible(self):
+        return max((self.stock_actual or 0) - self.stock_reservado, 0)
+
     def clean(self):
         errors = {}
         # Nombre obligatorio
@@ -106,3 +123,38 @@ class ProductoReglaAlerta(models.Model):
 
     def __str__(self):
         return f"{self.producto.nombre} - {self.regla.nombre}"
+
+# --- TerminoBusqueda ---
+class TerminoBusqueda(models.Model):
+    """
+    Índice invertido de la búsqueda de la tienda: un registro por cada raíz
+    (normalizada y sin acentos) que aparece en un producto, con su peso.
+    Se mantiene desde las señales de Producto (ver catalogo/signals.py).
+    """
+    termino = models.CharField(max_length=60)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='terminos')
+    peso = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        db_table = 'TerminosBusqueda'
+        unique_together = ('termino', 'producto')
+
+    def __str__(self):
+        return f"{self.termino} -> {self.producto_id}"
+
+# --- TrigramaTermino ---
+class TrigramaTermino(models.Model):
+    """
+    Índice de trigramas sobre el vocabulario de la búsqueda (los términos
+    distintos de TerminoBusqueda). Permite encontrar términos parecidos
+    ("empanda" -> "empanad") sin recorrer el catálogo completo.
+    """
+    trigrama = models.CharField(max_length=3)
+    termino = models.CharField(max_length=60, db_index=True)
+
+    class Meta:
+        db_table = 'TrigramasTerminos'
+        unique_together = ('trigrama', 'termino')
+
+    def __str__(self):
+        return f"{self.trigrama} -> {self.termino}"
@@ -0,0 +1,53 @@
+"""
+Reportes exportables del catálogo (ver reportes.exportacion).
+"""
+from reportes.exportacion import Columna, Reporte, registrar
+
+from .models import Categoria, Producto
+
+
+def _fecha(campo):
+    def obtener(obj):
+        valor = getattr(obj, campo)
+        return valor.strftime("%Y-%m-%d") if valor else ""
+    return obtener
+
+
+@registrar
+class ReporteProductos(Reporte):
+    nombre = 'productos'
+    titulo = 'Productos'
+    archivo = 'productos'
+    modelo = Producto
+    select_related = ('Categorias',)
+    permiso = 'catalogo.view_producto'
+    columnas = (
+        Columna("ID", 'id', ancho=8),
+        Columna("Nombre", 'nombre', ancho=30),
+        Columna("Descripción", 'descripcion', ancho=40),
+        Columna("Marca", 'marca', ancho=20),
+        Columna("Precio", lambda p: p.precio or 0, ancho=12),
+        Columna("Caducidad", _fecha('caducidad'), ancho=12),
+        Columna("Elaboración", _fecha('elaboracion'), ancho=12),
+        Columna("Tipo", 'tipo', ancho=15),
+        Columna("Categoría", 'Categorias.nombre', ancho=20),
+        Columna("Stock Actual", lambda p: p.stock_actual or 0, ancho=12),
+        Columna("Stock Mínimo", lambda p: p.stock_minimo or 0, ancho=12),
+        Columna("Stock Máximo", lambda p: p.stock_maximo or 0, ancho=12),
+        Columna("Presentación", 'presentacion', ancho=15),
+        Columna("Formato", 'formato', ancho=15),
+    )
+
+
+@registrar
+class ReporteCategorias(Reporte):
+    nombre = 'categorias'
+    titulo = 'Categorías'
+    archivo = 'categorias'
+    modelo = Categoria
+    permiso = 'catalogo.view_categoria'
+    columnas = (
+        Columna("ID", 'id', ancho=8),
+        Columna("Nombre", 'nombre', ancho=30),
+        Columna("Descripción", 'descripcion', ancho=50),
+    )
@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Categoria, Producto
+from .busqueda import PESOS_CAMPOS, indexar_producto
+from .trigramas import actualizar_vocabulario
+from .version import incrementar_version_catalogo, incrementar_version_nombres
+
+
+# --- Índice de búsqueda ---
+# Las filas de TerminoBusqueda se borran solas al eliminar un Producto
+# (on_delete=CASCADE); el vocabulario de trigramas se ajusta con la misma
+# diferencia que produce el reindexado incremental.
+@receiver(post_save, sender=Producto, dispatch_uid='catalogo_indexar_producto')
+def indexar_producto_guardado(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Un save(update_fields=['stock_actual']) no toca los campos indexados
+    if update_fields is not None and not set(update_fields) & set(PESOS_CAMPOS):
+        return
+    agregados, quitados = indexar_producto(instance)
+    if agregados or quitados:
+        actualizar_vocabulario(agregados, quitados)
+
+
+@receiver(pre_delete, sender=Producto, dispatch_uid='catalogo_terminos_antes_de_eliminar')
+def recordar_terminos_producto(sender, instance, **kwargs):
+    # Después del CASCADE ya no se sabe qué términos tenía el producto
+    instance._terminos_eliminados = list(instance.terminos.values_list('termino', flat=True))
+
+
+@receiver(post_delete, sender=Producto, dispatch_uid='catalogo_vocabulario_producto_eliminado')
+def podar_vocabulario(sender, instance, **kwargs):
+    quitados = getattr(instance, '_terminos_eliminados', None)
+    if quitados:
+        actualizar_vocabulario(quitados=quitados)
+
+
+# --- Versión del catálogo ---
+# Se incrementa al confirmar la transacción para que otro proceso no vuelva a
+# cachear datos viejos con la versión nueva antes del COMMIT.
+@receiver(post_save, sender=Producto, dispatch_uid='catalogo_version_producto_guardado')
+@receiver(post_delete, sender=Producto, dispatch_uid='catalogo_version_producto_eliminado')
+@receiver(post_save, sender=Categoria, dispatch_uid='catalogo_version_categoria_guardada')
+@receiver(post_delete, sender=Categoria, dispatch_uid='catalogo_version_categoria_eliminada')
+def invalidar_version_catalogo(sender, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(incrementar_version_catalogo)
+
+
+# --- Versión de nombres (autocompletado) ---
+# Solo cambia al crear, borrar o renombrar productos: las ventas, que tocan
+# el stock, no obligan a reconstruir el trie en cada worker.
+CAMPOS_NOMBRES = ('nombre', 'marca')
+
+
+@receiver(pre_save, sender=Producto, dispatch_uid='catalogo_nombres_antes_de_guardar')
+def recordar_nombre_marca(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_NOMBRES):
+        return
+    instance._nombres_previos = Producto.objects.filter(pk=instance.pk).values_list(*CAMPOS_NOMBRES).first()
+
+
+@receiver(post_save, sender=Producto, dispatch_uid='catalogo_version_nombres_guardado')
+def invalidar_version_nombres(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    # Sin '_nombres_previos' el save no incluía nombre ni marca
+    previos = instance.__dict__.pop('_nombres_previos', False)
+    if created or (previos is not False and previos != (instance.nombre, instance.marca)):
+        transaction.on_commit(incrementar_version_nombres)
+
+
+@receiver(post_delete, sender=Producto, dispatch_uid='catalogo_version_nombres_eliminado')
+def invalidar_version_nombres_eliminado(sender, **kwargs):
+    transaction.on_commit(incrementar_version_nombres)
@@ -0,0 +1,19 @@
+from django import template
+
+from catalogo.imagenes import fuentes_imagen
+
+register = template.Library()
+
+
+@register.inclusion_tag('catalogo/imagen_producto.html')
+def imagen_producto(producto, uso='card', clase=''):
+    """
+    Uso: {% imagen_producto producto 'card' 'producto-card-img' %}
+    Renderiza un <picture> con srcset WebP/JPEG de los derivados.
+    """
+    return {
+        'producto': producto,
+        'fuentes': fuentes_imagen(producto, uso),
+        'clase': clase,
+        'carga_diferida': uso == 'card',
+    }
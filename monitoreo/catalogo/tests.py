@@ -1,3 +1,347 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin import site
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from core.storage import es_inmutable
+from usuarios.models import Usuario
+
+from .admin import ProductoAdmin
+from .autocompletar import TriePrefijos, sugerencias
+from .busqueda import buscar, raiz, tokenizar
+from .facetas import NINGUNO, aplicar_filtros, calcular_facetas, enlaces_facetas, seleccion_desde_request
+from .forms import ProductoForm
+from .imagenes import generar_derivados, ruta_derivado
+from .importacion import ArchivoInvalido, importar_productos
+from .management.commands.seed_catalog_es import iterar_fixture
+from .models import (
+    Categoria, Nutricional, Producto, ProductoReglaAlerta, ReglaAlertaVencimiento, TerminoBusqueda,
+    TrigramaTermino,
+)
+from .trigramas import buscar_aproximado, fonetica, reconstruir_vocabulario
+from .version import version_nombres
+
+
+def crear_producto(nombre, **campos):
+    categoria, _ = Categoria.objects.get_or_create(nombre='Panadería')
+    valores = {
+        'precio': 1000, 'stock_actual': 10, 'tipo': 'Panadería',
+        'caducidad': date.today() + timedelta(days=10),
+    }
+    valores.update(campos)
+    return Producto.objects.create(
+        nombre=nombre, Categorias=categoria, Nutricional=Nutricional.objects.create(), **valores,
+    )
+
+
+class BusquedaTests(TestCase):
+    def setUp(self):
+        self.croissant = crear_producto('Croissant de mantequilla', marca='Fornería')
+        self.torta = crear_producto('Torta de chocolate', marca='Fornería')
+        self.kuchen = crear_producto('Kuchen de manzana', marca='Sureña')
+
+    def nombres(self, consulta):
+        return sorted(buscar(Producto.objects.all(), consulta).values_list('nombre', flat=True))
+
+    def test_raices(self):
+        self.assertEqual(raiz('tortitas'), raiz('torta'))
+        self.assertEqual(tokenizar('Té de las Tortas'), ['te', raiz('tortas')])
+
+    def test_prefijo_de_la_ultima_palabra(self):
+        self.assertEqual(self.nombres('croiss'), ['Croissant de mantequilla'])
+        self.assertEqual(self.nombres('Chocol'), ['Torta de chocolate'])
+
+    def test_todas_las_palabras(self):
+        self.assertEqual(self.nombres('forneria'), ['Croissant de mantequilla', 'Torta de chocolate'])
+        self.assertEqual(self.nombres('forneria chocolate'), ['Torta de chocolate'])
+        self.assertEqual(self.nombres('manzana chocolate'), [])
+
+    def test_relevancia_pondera_los_campos(self):
+        pan = crear_producto('Pan amasado', descripcion='Ideal con chocolate caliente')
+        resultado = list(buscar(Producto.objects.all(), 'chocolate').order_by('-relevancia', 'nombre'))
+        self.assertEqual(resultado, [self.torta, pan])
+
+    def test_senales_reindexan(self):
+        self.kuchen.nombre = 'Kuchen de frambuesa'
+        self.kuchen.save()
+        self.assertEqual(self.nombres('frambuesa'), ['Kuchen de frambuesa'])
+        self.assertEqual(self.nombres('manzana'), [])
+
+        # Guardar solo el stock no toca el índice
+        self.kuchen.stock_actual = 3
+        self.kuchen.save(update_fields=['stock_actual'])
+        self.assertTrue(TerminoBusqueda.objects.filter(producto=self.kuchen).exists())
+
+        self.kuchen.delete()
+        self.assertEqual(self.nombres('frambuesa'), [])
+
+
+class FacetasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sin_marca = crear_producto('Pan amasado', marca=None, precio=500)
+        crear_producto('Croissant', marca='Fornería', precio=1500)
+        crear_producto('Torta', marca='Fornería', precio=12000)
+
+    def facetas(self, querystring=''):
+        get = QueryDict(querystring)
+        seleccion = seleccion_desde_request(get)
+        facetas = enlaces_facetas(calcular_facetas(Producto.objects.all(), seleccion), get)
+        return facetas, aplicar_filtros(Producto.objects.all(), seleccion)
+
+    def test_conteos(self):
+        facetas, _ = self.facetas()
+        self.assertEqual(
+            {o['etiqueta']: o['conteo'] for o in facetas['marca']}, {'Fornería': 2, 'Sin marca': 1},
+        )
+        # Las demás facetas respetan la marca elegida; la propia no
+        facetas, productos = self.facetas('marca=Forner%C3%ADa')
+        self.assertEqual(productos.count(), 2)
+        self.assertEqual({o['valor'] for o in facetas['precio']}, {'1000-3000', '10000-'})
+        self.assertEqual(len(facetas['marca']), 2)
+
+    def test_sin_marca_se_puede_elegir(self):
+        facetas, _ = self.facetas()
+        opcion = next(o for o in facetas['marca'] if o['etiqueta'] == 'Sin marca')
+        self.assertEqual(opcion['valor'], NINGUNO)
+
+        facetas, productos = self.facetas(opcion['url'][1:])
+        self.assertEqual(list(productos), [self.sin_marca])
+        self.assertTrue(next(o for o in facetas['marca'] if o['valor'] == NINGUNO)['activo'])
+
+
+class AutocompletarTests(TestCase):
+    def test_trie_por_comienzo_de_palabra(self):
+        trie = TriePrefijos()
+        trie.insertar('Torta de Chocolate Belga', puntaje=2, dato=1)
+        trie.insertar('Chocolate caliente', puntaje=1, dato=2)
+        trie.compactar()
+
+        self.assertEqual([d for _, d in trie.sugerir('choco')], [1, 2])
+        self.assertEqual([d for _, d in trie.sugerir('Torta de ch')], [1])
+        self.assertEqual([d for _, d in trie.sugerir('chocolate bel')], [1])
+        self.assertEqual(trie.sugerir('xyz'), [])
+        # Solo palabras sueltas y el texto completo, no cada sufijo de frase
+        self.assertIsNone(trie._nodo('chocolate b'))
+
+    def test_sugerencias_sin_agotados(self):
+        cache.clear()
+        crear_producto('Pan de pascua', stock_actual=5)
+        crear_producto('Pan amasado', stock_actual=0)
+        # Todo su stock está reservado en carritos: ver_productos tampoco lo muestra
+        crear_producto('Pan integral', stock_actual=3, stock_reservado=3)
+        self.assertEqual([s['texto'] for s in sugerencias('pan')], ['Pan de pascua'])
+
+    def test_version_de_nombres(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            pan = crear_producto('Pan amasado')
+        version = version_nombres()
+
+        # Cambiar stock o precio no reconstruye el trie
+        with self.captureOnCommitCallbacks(execute=True):
+            pan.stock_actual = 1
+            pan.precio = 700
+            pan.save()
+            Producto.objects.filter(pk=pan.pk).update(stock_actual=0)
+        self.assertEqual(version_nombres(), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pan.nombre = 'Pan batido'
+            pan.save()
+        self.assertGreater(version_nombres(), version)
+
+
+class TrigramasTests(TestCase):
+    def setUp(self):
+        self.marraqueta = crear_producto('Marraqueta')
+        self.hallulla = crear_producto('Hallulla integral')
+
+    def test_corrige_errores_de_tipeo(self):
+        self.assertEqual(fonetica('marraketa'), fonetica('marraqueta'))
+        for consulta, esperado in (('marraketa', self.marraqueta), ('ayuya', self.hallulla), ('integrl', self.hallulla)):
+            productos, corregidos = buscar_aproximado(Producto.objects.all(), consulta)
+            self.assertEqual(list(productos), [esperado], consulta)
+            self.assertTrue(corregidos)
+
+        productos, corregidos = buscar_aproximado(Producto.objects.all(), 'zzzz')
+        self.assertEqual((list(productos), corregidos), ([], []))
+
+    def test_vocabulario_sigue_al_indice(self):
+        self.marraqueta.nombre = 'Coliza'
+        self.marraqueta.save()
+        self.assertFalse(TrigramaTermino.objects.filter(termino__startswith='marraquet').exists())
+        self.assertEqual(list(buscar_aproximado(Producto.objects.all(), 'colisa')[0]), [self.marraqueta])
+
+        TrigramaTermino.objects.all().delete()
+        self.assertGreater(reconstruir_vocabulario(), 0)
+        self.assertEqual(list(buscar_aproximado(Producto.objects.all(), 'ayuya')[0]), [self.hallulla])
+
+
+def imagen_png(ancho, alto, modo='RGBA'):
+    buffer = BytesIO()
+    Image.new(modo, (ancho, alto), (200, 120, 40, 128)[:len(modo)]).save(buffer, 'PNG')
+    return SimpleUploadedFile('torta.png', buffer.getvalue(), content_type='image/png')
+
+
+class DerivadosImagenTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta)
+        ajustes = override_settings(MEDIA_ROOT=carpeta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_genera_cada_ancho_y_formato(self):
+        nombre = default_storage.save('productos/torta.png', imagen_png(2000, 1000))
+        self.assertEqual(generar_derivados(nombre), [400, 800, 1600])
+        for ancho in (400, 800, 1600):
+            for extension in ('webp', 'jpg'):
+                with default_storage.open(ruta_derivado(nombre, ancho, extension)) as archivo:
+                    derivado = Image.open(archivo)
+                    self.assertEqual(derivado.size, (ancho, ancho // 2))
+        with default_storage.open(ruta_derivado(nombre, 400, 'jpg')) as archivo:
+            self.assertEqual(Image.open(archivo).mode, 'RGB')
+
+    def test_nunca_amplia(self):
+        nombre = default_storage.save('productos/chica.png', imagen_png(600, 300, 'RGB'))
+        self.assertEqual(generar_derivados(nombre), [400, 600])
+        self.assertFalse(default_storage.exists(ruta_derivado(nombre, 800, 'webp')))
+
+    def datos_formulario(self):
+        return {
+            'nombre': 'Torta de mil hojas', 'precio': 15000, 'tipo': 'Pastelería',
+            'caducidad': date.today() + timedelta(days=5),
+            'Categorias': Categoria.objects.create(nombre='Tortas').pk,
+            'Nutricional': Nutricional.objects.create().pk,
+            'stock_actual': 5, 'stock_minimo': 1, 'stock_maximo': 10,
+        }
+
+    def test_formulario_genera_derivados(self):
+        form = ProductoForm(self.datos_formulario(), {'imagen': imagen_png(1000, 500)})
+        self.assertTrue(form.is_valid(), form.errors)
+        producto = form.save()
+        producto.refresh_from_db()
+        self.assertEqual(producto.imagen_anchos, [400, 800, 1000])
+        self.assertTrue(es_inmutable(producto.imagen.name))
+        self.assertTrue(default_storage.exists(ruta_derivado(producto.imagen.name, 1000, 'webp')))
+
+        # Editar sin cambiar la imagen no la vuelve a procesar
+        form = ProductoForm(dict(self.datos_formulario(), stock_actual=3), instance=producto)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertNotIn('imagen', form.changed_data)
+
+    def test_admin_genera_derivados(self):
+        request = RequestFactory().post('/admin/catalogo/producto/add/')
+        request.user = Usuario.objects.create_superuser(
+            email='admin@forneria.cl', password='x', first_name='Ad', last_name='Min', run='99999999-9',
+        )
+        admin = ProductoAdmin(Producto, site)
+        form = admin.get_form(request)(self.datos_formulario(), {'imagen': imagen_png(500, 500)})
+        self.assertTrue(form.is_valid(), form.errors)
+        producto = form.save(commit=False)
+        admin.save_model(request, producto, form, change=False)
+        producto.refresh_from_db()
+        self.assertEqual(producto.imagen_anchos, [400, 500])
+
+
+class SiembraTests(TestCase):
+    def sembrar(self, *args):
+        call_command('seed_catalog_es', *args, stdout=StringIO())
+
+    def conteos(self):
+        return [m.objects.count() for m in (Nutricional, Categoria, ReglaAlertaVencimiento, Producto, ProductoReglaAlerta)]
+
+    def test_upsert_al_repetir(self):
+        self.sembrar()
+        conteos = self.conteos()
+        self.assertTrue(all(conteos), conteos)
+        producto = Producto.objects.order_by('pk').first()
+        nombre = producto.nombre
+        Producto.objects.filter(pk=producto.pk).update(nombre='Editado a mano')
+
+        # Sin --upsert las pk repetidas fallan y no se escribe nada
+        with self.assertRaises(CommandError):
+            self.sembrar()
+        self.assertEqual(Producto.objects.get(pk=producto.pk).nombre, 'Editado a mano')
+
+        self.sembrar('--upsert')
+        self.assertEqual(self.conteos(), conteos)
+        self.assertEqual(Producto.objects.get(pk=producto.pk).nombre, nombre)
+        self.assertEqual(buscar(Producto.objects.filter(pk=producto.pk), nombre).count(), 1)
+
+    def test_lee_el_fixture_por_bloques(self):
+        datos = [{'model': 'catalogo.categoria', 'pk': i, 'fields': {'nombre': f'Categoría {i}'}} for i in range(50)]
+        with mock.patch('catalogo.management.commands.seed_catalog_es.TAMANO_BLOQUE_LECTURA', 16):
+            self.assertEqual(list(iterar_fixture(StringIO(json.dumps(datos)))), datos)
+
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        self.existente = crear_producto('Pan amasado', marca='Fornería', precio=900)
+        self.nutricional = Nutricional.objects.create()
+
+    def importar(self, filas, **opciones):
+        texto = '\n'.join(';'.join(str(v) for v in fila) for fila in filas)
+        return importar_productos(BytesIO(texto.encode('utf-8-sig')), 'productos.csv', batch_size=3, **opciones)
+
+    def test_valida_cada_fila_y_reporta_errores(self):
+        caducidad = (date.today() + timedelta(days=5)).isoformat()
+        n = self.nutricional.pk
+        reporte = StringIO()
+        resultado = self.importar([
+            ['Nombre', 'Precio', 'Caducidad', 'Tipo', 'Categoría', 'Nutricional', 'Stock Mínimo', 'Stock Máximo', 'Columna rara'],
+            ['Kuchen de nuez', 4500, caducidad, 'Pastelería', 'panaderia', n, '', '', 'x'],
+            ['Precio negativo', -10, caducidad, 'Pastelería', 'Panadería', n, '', '', ''],
+            ['Sin categoría real', 100, caducidad, 'Pastelería', 'Juguetería', n, '', '', ''],
+            ['Sin categoría', 100, caducidad, 'Pastelería', '', n, '', '', ''],
+            ['Stock al revés', 100, caducidad, 'Pastelería', 'Panadería', n, 10, 5, ''],
+            ['', '', '', '', '', '', '', '', ''],
+        ], reporte=reporte)
+
+        self.assertEqual((resultado.leidas, resultado.creadas, resultado.total_errores), (5, 1, 5))
+        self.assertEqual(
+            [(fila, campo) for fila, campo, _ in resultado.errores],
+            # El stock al revés lo rechazan ProductoForm.clean y Producto.clean
+            [(3, 'precio'), (4, 'categoria'), (5, 'categoria'), (6, ''), (6, 'stock_minimo')],
+        )
+        self.assertIn('"Juguetería" no existe', resultado.errores[1][2])
+        self.assertEqual(len(reporte.getvalue().splitlines()), 6)
+
+        kuchen = Producto.objects.get(nombre='Kuchen de nuez')
+        self.assertEqual(kuchen.Categorias, self.existente.Categorias)
+        self.assertEqual(buscar(Producto.objects.all(), 'nuez').get(), kuchen)
+
+    def test_actualiza_solo_las_columnas_presentes(self):
+        resultado = self.importar([
+            ['ID', 'Precio'],
+            [self.existente.pk, 1200],
+            [999999, 1],
+        ])
+        self.assertEqual((resultado.actualizadas, resultado.total_errores), (1, 1))
+        self.assertEqual(resultado.errores[0][:2], (3, 'id'))
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.precio, self.existente.marca), (1200, 'Fornería'))
+
+    def test_solo_validar_no_escribe(self):
+        resultado = self.importar([['ID', 'Precio'], [self.existente.pk, 1]], solo_validar=True)
+        self.assertEqual((resultado.actualizadas, resultado.total_errores), (1, 0))
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.precio, 900)
+
+    def test_archivos_invalidos(self):
+        with self.assertRaises(ArchivoInvalido):
+            importar_productos(BytesIO(b'x'), 'productos.txt')
+        with self.assertRaises(ArchivoInvalido):
+            self.importar([['Precio', 'Tipo'], [1, 'x']])
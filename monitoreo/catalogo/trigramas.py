@@ -0,0 +1,208 @@
+"""
+Búsqueda tolerante a errores de tipeo basada en trigramas.
+
+En lugar de indexar los trigramas de cada producto (cientos por fila), se
+indexan los del *vocabulario*: las raíces distintas que ya existen en el
+índice invertido (TerminoBusqueda). Una búsqueda aproximada hace dos pasos:
+
+1. Para cada palabra de la consulta se buscan, vía el índice de trigramas,
+   los términos del vocabulario que comparten más trigramas con ella, y se
+   ordenan por similitud (Jaccard). El costo depende del tamaño de las listas
+   de esos trigramas, no de la cantidad de productos.
+2. Con los términos corregidos se consulta el índice invertido normal.
+
+Antes de generar trigramas se aplica una simplificación fonética del español
+(qu/c/k, ll/y, v/b, z/s, h muda, letras dobles) para que "marraketa" y
+"marraqueta" queden idénticas.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+
+from .busqueda import tokenizar
+from .models import TerminoBusqueda, TrigramaTermino
+
+UMBRAL_SIMILITUD = 0.3
+MAX_CANDIDATOS = 40
+MAX_CORRECCIONES = 3
+
+_REGLAS_FONETICAS = (
+    (re.compile(r'ch'), 'x'),
+    (re.compile(r'qu'), 'k'),
+    (re.compile(r'll'), 'y'),
+    (re.compile(r'c(?=[ei])'), 's'),
+    (re.compile(r'c'), 'k'),
+    (re.compile(r'v'), 'b'),
+    (re.compile(r'z'), 's'),
+    (re.compile(r'h'), ''),
+    (re.compile(r'(.)\1+'), r'\1'),
+)
+
+
+def fonetica(termino):
+    for patron, reemplazo in _REGLAS_FONETICAS:
+        termino = patron.sub(reemplazo, termino)
+    return termino
+
+
+def trigramas(termino):
+    """
+    Conjunto de trigramas con bordes ('$') de la forma fonética del término.
+    """
+    forma = f"${fonetica(termino)}$"
+    if len(forma) < 3:
+        return set()
+    return {forma[i:i + 3] for i in range(len(forma) - 2)}
+
+
+def similitud(a, b):
+    """
+    Índice de Jaccard entre los trigramas de dos términos (0 a 1).
+    """
+    ta, tb = trigramas(a), trigramas(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+# --------------------
+# Mantenimiento del vocabulario
+# --------------------
+
+def corregible(termino):
+    """
+    Solo las palabras de 3 o más letras entran al vocabulario: corregir
+    números o códigos ("500", "x2") no tiene sentido y los multiplica.
+    """
+    return len(termino) >= 3 and termino.isalpha()
+
+
+def _filas(terminos):
+    return [
+        TrigramaTermino(trigrama=trigrama, termino=termino)
+        for termino in terminos
+        if corregible(termino)
+        for trigrama in trigramas(termino)
+    ]
+
+
+def actualizar_vocabulario(agregados=(), quitados=()):
+    """
+    Aplica al índice de trigramas la diferencia producida por
+    busqueda.indexar_producto: registra los términos nuevos y elimina los que
+    ya no usa ningún producto.
+    """
+    with transaction.atomic():
+        agregados = [t for t in agregados if corregible(t)]
+        if agregados:
+            conocidos = set(
+                TrigramaTermino.objects.filter(termino__in=agregados)
+                .values_list('termino', flat=True).distinct()
+            )
+            TrigramaTermino.objects.bulk_create(
+                _filas(t for t in agregados if t not in conocidos),
+                ignore_conflicts=True,
+            )
+        if quitados:
+            en_uso = set(
+                TerminoBusqueda.objects.filter(termino__in=quitados)
+                .values_list('termino', flat=True).distinct()
+            )
+            huerfanos = [t for t in quitados if t not in en_uso]
+            if huerfanos:
+                TrigramaTermino.objects.filter(termino__in=huerfanos).delete()
+
+
+def reconstruir_vocabulario(batch_size=2000):
+    """
+    Regenera el índice de trigramas a partir del vocabulario completo del
+    índice invertido. Devuelve la cantidad de términos indexados.
+    """
+    terminos = (
+        TerminoBusqueda.objects.values_list('termino', flat=True)
+        .distinct().order_by('termino').iterator(chunk_size=batch_size)
+    )
+    total = 0
+    with transaction.atomic():
+        TrigramaTermino.objects.all().delete()
+        lote = []
+        for termino in terminos:
+            if not corregible(termino):
+                continue
+            lote.append(termino)
+            if len(lote) >= batch_size:
+                TrigramaTermino.objects.bulk_create(_filas(lote), batch_size=batch_size)
+                total += len(lote)
+                lote = []
+        if lote:
+            TrigramaTermino.objects.bulk_create(_filas(lote), batch_size=batch_size)
+            total += len(lote)
+    return total
+
+
+# --------------------
+# Consultas
+# --------------------
+
+def terminos_similares(termino, umbral=UMBRAL_SIMILITUD, limite=MAX_CORRECCIONES):
+    """
+    Devuelve [(termino_del_vocabulario, similitud)] ordenados de mayor a menor.
+    Los candidatos salen del índice (los que comparten más trigramas) y solo
+    a esos pocos se les calcula la similitud exacta.
+    """
+    consulta = trigramas(termino)
+    if not consulta:
+        return []
+    candidatos = (
+        TrigramaTermino.objects.filter(trigrama__in=consulta)
+        .values('termino')
+        .annotate(comunes=Count('id'))
+        .order_by('-comunes')[:MAX_CANDIDATOS]
+    )
+    puntuados = [(c['termino'], similitud(termino, c['termino'])) for c in candidatos]
+    puntuados = [(t, s) for t, s in puntuados if s >= umbral]
+    puntuados.sort(key=lambda par: (-par[1], par[0]))
+    return puntuados[:limite]
+
+
+def correcciones(consulta):
+    """
+    Mapa {termino_corregido: similitud} para todas las palabras de la consulta.
+    """
+    resultado = {}
+    for termino in dict.fromkeys(tokenizar(consulta)):
+        for similar, puntaje in terminos_similares(termino):
+            resultado[similar] = max(puntaje, resultado.get(similar, 0))
+    return resultado
+
+
+def buscar_aproximado(queryset, consulta):
+    """
+    Igual que busqueda.buscar pero tolerante a errores de tipeo. Devuelve
+    (queryset anotado con `relevancia`, lista de términos corregidos).
+    La relevancia pondera el peso del término por su similitud.
+    """
+    similares = correcciones(consulta)
+    if not similares:
+        return queryset.none().annotate(relevancia=Value(0, output_field=IntegerField())), []
+
+    ponderacion = Case(
+        *[
+            When(termino=termino, then=F('peso') * Value(round(puntaje * 100)))
+            for termino, puntaje in similares.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    coincidencias = TerminoBusqueda.objects.filter(termino__in=list(similares))
+    relevancia = (
+        coincidencias.filter(producto=OuterRef('pk'))
+        .values('producto')
+        .annotate(total=Sum(ponderacion))
+        .values('total')
+    )
+    queryset = queryset.filter(
+        pk__in=coincidencias.values('producto_id')
+    ).annotate(relevancia=Subquery(relevancia, output_field=IntegerField()))
+    return queryset, sorted(similares, key=similares.get, reverse=True)
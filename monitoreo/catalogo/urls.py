@@ -14,6 +14,7 @@ urlpatterns = [
     # Productos
     path('producto/', views.producto_list, name='producto_list'),
     path('producto/nuevo/', views.producto_create, name='producto_create'),
+    path('producto/importar/', views.producto_import, name='producto_import'),
     path('producto/<int:pk>/editar/', views.producto_update, name='producto_update'),
     path('producto/<int:pk>/eliminar/', views.producto_delete, name='producto_delete'),
     path('producto/<int:pk>/', views.producto_detail, name='producto_detail'),
@@ -0,0 +1,62 @@
+"""
+Contador de versión del catálogo.
+
+Cada vez que cambia un Producto o una Categoria se incrementa el contador.
+Las ventas y reservas solo lo mueven cuando un producto se agota o vuelve a
+estar disponible (ver facetas.invalidar_si_cambia_disponibilidad).
+Las cachés derivadas del catálogo (facetas, autocompletado, ...) incluyen la
+versión en su clave, de modo que se invalidan solas sin tener que buscar y
+borrar cada entrada. El autocompletado usa un contador aparte
+(version_nombres) que no se mueve con los cambios de stock.
+"""
+from django.core.cache import cache
+
+CLAVE_VERSION = 'catalogo:version'
+# Solo nombres y marcas (autocompletado): no cambia con cada venta de stock
+CLAVE_VERSION_NOMBRES = 'catalogo:version:nombres'
+
+
+def _version(clave):
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, 1, timeout=None)
+        version = cache.get(clave, 1)
+    return version
+
+
+def _incrementar(clave):
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave no existía (caché reiniciada): arrancamos en 2 para que
+        # ninguna entrada guardada con la versión 1 se reutilice.
+        cache.add(clave, 2, timeout=None)
+        return cache.get(clave, 2)
+
+
+def version_catalogo():
+    """
+    Devuelve la versión actual (empieza en 1 si la caché está vacía).
+    """
+    return _version(CLAVE_VERSION)
+
+
+def incrementar_version_catalogo():
+    """
+    Incrementa la versión de forma atómica. Se llama desde las señales de
+    Producto/Categoria y desde cualquier escritura masiva (update(),
+    bulk_create()) que no dispare señales.
+    """
+    return _incrementar(CLAVE_VERSION)
+
+
+def version_nombres():
+    """
+    Versión del conjunto de productos y de sus nombres y marcas. Cambia al
+    crear, borrar o renombrar productos, no al vender ni reponer stock.
+    """
+    return _version(CLAVE_VERSION_NOMBRES)
+
+
+def incrementar_version_nombres():
+    return _incrementar(CLAVE_VERSION_NOMBRES)
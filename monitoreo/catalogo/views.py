@@ -2,13 +2,12 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.contrib import messages
-from django.http import HttpResponse
-
-import openpyxl
-from openpyxl.utils import get_column_letter
 
 from .models import Categoria, Producto
-from .forms import ProductoForm, CategoriaForm
+from .forms import ProductoForm, CategoriaForm, ImportarProductosForm
+from .importacion import ArchivoInvalido, importar_productos
+from core.paginacion import KeysetPaginator
+from reportes.exportacion import exportar
 from django.contrib.auth.decorators import login_required, permission_required
 # ----------------------------------------
 # VISTAS CRUD
@@ -23,11 +22,9 @@ def categoria_list(request):
     if nombre_filtro:
         categorias = categorias.filter(nombre__icontains=nombre_filtro)
 
-    # PAGINACIÓN
-    from django.core.paginator import Paginator
-    paginator = Paginator(categorias, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # PAGINACIÓN (por cursor, sin COUNT ni OFFSET)
+    paginator = KeysetPaginator(categorias, ['id'], 10, contar='aprox')
+    page_obj = paginator.pagina(request.GET.get('cursor'))
 
     return render(request, 'catalogo/categoria_list.html', {'page_obj': page_obj, 'nombre_filtro': nombre_filtro})
 
@@ -79,10 +76,8 @@ def producto_list(request):
     if nombre_filtro:
         productos = productos.filter(nombre__icontains=nombre_filtro)
 
-    from django.core.paginator import Paginator
-    paginator = Paginator(productos, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(productos, ['id'], 10, contar='aprox')
+    page_obj = paginator.pagina(request.GET.get('cursor'))
 
     return render(request, 'catalogo/producto_list.html', {'page_obj': page_obj, 'nombre_filtro': nombre_filtro})
 
@@ -98,15 +93,39 @@ def producto_create(request):
     if request.method == 'POST':
         form = ProductoForm(request.POST, request.FILES)
         if form.is_valid():
-            producto = form.save(commit=False)
-            producto.creado = timezone.now()
-            producto.save()
+            form.instance.creado = timezone.now()
+            form.save()
             messages.success(request, 'Producto creado exitosamente.')
             return redirect('catalogo:producto_list')
     else:
         form = ProductoForm()
     return render(request, 'catalogo/producto_form.html', {'form': form})
 
+@login_required
+@permission_required('catalogo.add_producto', raise_exception=True)
+def producto_import(request):
+    resultado, solo_validar = None, False
+    form = ImportarProductosForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        archivo = form.cleaned_data['archivo']
+        solo_validar = form.cleaned_data['solo_validar']
+        try:
+            resultado = importar_productos(archivo, archivo.name, solo_validar=solo_validar)
+        except ArchivoInvalido as e:
+            form.add_error('archivo', str(e))
+        else:
+            if not solo_validar and (resultado.creadas or resultado.actualizadas):
+                messages.success(
+                    request,
+                    f'Importación terminada: {resultado.creadas} productos nuevos y '
+                    f'{resultado.actualizadas} actualizados.',
+                )
+    return render(request, 'catalogo/producto_import.html', {
+        'form': form,
+        'resultado': resultado,
+        'solo_validar': solo_validar,
+    })
+
 @login_required
 @permission_required('catalogo.change_producto', raise_exception=True)
 def producto_update(request, pk):
@@ -114,9 +133,7 @@ def producto_update(request, pk):
     if request.method == 'POST':
         form = ProductoForm(request.POST, request.FILES, instance=producto)
         if form.is_valid():
-            producto_actualizado = form.save(commit=False)
-            producto_actualizado.modificado = timezone.now()
-            producto_actualizado.save()
+            form.save()
             messages.success(request, 'Producto actualizado exitosamente.')
             return redirect('catalogo:producto_list')
     else:
@@ -136,78 +153,14 @@ def producto_delete(request, pk):
 
 
 # ----------------------------------------
-# EXPORTACIÓN A EXCEL
+# EXPORTACIÓN A EXCEL (o CSV con ?formato=csv)
 # ----------------------------------------
 @login_required
 @permission_required('catalogo.view_producto', raise_exception=True)
 def producto_export_excel(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Productos"
-
-    headers = [
-        "ID", "Nombre", "Descripción", "Marca", "Precio", 
-        "Caducidad", "Elaboración", "Tipo", "Categoría", 
-        "Stock Actual", "Stock Mínimo", "Stock Máximo", 
-        "Presentación", "Formato"
-    ]
-    ws.append(headers)
-
-    productos = Producto.objects.all().select_related('Categorias')
-    for p in productos:
-        ws.append([
-            p.id,
-            p.nombre,
-            p.descripcion or "",
-            p.marca or "",
-            p.precio or 0,
-            p.caducidad.strftime("%Y-%m-%d") if p.caducidad else "",
-            p.elaboracion.strftime("%Y-%m-%d") if p.elaboracion else "",
-            p.tipo,
-            p.Categorias.nombre if p.Categorias else "",
-            p.stock_actual or 0,
-            p.stock_minimo or 0,
-            p.stock_maximo or 0,
-            p.presentacion or "",
-            p.formato or "",
-        ])
-
-    for i, col in enumerate(ws.columns, 1):
-        max_length = max(len(str(cell.value)) for cell in col)
-        ws.column_dimensions[get_column_letter(i)].width = max_length + 2
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response['Content-Disposition'] = 'attachment; filename=productos.xlsx'
-    wb.save(response)
-    return response
+    return exportar('productos', request.GET.get('formato'))
 
 @login_required
 @permission_required('catalogo.view_categoria', raise_exception=True)
 def categoria_export_excel(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Categorías"
-
-    headers = ["ID", "Nombre", "Descripción"]
-    ws.append(headers)
-
-    categorias = Categoria.objects.all()
-    for c in categorias:
-        ws.append([
-            c.id,
-            c.nombre,
-            c.descripcion or "",
-        ])
-
-    for i, col in enumerate(ws.columns, 1):
-        max_length = max(len(str(cell.value)) for cell in col)
-        ws.column_dimensions[get_column_letter(i)].width = max_length + 2
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response['Content-Disposition'] = 'attachment; filename=categorias.xlsx'
-    wb.save(response)
-    return response
+    return exportar('categorias', request.GET.get('formato'))
@@ -3,4 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'core'
\ No newline at end of file
+    name = 'core'
+    def ready(self):
+        # Invalidación de la caché de widgets del dashboard
+        from . import eventos, widgets
+        widgets.conectar_senales()
+        # Despertar el productor de eventos en vivo (/dashboard/eventos/)
+        eventos.conectar_senales()
@@ -0,0 +1,287 @@
+"""
+Eventos en vivo del dashboard (Server-Sent Events, /dashboard/eventos/).
+
+Un solo productor por proceso (el hilo 'eventos-dashboard') saca cada
+DASHBOARD_EVENTOS_INTERVALO segundos una foto de lo que el dashboard
+vigila: los pedidos pendientes, los productos con stock_actual en o bajo
+su stock_minimo y los que entran en su ventana de vencimiento (ver
+pedidos/alertas.py). Compara la foto con la anterior y reparte solo las
+diferencias a todos los suscriptores. Así N dashboards abiertos cuestan
+las mismas pocas consultas que uno, y sin suscriptores el hilo termina y
+no consulta nada.
+
+Guardar un Pedido o un Producto despierta al productor al confirmar la
+transacción. Los cambios hechos con update() (descuento de stock del
+checkout, cancelaciones) no disparan señales y se ven en la vuelta
+siguiente.
+
+Cada suscriptor entrega los eventos a su manera: una asyncio.Queue bajo
+ASGI (flujo_asgi) o una queue.Queue en un hilo propio bajo WSGI
+(flujo_wsgi). Bajo WSGI cada dashboard abierto ocupa un hilo del servidor
+mientras dura el flujo: unas pocas pestañas pueden agotar un pool síncrono
+de gunicorn. Por eso la vista solo lo sirve con DASHBOARD_EVENTOS_WSGI
+(pensado para runserver) y si no responde 204, que el navegador entiende
+como "no reconectar".
+
+Todo flujo se cierra a los DASHBOARD_EVENTOS_DURACION segundos; el campo
+`retry:` indica al navegador cuándo reconectar, y al reconectar recibe de
+nuevo el evento 'estado' con los totales.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import date
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models import F, Max
+from django.db.models.signals import post_save
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se manda un comentario para que proxies y navegadores no
+# cierren la conexión por inactividad (segundos)
+KEEPALIVE = 15
+# Espera del navegador antes de reconectar un flujo cerrado (milisegundos)
+REINTENTO_MS = 3000
+# Eventos que se guardan por suscriptor lento antes de descartar los viejos
+MAX_PENDIENTES = 100
+# Pedidos nuevos que se mandan en un solo evento
+MAX_PEDIDOS_NUEVOS = 20
+
+
+# ----------------------------------------
+# FOTO Y DIFERENCIAS
+# ----------------------------------------
+def tomar_foto(ultimo_pedido=None):
+    """
+    Estado actual de lo que vigila el dashboard. `ultimo_pedido` es el id
+    más alto de la foto anterior: los pendientes por encima son nuevos.
+    """
+    from pedidos.alertas import productos_por_vencer
+
+    ResumenPedido = apps.get_model('pedidos', 'ResumenPedido')
+    Producto = apps.get_model('catalogo', 'Producto')
+    hoy = date.today()
+
+    pendientes = ResumenPedido.objects.filter(estado='Pendiente')
+    nuevos = []
+    if ultimo_pedido is not None:
+        nuevos = list(
+            pendientes.filter(pk__gt=ultimo_pedido).order_by('pk')
+            .values('pedido_id', 'cliente', 'total', 'fecha_pedido')[:MAX_PEDIDOS_NUEVOS]
+        )
+    return {
+        'pendientes': pendientes.count(),
+        'ultimo_pedido': ResumenPedido.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0,
+        'pedidos_nuevos': nuevos,
+        'bajo_minimo': {
+            p['pk']: p for p in Producto.objects.filter(
+                stock_minimo__isnull=False, stock_actual__lte=F('stock_minimo'),
+            ).values('pk', 'nombre', 'stock_actual', 'stock_minimo')
+        },
+        'por_vencer': {
+            p['pk']: p for p in productos_por_vencer(hoy).values('pk', 'nombre', 'marca', 'caducidad')
+        },
+    }
+
+
+def diferencias(anterior, actual):
+    """
+    Eventos (nombre, datos) que llevan de la foto `anterior` a `actual`.
+    """
+    eventos = []
+    if actual['pedidos_nuevos'] or actual['pendientes'] != anterior['pendientes']:
+        eventos.append(('pedidos', {
+            'pendientes': actual['pendientes'],
+            'nuevos': actual['pedidos_nuevos'],
+        }))
+
+    bajo = [p for pk, p in actual['bajo_minimo'].items() if pk not in anterior['bajo_minimo']]
+    repuestos = [p for pk, p in anterior['bajo_minimo'].items() if pk not in actual['bajo_minimo']]
+    if bajo or repuestos:
+        eventos.append(('stock', {'bajo_minimo': bajo, 'repuestos': repuestos}))
+
+    por_vencer = [p for pk, p in actual['por_vencer'].items() if pk not in anterior['por_vencer']]
+    if por_vencer:
+        eventos.append(('por_vencer', {'nuevos': por_vencer, 'total': len(actual['por_vencer'])}))
+    return eventos
+
+
+def resumen(foto):
+    # Primer evento de cada suscriptor: los totales, sin detalle
+    return {
+        'pendientes': foto['pendientes'],
+        'bajo_minimo': len(foto['bajo_minimo']),
+        'por_vencer': len(foto['por_vencer']),
+    }
+
+
+# ----------------------------------------
+# DIFUSOR
+# ----------------------------------------
+class Difusor:
+    """
+    Productor único que reparte los eventos a los suscriptores. Un
+    suscriptor es una función `entregar((nombre, datos))` que no bloquea.
+    """
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self._suscriptores = {}
+        self._siguiente = 0
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._foto = None
+
+    def suscribir(self, entregar):
+        with self._lock:
+            self._siguiente += 1
+            self._suscriptores[self._siguiente] = entregar
+            if self._foto is not None:
+                entregar(('estado', resumen(self._foto)))
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name='eventos-dashboard', daemon=True)
+                self._hilo.start()
+            return self._siguiente
+
+    def desuscribir(self, clave):
+        with self._lock:
+            self._suscriptores.pop(clave, None)
+
+    def notificar(self):
+        self._despertar.set()
+
+    def publicar(self, evento):
+        with self._lock:
+            suscriptores = list(self._suscriptores.items())
+        caidos = []
+        for clave, entregar in suscriptores:
+            try:
+                entregar(evento)
+            except Exception:
+                # P. ej. RuntimeError de call_soon_threadsafe si el loop del
+                # cliente ya se cerró: no debe dejar sin el evento al resto
+                logger.warning("Se descarta un suscriptor de eventos del dashboard", exc_info=True)
+                caidos.append(clave)
+        if caidos:
+            with self._lock:
+                for clave in caidos:
+                    self._suscriptores.pop(clave, None)
+
+    def vuelta(self):
+        """
+        Saca una foto y publica las diferencias con la anterior.
+        """
+        close_old_connections()
+        try:
+            anterior = self._foto
+            actual = tomar_foto(anterior['ultimo_pedido'] if anterior else None)
+        finally:
+            close_old_connections()
+        self._foto = actual
+        if anterior is None:
+            self.publicar(('estado', resumen(actual)))
+        else:
+            for evento in diferencias(anterior, actual):
+                self.publicar(evento)
+
+    def _ciclo(self):
+        while True:
+            with self._lock:
+                if not self._suscriptores:
+                    # La foto queda vieja: el próximo hilo parte de cero
+                    self._hilo = None
+                    self._foto = None
+                    return
+            try:
+                self.vuelta()
+            except Exception:
+                # Un error de base no debe matar el productor de todos
+                logger.exception("Falló la foto de eventos del dashboard")
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+
+difusor = Difusor(getattr(settings, 'DASHBOARD_EVENTOS_INTERVALO', 5))
+
+
+def _al_guardar(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    transaction.on_commit(difusor.notificar)
+
+
+def conectar_senales():
+    """
+    Despierta al productor cuando se guarda un pedido o un producto. Se
+    llama desde CoreConfig.ready().
+    """
+    for etiqueta in ('pedidos.Pedido', 'catalogo.Producto'):
+        post_save.connect(_al_guardar, sender=apps.get_model(etiqueta), dispatch_uid=f'core_eventos_{etiqueta}')
+
+
+# ----------------------------------------
+# FLUJOS SSE
+# ----------------------------------------
+def formato_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _encolar(cola, evento):
+    # Un cliente lento pierde los eventos más viejos, no frena a los demás
+    while True:
+        try:
+            cola.put_nowait(evento)
+            return
+        except (asyncio.QueueFull, queue.Full):
+            try:
+                cola.get_nowait()
+            except (asyncio.QueueEmpty, queue.Empty):
+                pass
+
+
+def duracion_flujo():
+    return getattr(settings, 'DASHBOARD_EVENTOS_DURACION', 5 * 60)
+
+
+async def flujo_asgi(duracion=None):
+    cola = asyncio.Queue(maxsize=MAX_PENDIENTES)
+    loop = asyncio.get_running_loop()
+    fin = loop.time() + (duracion_flujo() if duracion is None else duracion)
+    clave = difusor.suscribir(lambda evento: loop.call_soon_threadsafe(_encolar, cola, evento))
+    try:
+        yield f"retry: {REINTENTO_MS}\n\n"
+        while (restante := fin - loop.time()) > 0:
+            try:
+                evento = await asyncio.wait_for(cola.get(), min(KEEPALIVE, restante))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield formato_sse(*evento)
+    finally:
+        difusor.desuscribir(clave)
+
+
+def flujo_wsgi(duracion=None):
+    cola = queue.Queue(maxsize=MAX_PENDIENTES)
+    fin = time.monotonic() + (duracion_flujo() if duracion is None else duracion)
+    clave = difusor.suscribir(partial(_encolar, cola))
+    try:
+        yield f"retry: {REINTENTO_MS}\n\n"
+        while (restante := fin - time.monotonic()) > 0:
+            try:
+                evento = cola.get(timeout=min(KEEPALIVE, restante))
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield formato_sse(*evento)
+    finally:
+        difusor.desuscribir(clave)
@@ -0,0 +1,95 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+from catalogo.management.commands._bench import cronometrar
+from core import widgets
+from core.views import WIDGETS_DASHBOARD
+from usuarios.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el dashboard síncrono (WSGI, widgets uno tras otro) con el '
+        'asíncrono (ASGI, widgets en paralelo), siempre sin caché.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument(
+            '--latencia-ms', type=float, default=0,
+            help='Espera agregada a cada consulta, para simular una base remota (por defecto 0).',
+        )
+        parser.add_argument('--email', help='Usuario con el que se entra (por defecto, el primer superusuario).')
+
+    def handle(self, *args, **options):
+        usuarios = Usuario.objects.filter(is_active=True)
+        if options['email']:
+            usuario = usuarios.filter(email=options['email']).first()
+        else:
+            usuario = usuarios.filter(is_superuser=True).order_by('pk').first()
+        if usuario is None:
+            raise CommandError("✖ No hay un usuario con el que entrar al dashboard (use --email).")
+
+        latencia = options['latencia_ms'] / 1000
+
+        def dormir(execute, sql, params, many, context):
+            time.sleep(latencia)
+            return execute(sql, params, many, context)
+
+        def agregar_latencia(sender, connection, **kwargs):
+            # Las conexiones de los hilos de widgets se abren después
+            if dormir not in connection.execute_wrappers:
+                connection.execute_wrappers.append(dormir)
+
+        if latencia:
+            connection.execute_wrappers.append(dormir)
+            connection_created.connect(agregar_latencia, dispatch_uid='bench_dashboard_latencia')
+
+        setup_test_environment()
+        sincrono, asincrono = Client(), AsyncClient()
+        sincrono.force_login(usuario)
+        asincrono.force_login(usuario)
+
+        def pedir(get, url):
+            def funcion():
+                widgets.invalidar(*WIDGETS_DASHBOARD)
+                respuesta = get(url)
+                if respuesta.status_code != 200:
+                    raise CommandError(f"✖ {url} respondió {respuesta.status_code}.")
+            return funcion
+
+        resultados = {
+            'WSGI  /dashboard/': pedir(sincrono.get, reverse('core:dashboard')),
+            'ASGI  /dashboard/async/': pedir(async_to_sync(asincrono.get), reverse('core:dashboard_async')),
+        }
+        # Calentamiento: plantillas, conexiones y pool de hilos
+        for funcion in resultados.values():
+            funcion()
+
+        self.stdout.write(
+            f"Dashboard sin caché, {options['repeticiones']} repeticiones, "
+            f"latencia extra {options['latencia_ms']:g} ms por consulta:"
+        )
+        for etiqueta, funcion in resultados.items():
+            mediana, p95 = cronometrar(funcion, options['repeticiones'])
+            self.stdout.write(f"  {etiqueta:<24} mediana {mediana:8.1f} ms   p95 {p95:8.1f} ms")
+
+        tiempos = {}
+        for widget in widgets.widgets_registrados():
+            inicio = time.perf_counter()
+            widget.calcular()
+            tiempos[widget.nombre] = (time.perf_counter() - inicio) * 1000
+        lento = max(tiempos, key=tiempos.get)
+        self.stdout.write(
+            f"  Widgets por separado: suma {sum(tiempos.values()):.1f} ms, "
+            f"el más lento {lento} {tiempos[lento]:.1f} ms"
+        )
+        connection_created.disconnect(dispatch_uid='bench_dashboard_latencia')
+        self.stdout.write(self.style.SUCCESS("✔ Benchmark terminado."))
@@ -0,0 +1,99 @@
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalogo.models import Producto
+from catalogo.version import incrementar_version_catalogo
+from core.storage import CARPETA_CONTENIDO, almacenamiento_contenido, huella, nombre_por_contenido
+from usuarios.models import Usuario
+
+# (modelo, campo, campos extra a reiniciar al cambiar el archivo)
+CAMPOS = (
+    (Producto, 'imagen', {'imagen_anchos': []}),
+    (Usuario, 'avatar', {}),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve las imágenes existentes (Producto.imagen, Usuario.avatar) al '
+        'almacenamiento direccionado por contenido, deduplicando archivos idénticos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=500,
+            help='Filas por bloque (lectura + bulk_update en una transacción). Por defecto 500.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo calcula las huellas y muestra cuánto se deduplicaría.',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        # nombre antiguo -> nombre nuevo; un mismo archivo referenciado por
+        # varias filas se lee y se guarda una sola vez
+        equivalencias = {}
+        for modelo, campo, reinicio in CAMPOS:
+            migradas, faltantes = self.migrar(modelo, campo, reinicio, equivalencias, options)
+            self.stdout.write(
+                f"  {modelo.__name__}.{campo}: {migradas} filas"
+                + (f", {faltantes} con archivo inexistente" if faltantes else "")
+            )
+
+        blobs = len(set(equivalencias.values()))
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ {len(equivalencias)} archivos -> {blobs} blobs únicos "
+            f"en {time.perf_counter() - inicio:.2f}s."
+            + (" (simulación, no se escribió nada)" if options['dry_run'] else "")
+        ))
+        if not options['dry_run']:
+            incrementar_version_catalogo()
+            self.stdout.write(
+                "Los archivos originales no se borran: ejecute el recolector de media, "
+                "y generar_derivados para las imágenes de producto."
+            )
+
+    def migrar(self, modelo, campo, reinicio, equivalencias, options):
+        pendientes = (
+            modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+            .exclude(**{f'{campo}__startswith': f'{CARPETA_CONTENIDO}/'})
+        )
+        migradas = faltantes = 0
+        ultimo_pk = None
+        while True:
+            # Avance por pk (keyset): las filas ya migradas salen del filtro,
+            # así que un OFFSET se saltaría registros
+            lote = pendientes.order_by('pk')
+            if ultimo_pk is not None:
+                lote = lote.filter(pk__gt=ultimo_pk)
+            filas = list(lote.values_list('pk', campo)[:options['batch']])
+            if not filas:
+                break
+            ultimo_pk = filas[-1][0]
+
+            cambios = []
+            for pk, nombre in filas:
+                nuevo = equivalencias.get(nombre) or self.copiar(nombre, options['dry_run'])
+                if nuevo is None:
+                    faltantes += 1
+                    continue
+                equivalencias[nombre] = nuevo
+                cambios.append(modelo(pk=pk, **{campo: nuevo}, **reinicio))
+
+            if cambios and not options['dry_run']:
+                with transaction.atomic():
+                    modelo.objects.bulk_update(cambios, [campo, *reinicio])
+            migradas += len(cambios)
+        return migradas, faltantes
+
+    def copiar(self, nombre, simulacion):
+        if not default_storage.exists(nombre):
+            return None
+        with default_storage.open(nombre, 'rb') as archivo:
+            if simulacion:
+                return nombre_por_contenido(huella(archivo), nombre)
+            return almacenamiento_contenido.save(nombre, archivo)
@@ -0,0 +1,101 @@
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.recoleccion import CARPETA_CUARENTENA, cargar_referencias, clave_referencia, recorrer, referenciada
+
+
+class Command(BaseCommand):
+    help = (
+        'Busca en MEDIA_ROOT archivos que ninguna fila referencia (imágenes de '
+        'productos y avatares reemplazados o eliminados, y sus derivados) y los '
+        'mueve a cuarentena o los borra.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Solo lista los huérfanos, no mueve ni borra nada.',
+        )
+        parser.add_argument(
+            '--borrar', action='store_true',
+            help=f'Borra los huérfanos en vez de moverlos a MEDIA_ROOT/{CARPETA_CUARENTENA}/.',
+        )
+        parser.add_argument(
+            '--gracia-horas', type=float, default=24,
+            help='No toca archivos modificados hace menos de N horas (subidas en curso). Por defecto 24.',
+        )
+        parser.add_argument(
+            '--max-por-segundo', type=float, default=0,
+            help='Limita las operaciones de disco (mover/borrar) por segundo. 0 = sin límite.',
+        )
+        parser.add_argument(
+            '--tasa-error', type=float, default=0.001,
+            help='Tasa de falsos positivos del filtro de referencias (huérfanos que se conservan).',
+        )
+
+    def sigue_viejo(self, ruta, corte):
+        try:
+            return os.stat(ruta, follow_symlinks=False).st_mtime <= corte
+        except FileNotFoundError:
+            return False
+
+    def handle(self, *args, **options):
+        raiz = str(settings.MEDIA_ROOT)
+        inicio = time.perf_counter()
+        # El corte se toma ANTES de leer la base: un archivo subido durante la
+        # lectura es más nuevo que el corte y queda protegido por la gracia
+        corte = time.time() - options['gracia_horas'] * 3600
+
+        referencias = cargar_referencias(options['tasa_error'])
+        self.stdout.write(
+            f"Referencias cargadas en {time.perf_counter() - inicio:.2f}s "
+            f"(filtro de {referencias.tamano_bytes / 1024:.0f} KiB)."
+        )
+
+        destino = os.path.join(raiz, CARPETA_CUARENTENA, time.strftime('%Y%m%d-%H%M%S'))
+        intervalo = 1 / options['max_por_segundo'] if options['max_por_segundo'] > 0 else 0
+        revisados = huerfanos = liberados = 0
+        proxima = time.monotonic()
+
+        for ruta, entrada in recorrer(raiz):
+            revisados += 1
+            if clave_referencia(ruta) in referencias:
+                continue
+            info = entrada.stat(follow_symlinks=False)
+            if info.st_mtime > corte:
+                continue
+
+            if not options['dry_run'] and intervalo:
+                espera = proxima - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                proxima = max(proxima, time.monotonic()) + intervalo
+
+            # Justo antes de tocarlo se confirma que sigue huérfano: una fila
+            # pudo asignarlo después de cargar las referencias, o una subida
+            # repetida renovó su fecha (ver core/storage.py)
+            if referenciada(ruta) or not self.sigue_viejo(entrada.path, corte):
+                continue
+
+            huerfanos += 1
+            liberados += info.st_size
+            if options['dry_run']:
+                self.stdout.write(f"  {ruta} ({info.st_size} bytes)")
+            elif options['borrar']:
+                os.remove(entrada.path)
+            else:
+                nuevo = os.path.join(destino, ruta)
+                os.makedirs(os.path.dirname(nuevo), exist_ok=True)
+                shutil.move(entrada.path, nuevo)
+
+        accion = 'encontrados' if options['dry_run'] else ('borrados' if options['borrar'] else 'en cuarentena')
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ {revisados} archivos revisados, {huerfanos} huérfanos {accion} "
+            f"({liberados / 1024 / 1024:.1f} MiB) en {time.perf_counter() - inicio:.2f}s."
+        ))
+        if huerfanos and not options['dry_run'] and not options['borrar']:
+            self.stdout.write(f"Cuarentena: {destino}")
@@ -0,0 +1,200 @@
+"""
+Paginación por cursor (keyset / "seek") reutilizable por las vistas de listado.
+
+A diferencia de `django.core.paginator.Paginator`, no ejecuta `COUNT(*)` ni
+`OFFSET`: cada página se obtiene con un `WHERE (orden) > (valores del último
+registro)` + `LIMIT`, así que la página 1.000 cuesta lo mismo que la primera.
+Los cursores viajan en la URL como tokens opacos (base64 de JSON).
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+
+ADELANTE = 's'
+ATRAS = 'a'
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def _serializar(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(orden, valores, direccion):
+    datos = json.dumps(
+        {'o': ','.join(orden), 'v': [_serializar(v) for v in valores], 'd': direccion},
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(orden, token):
+    """
+    Devuelve (valores, direccion) del token. Falla con CursorInvalido si el
+    token está corrupto o se generó para otro orden (p. ej. el usuario
+    cambió de "Precio" a "Nombre" manteniendo el cursor en la URL).
+    """
+    try:
+        relleno = '=' * (-len(token) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(token + relleno))
+        firma, valores, direccion = datos['o'], datos['v'], datos['d']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise CursorInvalido(token)
+    if (
+        firma != ','.join(orden)
+        or direccion not in (ADELANTE, ATRAS)
+        or not isinstance(valores, list)
+        or len(valores) != len(orden)
+    ):
+        raise CursorInvalido(token)
+    return valores, direccion
+
+
+class PaginaKeyset:
+    """
+    Página de resultados. Expone los mismos nombres que `Page` de Django que
+    usan los templates (`has_next`, `has_previous`, `has_other_pages`) más los
+    cursores para construir los enlaces.
+    """
+
+    def __init__(self, objetos, cursor_anterior, cursor_siguiente, conteo=None, conteo_aproximado=False):
+        self.object_list = objetos
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+        self.conteo = conteo
+        self.conteo_aproximado = conteo_aproximado
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Pagina `queryset` según `orden` (lista de campos estilo order_by, p. ej.
+    ['-precio', 'nombre']). Se agrega 'pk' al final como desempate para que
+    el orden sea total. Los campos deben ser no nulos (usar Coalesce en una
+    anotación si hace falta).
+
+    `contar` puede ser None (sin conteo), 'exacto' (COUNT completo) o
+    'aprox' (cuenta hasta `limite_conteo` filas y luego muestra "más de N").
+    """
+
+    def __init__(self, queryset, orden, por_pagina, contar=None, limite_conteo=1000):
+        orden = list(orden)
+        if not any(campo.lstrip('-') in ('pk', 'id') for campo in orden):
+            orden.append('pk')
+        self.queryset = queryset
+        self.orden = orden
+        self.por_pagina = por_pagina
+        self.contar = contar
+        self.limite_conteo = limite_conteo
+
+    # --- Construcción del filtro "seek" ---
+    def _filtro(self, valores, hacia_adelante):
+        """
+        Para orden (a, b, c) y valores (va, vb, vc) genera:
+        a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)
+        invirtiendo > por < en los campos descendentes o al retroceder.
+        """
+        filtro = Q()
+        iguales = {}
+        for campo, valor in zip(self.orden, valores):
+            nombre = campo.lstrip('-')
+            descendente = campo.startswith('-')
+            usar_gt = descendente != hacia_adelante
+            lookup = f"{nombre}__{'gt' if usar_gt else 'lt'}"
+            filtro |= Q(**iguales, **{lookup: valor})
+            iguales[nombre] = valor
+        return filtro
+
+    def _valores(self, objeto):
+        return [getattr(objeto, campo.lstrip('-')) for campo in self.orden]
+
+    def _conteo(self):
+        if self.contar == 'exacto':
+            return self.queryset.count(), False
+        if self.contar == 'aprox':
+            conteo = self.queryset[:self.limite_conteo + 1].count()
+            return min(conteo, self.limite_conteo), conteo > self.limite_conteo
+        return None, False
+
+    def recorrer(self):
+        """
+        Genera todas las filas del queryset en orden, una página por
+        consulta "seek". En memoria solo vive la página actual, aunque el
+        driver no tenga cursores del lado del servidor (mysqlclient).
+        """
+        qs = self.queryset.order_by(*self.orden)
+        filas = list(qs[:self.por_pagina])
+        while filas:
+            yield from filas
+            if len(filas) < self.por_pagina:
+                return
+            filas = list(qs.filter(self._filtro(self._valores(filas[-1]), True))[:self.por_pagina])
+
+    def pagina(self, token=None):
+        """
+        Devuelve la `PaginaKeyset` correspondiente al cursor `token` (la
+        primera página si es None o inválido).
+        """
+        valores, direccion = None, ADELANTE
+        if token:
+            try:
+                valores, direccion = decodificar_cursor(self.orden, token)
+            except CursorInvalido:
+                pass
+
+        hacia_adelante = direccion == ADELANTE
+        qs = self.queryset
+        if valores is not None:
+            qs = qs.filter(self._filtro(valores, hacia_adelante))
+
+        if hacia_adelante:
+            qs = qs.order_by(*self.orden)
+        else:
+            qs = qs.order_by(*[c[1:] if c.startswith('-') else f'-{c}' for c in self.orden])
+
+        filas = list(qs[:self.por_pagina + 1])
+        hay_mas = len(filas) > self.por_pagina
+        filas = filas[:self.por_pagina]
+        if not hacia_adelante:
+            filas.reverse()
+
+        if hacia_adelante:
+            hay_siguiente, hay_anterior = hay_mas, valores is not None
+        else:
+            hay_siguiente, hay_anterior = True, hay_mas
+
+        cursor_siguiente = cursor_anterior = None
+        if filas and hay_siguiente:
+            cursor_siguiente = codificar_cursor(self.orden, self._valores(filas[-1]), ADELANTE)
+        if filas and hay_anterior:
+            cursor_anterior = codificar_cursor(self.orden, self._valores(filas[0]), ATRAS)
+
+        conteo, aproximado = self._conteo()
+        return PaginaKeyset(filas, cursor_anterior, cursor_siguiente, conteo, aproximado)
@@ -0,0 +1,163 @@
+"""
+Recolección de archivos huérfanos en MEDIA_ROOT.
+
+Para terminar en memoria acotada aunque haya cientos de miles de archivos:
+
+* Las rutas referenciadas se leen de la base con `values_list().iterator()`
+  y se cargan en un filtro de Bloom (unos pocos bits por ruta, no la ruta).
+  Un filtro de Bloom puede dar falsos positivos pero nunca falsos negativos:
+  en el peor caso un huérfano sobrevive hasta la próxima pasada (cada pasada
+  usa otra semilla), jamás se borra un archivo en uso.
+* El árbol se recorre con `os.scandir` sin armar listas: se procesa archivo
+  por archivo.
+* El filtro es una foto de la base: justo antes de mover o borrar cada
+  huérfano se confirma con una consulta exacta (referenciada) que ninguna
+  fila lo usa, por si se asignó después de cargar las referencias.
+"""
+import hashlib
+import math
+import os
+import posixpath
+import secrets
+
+from django.apps import apps
+from django.db.models import Q
+
+from catalogo.imagenes import CARPETA_DERIVADOS, carpeta_derivados
+
+CARPETA_CUARENTENA = '.cuarentena'
+BITS_MINIMOS = 8192
+
+# (modelo, campo, tiene derivados en CARPETA_DERIVADOS)
+CAMPOS_MEDIA = (
+    ('catalogo.Producto', 'imagen', True),
+    ('usuarios.Usuario', 'avatar', False),
+)
+
+
+def _primo_desde(n):
+    """
+    Primer primo >= n. Con un número primo de bits todo paso del doble
+    hashing recorre posiciones distintas (ver FiltroBloom._posiciones).
+    """
+    n = max(n, 2)
+    while any(n % d == 0 for d in range(2, math.isqrt(n) + 1)):
+        n += 1
+    return n
+
+
+class FiltroBloom:
+    """
+    Conjunto probabilístico de cadenas sobre un bytearray.
+    """
+
+    def __init__(self, capacidad, tasa_error=0.001, semilla=None):
+        capacidad = max(capacidad, 1)
+        # Mínimo 1 KiB: en filtros diminutos el doble hashing se correlaciona
+        # y los falsos positivos superan la tasa pedida
+        self.bits = _primo_desde(max(BITS_MINIMOS, int(-capacidad * math.log(tasa_error) / (math.log(2) ** 2))))
+        self.funciones = max(1, math.ceil(-math.log2(tasa_error)))
+        self.tabla = bytearray((self.bits + 7) // 8)
+        self.semilla = semilla if semilla is not None else secrets.token_bytes(16)
+
+    def _posiciones(self, valor):
+        # Doble hashing (Kirsch-Mitzenmacher): k posiciones con un solo digest
+        digest = hashlib.blake2b(valor.encode(), digest_size=16, key=self.semilla).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        # Paso no nulo: con `bits` primo las k posiciones son todas distintas
+        h2 = int.from_bytes(digest[8:], 'little') % (self.bits - 1) + 1
+        return ((h1 + i * h2) % self.bits for i in range(self.funciones))
+
+    def agregar(self, valor):
+        for posicion in self._posiciones(valor):
+            self.tabla[posicion >> 3] |= 1 << (posicion & 7)
+
+    def __contains__(self, valor):
+        return all(self.tabla[p >> 3] & (1 << (p & 7)) for p in self._posiciones(valor))
+
+    @property
+    def tamano_bytes(self):
+        return len(self.tabla)
+
+
+def _referencias_de(modelo, campo, chunk_size):
+    return (
+        modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+        .values_list(campo, flat=True).iterator(chunk_size=chunk_size)
+    )
+
+
+def contar_referencias():
+    total = 0
+    for etiqueta, campo, _ in CAMPOS_MEDIA:
+        modelo = apps.get_model(etiqueta)
+        total += modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True}).count()
+    return total
+
+
+def cargar_referencias(tasa_error=0.001, chunk_size=5000):
+    """
+    Devuelve el filtro con todas las rutas en uso. Para los campos con
+    derivados se agrega además su carpeta de derivados.
+    """
+    capacidad = contar_referencias()
+    filtro = FiltroBloom(capacidad * 2, tasa_error)
+    for etiqueta, campo, con_derivados in CAMPOS_MEDIA:
+        for nombre in _referencias_de(apps.get_model(etiqueta), campo, chunk_size):
+            filtro.agregar(nombre)
+            if con_derivados:
+                filtro.agregar(carpeta_derivados(nombre))
+    return filtro
+
+
+def clave_referencia(ruta):
+    """
+    Ruta con la que se busca un archivo en el filtro: los derivados
+    ('derivados/productos/torta/400.webp') dependen de su carpeta.
+    """
+    if ruta.startswith(CARPETA_DERIVADOS + '/'):
+        return posixpath.dirname(ruta)
+    return ruta
+
+
+def referenciada(ruta):
+    """
+    Consulta exacta: si alguna fila usa hoy el archivo `ruta` (o, para un
+    derivado, la imagen de la que salió).
+    """
+    clave = clave_referencia(ruta)
+    for etiqueta, campo, con_derivados in CAMPOS_MEDIA:
+        if clave == ruta:
+            condicion = Q(**{campo: ruta})
+        elif con_derivados:
+            # 'derivados/productos/torta' -> 'productos/torta.<ext>'
+            base = clave[len(CARPETA_DERIVADOS) + 1:]
+            condicion = Q(**{campo: base}) | Q(**{f'{campo}__startswith': f'{base}.'})
+        else:
+            continue
+        if apps.get_model(etiqueta).objects.filter(condicion).exists():
+            return True
+    return False
+
+
+def recorrer(raiz):
+    """
+    Genera (ruta_relativa_posix, entrada) de todos los archivos bajo `raiz`,
+    sin seguir symlinks y omitiendo carpetas ocultas (incluida la cuarentena).
+    """
+    pendientes = ['']
+    while pendientes:
+        relativa = pendientes.pop()
+        try:
+            iterador = os.scandir(os.path.join(raiz, relativa))
+        except FileNotFoundError:
+            continue
+        with iterador:
+            for entrada in iterador:
+                if entrada.name.startswith('.'):
+                    continue
+                ruta = posixpath.join(relativa, entrada.name) if relativa else entrada.name
+                if entrada.is_dir(follow_symlinks=False):
+                    pendientes.append(ruta)
+                elif entrada.is_file(follow_symlinks=False):
+                    yield ruta, entrada
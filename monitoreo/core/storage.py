@@ -0,0 +1,92 @@
+"""
+Almacenamiento direccionado por contenido para imágenes subidas.
+
+Cada archivo se guarda con el SHA-256 de sus bytes como nombre:
+
+    contenido/3f/3fa9c1...e2.jpg
+
+Dos subidas idénticas (aunque vengan con otro nombre, o una sea un avatar
+y la otra la foto de un producto) apuntan al mismo blob y solo se escribe
+una vez. Como el contenido de una URL nunca cambia, se puede servir con
+`Cache-Control: immutable` (ver PREFIJOS_INMUTABLES y core.views.servir_media).
+
+Los blobs pueden estar compartidos entre filas, así que nunca se borran al
+reemplazar una imagen: los huérfanos los limpia el recolector de media.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CARPETA_CONTENIDO = 'contenido'
+
+# Rutas de MEDIA cuyo contenido nunca cambia (blobs y sus derivados)
+PREFIJOS_INMUTABLES = (f'{CARPETA_CONTENIDO}/', f'derivados/{CARPETA_CONTENIDO}/')
+
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def huella(contenido):
+    """
+    SHA-256 hexadecimal de un File/UploadedFile, leído por bloques.
+    """
+    sha = hashlib.sha256()
+    if hasattr(contenido, 'seek'):
+        contenido.seek(0)
+    for bloque in contenido.chunks():
+        sha.update(bloque)
+    if hasattr(contenido, 'seek'):
+        contenido.seek(0)
+    return sha.hexdigest()
+
+
+def nombre_por_contenido(digest, nombre_original):
+    extension = posixpath.splitext(nombre_original)[1].lower()
+    return posixpath.join(CARPETA_CONTENIDO, digest[:2], f'{digest}{extension}')
+
+
+def es_inmutable(ruta):
+    return ruta.startswith(PREFIJOS_INMUTABLES)
+
+
+@deconstructible
+class AlmacenamientoContenido(FileSystemStorage):
+    """
+    FileSystemStorage (mismo MEDIA_ROOT/MEDIA_URL por defecto) que ignora el
+    nombre propuesto y usa la huella del contenido. El `upload_to` del campo
+    solo aporta la extensión.
+    """
+
+    def __init__(self, **kwargs):
+        # Si dos procesos suben el mismo archivo a la vez, ambos escriben los
+        # mismos bytes en la misma ruta: sobrescribir es inocuo.
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo se decide en _save; nunca se agregan sufijos
+        return name
+
+    def _save(self, name, content):
+        nombre = nombre_por_contenido(huella(content), name)
+        if self.exists(nombre):
+            # El blob vuelve a estar en uso: se renueva su fecha para que el
+            # recolector de media lo trate como recién subido (período de gracia)
+            try:
+                os.utime(self.path(nombre))
+                return nombre
+            except FileNotFoundError:
+                # El recolector lo acaba de mover: se vuelve a escribir
+                pass
+        return super()._save(nombre, content)
+
+
+almacenamiento_contenido = AlmacenamientoContenido()
+
+
+def obtener_almacenamiento_contenido():
+    # Referenciado desde los modelos como callable para que las migraciones
+    # no congelen la configuración del storage
+    return almacenamiento_contenido
@@ -1,3 +1,282 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
 
-# Create your tests here.
+import asyncio
+import base64
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from catalogo.models import Producto
+from core.eventos import REINTENTO_MS, Difusor, diferencias, difusor, flujo_asgi, tomar_foto
+from core.paginacion import CursorInvalido, KeysetPaginator, codificar_cursor, decodificar_cursor
+from core.recoleccion import CARPETA_CUARENTENA, FiltroBloom
+from core.storage import almacenamiento_contenido
+from pedidos.models import Cliente
+from pedidos.servicios import realizar_checkout
+from pedidos.tests import crear_producto
+from reportes.exportacion import obtener_reporte
+from usuarios.models import Usuario
+
+
+class DashboardWidgetsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = Usuario.objects.create_superuser(
+            email='admin@forneria.cl', password='x', first_name='Ad', last_name='Min', run='99999999-9',
+        )
+        self.client.force_login(self.admin)
+
+    def test_acierto_sin_consultas_de_datos_e_invalidacion(self):
+        self.client.get('/dashboard/')
+
+        # Solo sesión, usuario y contador del carrito: ningún widget consulta
+        with self.assertNumQueries(3):
+            respuesta = self.client.get('/dashboard/')
+        self.assertEqual(respuesta.context['total_clientes'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cliente.objects.create(idclientes=1)
+        respuesta = self.client.get('/dashboard/')
+        self.assertEqual(respuesta.context['total_clientes'], 1)
+
+
+class DashboardAsincronoTests(TransactionTestCase):
+    # Los widgets se calculan en otros hilos (otras conexiones): los datos
+    # deben estar confirmados, no dentro de la transacción de un TestCase
+    def setUp(self):
+        cache.clear()
+        self.admin = Usuario.objects.create_superuser(
+            email='admin@forneria.cl', password='x', first_name='Ad', last_name='Min', run='99999999-9',
+        )
+        Cliente.objects.create(idclientes=1)
+
+    def test_mismo_contexto_que_la_vista_sincrona(self):
+        # force_login guarda last_login (invalida 'usuarios'): antes de pedir
+        self.async_client.force_login(self.admin)
+        self.client.force_login(self.admin)
+        respuesta = async_to_sync(self.async_client.get)('/dashboard/async/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['total_clientes'], 1)
+        self.assertEqual(respuesta.context['total_usuarios'], 1)
+
+        # Lo que calculó la vista asíncrona queda en caché para la síncrona
+        with self.assertNumQueries(3):
+            sincrona = self.client.get('/dashboard/')
+        for clave in ('total_clientes', 'total_productos', 'productos_a_vencer', 'fechas_grafico'):
+            self.assertEqual(sincrona.context[clave], respuesta.context[clave])
+
+
+class EventosDashboardTests(TransactionTestCase):
+    # El productor de eventos consulta desde su propio hilo
+    def setUp(self):
+        self.admin = Usuario.objects.create_superuser(
+            email='admin@forneria.cl', password='x', first_name='Ad', last_name='Min', run='99999999-9',
+        )
+
+    def test_diferencias_entre_fotos(self):
+        anterior = tomar_foto()
+        pan = crear_producto('Pan amasado', stock=10)
+        pan.stock_minimo = 3
+        pan.save()
+        pedido = realizar_checkout(self.admin, {str(pan.pk): 8})
+
+        eventos = dict(diferencias(anterior, tomar_foto(anterior['ultimo_pedido'])))
+        self.assertEqual(eventos['pedidos']['pendientes'], 1)
+        self.assertEqual([p['pedido_id'] for p in eventos['pedidos']['nuevos']], [pedido.pk])
+        self.assertEqual([p['nombre'] for p in eventos['stock']['bajo_minimo']], ['Pan amasado'])
+        self.assertEqual(eventos['por_vencer']['total'], 1)
+
+        # Sin cambios no hay eventos
+        foto = tomar_foto(pedido.pk)
+        self.assertEqual(diferencias(foto, tomar_foto(pedido.pk)), [])
+
+    def detener_productor(self):
+        # Sin suscriptores el hilo termina en su próxima vuelta: se lo
+        # despierta y se espera, para que no consulte una base ya borrada
+        hilo = difusor._hilo
+        if hilo is not None:
+            difusor.notificar()
+            hilo.join(timeout=5)
+
+    @override_settings(DASHBOARD_EVENTOS_WSGI=True, DASHBOARD_EVENTOS_DURACION=0.5)
+    def test_flujo_sse(self):
+        self.client.force_login(self.admin)
+        respuesta = self.client.get('/dashboard/eventos/')
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        # El flujo pide reconectar y se cierra solo al cumplir su duración
+        partes = list(respuesta.streaming_content)
+        respuesta.close()
+        self.detener_productor()
+        self.assertEqual(partes[0], f'retry: {REINTENTO_MS}\n\n'.encode())
+        self.assertTrue(partes[1].startswith(b'event: estado\n'))
+
+    def test_flujo_asgi_con_duracion(self):
+        async def leer():
+            return [parte async for parte in flujo_asgi(duracion=0.5)]
+
+        partes = async_to_sync(leer)()
+        self.detener_productor()
+        self.assertTrue(partes[0].startswith('retry: '))
+        self.assertTrue(partes[1].startswith('event: estado\n'))
+
+    def test_sin_asgi_no_ocupa_un_hilo(self):
+        self.client.force_login(self.admin)
+        with override_settings(DASHBOARD_EVENTOS_WSGI=False):
+            respuesta = self.client.get('/dashboard/eventos/')
+        # 204: el navegador no reconecta
+        self.assertEqual(respuesta.status_code, 204)
+        self.assertIsNone(difusor._hilo)
+
+
+class DifusorTests(SimpleTestCase):
+    def test_suscriptor_con_loop_cerrado_no_corta_la_entrega(self):
+        cerrado = asyncio.new_event_loop()
+        cerrado.close()
+        recibidos = []
+        d = Difusor(intervalo=60)
+        # Sin pasar por suscribir(), que arrancaría el hilo productor
+        d._suscriptores = {1: lambda evento: cerrado.call_soon_threadsafe(print, evento), 2: recibidos.append}
+
+        with self.assertLogs('core.eventos', 'WARNING'):
+            d.publicar(('estado', {}))
+        d.publicar(('pedidos', {}))
+        self.assertEqual(recibidos, [('estado', {}), ('pedidos', {})])
+        self.assertEqual(list(d._suscriptores), [2])
+
+
+class PaginacionKeysetTests(TestCase):
+    def setUp(self):
+        # Precios repetidos: el desempate por pk mantiene el orden total
+        for i in range(7):
+            crear_producto(f'Producto {i}', stock=1, precio=1000 * (i % 3))
+        self.orden = ['-precio', 'nombre']
+        self.esperado = list(Producto.objects.order_by('-precio', 'nombre', 'pk'))
+
+    def test_ida_y_vuelta(self):
+        paginador = KeysetPaginator(Producto.objects.all(), self.orden, 3, contar='exacto')
+        paginas, token = [], None
+        while True:
+            pagina = paginador.pagina(token)
+            paginas.append(pagina)
+            if not pagina.has_next():
+                break
+            token = pagina.cursor_siguiente
+        self.assertEqual([p for pagina in paginas for p in pagina], self.esperado)
+        self.assertEqual([len(p) for p in paginas], [3, 3, 1])
+        self.assertFalse(paginas[0].has_previous())
+        self.assertEqual(paginas[0].conteo, 7)
+
+        # Volver atrás desde la última página reproduce las anteriores
+        anterior = paginador.pagina(paginas[-1].cursor_anterior)
+        self.assertEqual(list(anterior), list(paginas[1]))
+        self.assertEqual(list(paginador.pagina(anterior.cursor_anterior)), list(paginas[0]))
+
+    def test_cursor_alterado_o_de_otro_orden(self):
+        paginador = KeysetPaginator(Producto.objects.all(), self.orden, 3)
+        siguiente = paginador.pagina().cursor_siguiente
+        self.assertEqual(len(decodificar_cursor(paginador.orden, siguiente)[0]), 3)
+
+        otro_orden = codificar_cursor(['nombre', 'pk'], ['x', 1], 's')
+        sin_direccion = base64.urlsafe_b64encode(
+            json.dumps({'o': ','.join(paginador.orden), 'v': [0, 'x', 1], 'd': 'z'}).encode()
+        ).decode()
+        for token in ('no-es-base64!!', siguiente[:-4], otro_orden, sin_direccion):
+            with self.assertRaises(CursorInvalido):
+                decodificar_cursor(paginador.orden, token)
+            # La vista recibe la primera página en vez de un error
+            self.assertEqual(list(paginador.pagina(token)), self.esperado[:3])
+
+    def test_recorrer_en_bloques(self):
+        paginador = KeysetPaginator(Producto.objects.all(), self.orden, 3)
+        # Una consulta por bloque (3 + 3 + 1), nunca todo el resultado de una vez
+        with self.assertNumQueries(3):
+            self.assertEqual(list(paginador.recorrer()), self.esperado)
+
+    def test_exportacion_por_bloques(self):
+        reporte = obtener_reporte('productos')
+        with self.assertNumQueries(4):
+            filas = list(reporte.filas(chunk_size=2))
+        self.assertEqual([f[1] for f in filas], list(Producto.objects.order_by(*reporte.orden).values_list('nombre', flat=True)))
+
+
+class RecolectarMediaTests(TestCase):
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.raiz)
+        ajustes = override_settings(MEDIA_ROOT=self.raiz)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.hace_dos_dias = time.time() - 48 * 3600
+
+    def archivo(self, ruta, viejo=True):
+        completa = os.path.join(self.raiz, ruta)
+        os.makedirs(os.path.dirname(completa), exist_ok=True)
+        with open(completa, 'wb') as f:
+            f.write(b'x' * 10)
+        if viejo:
+            os.utime(completa, (self.hace_dos_dias, self.hace_dos_dias))
+        return completa
+
+    def recolectar(self, *args):
+        call_command('recolectar_media', *args, stdout=StringIO())
+
+    def existe(self, ruta):
+        return os.path.exists(os.path.join(self.raiz, ruta))
+
+    def en_cuarentena(self):
+        rutas = []
+        for carpeta, _, archivos in os.walk(os.path.join(self.raiz, CARPETA_CUARENTENA)):
+            rutas += [os.path.relpath(os.path.join(carpeta, a), self.raiz).split(os.sep, 2)[2] for a in archivos]
+        return sorted(rutas)
+
+    def test_cuarentena_solo_de_huerfanos_viejos(self):
+        pan = crear_producto('Pan', 5)
+        Producto.objects.filter(pk=pan.pk).update(imagen='productos/pan.png')
+        self.archivo('productos/pan.png')
+        self.archivo('derivados/productos/pan/400.webp')
+        self.archivo('productos/viejo.png')
+        self.archivo('derivados/productos/viejo/400.webp')
+        self.archivo('productos/recien.png', viejo=False)
+
+        self.recolectar('--dry-run')
+        self.assertTrue(self.existe('productos/viejo.png'))
+
+        self.recolectar()
+        self.assertEqual(self.en_cuarentena(), ['derivados/productos/viejo/400.webp', 'productos/viejo.png'])
+        for ruta in ('productos/pan.png', 'derivados/productos/pan/400.webp', 'productos/recien.png'):
+            self.assertTrue(self.existe(ruta), ruta)
+
+        self.recolectar('--borrar', '--gracia-horas', '0')
+        self.assertFalse(self.existe('productos/recien.png'))
+        self.assertTrue(self.existe('productos/pan.png'))
+
+    def test_reconfirma_contra_la_base(self):
+        # La fila se asigna después de cargar las referencias (filtro vacío)
+        pan = crear_producto('Pan', 5)
+        Producto.objects.filter(pk=pan.pk).update(imagen='productos/pan.png')
+        self.archivo('productos/pan.png')
+        self.archivo('derivados/productos/pan/800.jpg')
+        with mock.patch(
+            'core.management.commands.recolectar_media.cargar_referencias', return_value=FiltroBloom(1),
+        ):
+            self.recolectar('--borrar')
+        self.assertTrue(self.existe('productos/pan.png'))
+        self.assertTrue(self.existe('derivados/productos/pan/800.jpg'))
+
+    def test_subida_repetida_renueva_la_gracia(self):
+        nombre = almacenamiento_contenido.save('productos/torta.png', ContentFile(b'torta'))
+        ruta = almacenamiento_contenido.path(nombre)
+        os.utime(ruta, (self.hace_dos_dias, self.hace_dos_dias))
+
+        self.assertEqual(almacenamiento_contenido.save('otra.png', ContentFile(b'torta')), nombre)
+        self.assertGreater(os.stat(ruta).st_mtime, self.hace_dos_dias)
+        self.recolectar('--borrar')
+        self.assertTrue(os.path.exists(ruta))
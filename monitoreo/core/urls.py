@@ -9,6 +9,8 @@ urlpatterns = [
     # Dashboard e inicio
     path('', views.inicio, name='inicio'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/async/', views.dashboard_async, name='dashboard_async'),
+    path('dashboard/eventos/', views.eventos_dashboard, name='eventos_dashboard'),
 
     # --- Todas las demás rutas (usuarios, productos, pedidos, etc.) ---
     # --- SE ELIMINAN DE ESTE ARCHIVO ---
@@ -1,16 +1,13 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, permission_required
-from datetime import date, timedelta
-# --- IMPORTACIONES PARA GRÁFICOS Y AGREGACIÓN ---
-from django.db.models import Sum
-from django.db.models.functions import TruncDate
-import json
-
-# Importación de modelos
-from usuarios.models import Usuario
-from catalogo.models import Producto
-from pedidos.models import Pedido, Cliente
-from proveedores.models import Proveedor
+from django.views.static import serve
+
+from . import eventos, widgets
+from .storage import CACHE_INMUTABLE, es_inmutable
 
 # --------------------
 # Vistas Públicas (Para todos)
@@ -32,58 +29,89 @@ def inicio(request):
 # Vistas Protegidas (SOLO PARA ADMINS)
 # ----------------------------------------
 
-@login_required
-@permission_required('catalogo.view_producto', raise_exception=True)
-def dashboard(request):
-    # 1. Contadores Generales
-    total_usuarios = Usuario.objects.count()
-    total_productos = Producto.objects.count()
-    total_clientes = Cliente.objects.count()
-    total_proveedores = Proveedor.objects.count()
-    total_pedidos_pendientes = Pedido.objects.filter(estado='Pendiente').count()
-    
-    # 2. Productos por vencer (Lógica existente)
-    hoy = date.today()
-    fecha_limite = hoy + timedelta(days=7)
-    productos_a_vencer = Producto.objects.filter(
-        caducidad__gte=hoy, 
-        caducidad__lte=fecha_limite
-    ).order_by('caducidad')
-    
-    # 3. LÓGICA PARA EL GRÁFICO DE VENTAS (Últimos 30 días)
-    fecha_inicio_grafico = hoy - timedelta(days=30)
-    
-    # Agrupamos por día y sumamos el 'total'
-    # Excluimos los cancelados para que la gráfica sea positiva
-    ventas_por_fecha = Pedido.objects.filter(
-        fecha_pedido__date__gte=fecha_inicio_grafico
-    ).exclude(estado='Cancelado') \
-     .annotate(fecha=TruncDate('fecha_pedido')) \
-     .values('fecha') \
-     .annotate(suma_total=Sum('total')) \
-     .order_by('fecha')
-
-    # Preparamos los datos para Chart.js (listas simples)
-    fechas_grafico = []
-    montos_grafico = []
-
-    for registro in ventas_por_fecha:
-        # Formato día/mes (ej: 12/10)
-        fechas_grafico.append(registro['fecha'].strftime("%d/%m"))
-        # Convertimos Decimal a float para que JS lo entienda
-        montos_grafico.append(float(registro['suma_total']))
+WIDGETS_DASHBOARD = [
+    'usuarios', 'productos', 'clientes', 'proveedores', 'pedidos_pendientes', 'por_vencer', 'ventas',
+]
 
+
+def _contexto_dashboard(usuario, datos, aciertos):
     context = {
-        'total_usuarios': total_usuarios,
-        'total_productos': total_productos,
-        'total_clientes': total_clientes,
-        'total_proveedores': total_proveedores,
-        'total_pedidos_pendientes': total_pedidos_pendientes,
-        'productos_a_vencer': productos_a_vencer,
+        # 1. Contadores Generales
+        'total_usuarios': datos['usuarios'],
+        'total_productos': datos['productos'],
+        'total_clientes': datos['clientes'],
+        'total_proveedores': datos['proveedores'],
+        'total_pedidos_pendientes': datos['pedidos_pendientes'],
+        # 2. Productos por vencer (según sus reglas de alerta; 7 días si no tienen)
+        'productos_a_vencer': datos['por_vencer'],
         
-        # Datos para el gráfico (convertidos a JSON string para seguridad en JS)
-        'fechas_grafico': json.dumps(fechas_grafico),
-        'montos_grafico': json.dumps(montos_grafico),
+        # 3. Datos para el gráfico (últimos 30 días, ya en JSON para Chart.js)
+        'fechas_grafico': datos['ventas']['fechas'],
+        'montos_grafico': datos['ventas']['montos'],
     }
-    
-    return render(request, 'core/dashboard.html', context)
\ No newline at end of file
+
+    # Panel de depuración: acierto/fallo de cada widget
+    if settings.DEBUG and usuario.is_superuser:
+        context['widgets_debug'] = [
+            {'nombre': nombre, 'acierto': aciertos[nombre], 'ttl': widgets.obtener_widget(nombre).ttl}
+            for nombre in WIDGETS_DASHBOARD
+        ]
+    return context
+
+
+@login_required
+@permission_required('catalogo.view_producto', raise_exception=True)
+def dashboard(request):
+    # Cada bloque del dashboard se cachea por separado (ver core/widgets.py):
+    # con todos en caché no se ejecuta ninguna consulta de datos
+    datos, aciertos = widgets.valores(WIDGETS_DASHBOARD)
+    return render(request, 'core/dashboard.html', _contexto_dashboard(request.user, datos, aciertos))
+
+
+@login_required
+@permission_required('catalogo.view_producto', raise_exception=True)
+async def dashboard_async(request):
+    # Igual que dashboard, pero bajo ASGI los widgets que no están en caché
+    # se calculan a la vez (DASHBOARD_HILOS): tarda lo que el más lento
+    datos, aciertos = await widgets.avalores(WIDGETS_DASHBOARD)
+    usuario = await request.auser()
+    context = _contexto_dashboard(usuario, datos, aciertos)
+    return await sync_to_async(render)(request, 'core/dashboard.html', context)
+
+@login_required
+@permission_required('catalogo.view_producto', raise_exception=True)
+def eventos_dashboard(request):
+    """
+    Server-Sent Events con los cambios del dashboard (ver core/eventos.py).
+    Bajo ASGI el flujo es asíncrono y no ocupa un hilo por cliente. Bajo
+    WSGI ocuparía un hilo por pestaña abierta: solo se sirve con
+    DASHBOARD_EVENTOS_WSGI y si no se responde 204 (el navegador no reconecta).
+    """
+    if isinstance(request, ASGIRequest):
+        flujo = eventos.flujo_asgi()
+    elif getattr(settings, 'DASHBOARD_EVENTOS_WSGI', False):
+        flujo = eventos.flujo_wsgi()
+    else:
+        return HttpResponse(status=204)
+    respuesta = StreamingHttpResponse(flujo, content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    # Que nginx no acumule el flujo en su búfer
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+# --------------------
+# Archivos multimedia
+# --------------------
+
+def servir_media(request, path, document_root=None):
+    """
+    Sirve MEDIA en desarrollo (igual que `django.conf.urls.static`), pero
+    marca como inmutables los blobs direccionados por contenido y sus
+    derivados: su URL cambia si cambia el archivo.
+    En producción el servidor web debe replicar la misma cabecera para
+    /media/contenido/ y /media/derivados/contenido/.
+    """
+    respuesta = serve(request, path, document_root=document_root)
+    if es_inmutable(path):
+        respuesta['Cache-Control'] = CACHE_INMUTABLE
+    return respuesta
@@ -0,0 +1,262 @@
+"""
+Caché por widget del dashboard.
+
+Cada widget (un contador, la lista de productos por vencer, el gráfico de
+ventas) es una clase con su propio `ttl` y la lista de `modelos` que lo
+afectan. Su valor se guarda en la caché por defecto y se borra:
+
+* desde post_save/post_delete de esos modelos (después del commit, para que
+  nadie vuelva a guardar el valor viejo mientras la transacción sigue
+  abierta), y
+* a mano con `invalidar(...)` en las escrituras masivas que no disparan
+  señales (transiciones de estado, recálculo de ventas).
+
+`valores(nombres)` lee todos los widgets con un solo get_many: si todos
+están en caché, el dashboard se arma sin consultas SQL. Devuelve también
+qué widgets fueron acierto y cuáles se recalcularon (panel de depuración).
+`avalores(nombres)` hace lo mismo desde una vista asíncrona, calculando los
+widgets que faltan en paralelo en un pool de hilos acotado.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+
+PREFIJO = 'dashboard:widget:'
+
+
+class Widget:
+    nombre = None
+    ttl = 5 * 60
+    # Modelos ('app.Modelo') cuyos cambios invalidan el widget
+    modelos = ()
+
+    def clave(self):
+        return PREFIJO + self.nombre
+
+    def calcular(self):
+        raise NotImplementedError
+
+
+class WidgetNoEncontrado(LookupError):
+    pass
+
+
+_widgets = {}
+
+
+def registrar(clase):
+    _widgets[clase.nombre] = clase()
+    return clase
+
+
+def obtener_widget(nombre):
+    try:
+        return _widgets[nombre]
+    except KeyError:
+        raise WidgetNoEncontrado(nombre)
+
+
+def widgets_registrados():
+    return list(_widgets.values())
+
+
+def _armar(widgets, en_cache, calculados):
+    """
+    Junta lo leído de la caché con lo recalculado. Devuelve (datos,
+    aciertos, nuevos), con `nuevos` = {ttl: {clave: valor}} para guardar.
+    """
+    datos, aciertos, nuevos = {}, {}, {}
+    for widget in widgets:
+        aciertos[widget.nombre] = widget.nombre not in calculados
+        if aciertos[widget.nombre]:
+            datos[widget.nombre] = en_cache[widget.clave()]
+        else:
+            datos[widget.nombre] = calculados[widget.nombre]
+            nuevos.setdefault(widget.ttl, {})[widget.clave()] = datos[widget.nombre]
+    return datos, aciertos, nuevos
+
+
+def valores(nombres):
+    """
+    ({nombre: valor}, {nombre: acierto}) de los widgets `nombres`. Los que
+    no estaban en caché se calculan uno tras otro y se guardan con un
+    set_many por TTL.
+    """
+    widgets = [obtener_widget(nombre) for nombre in nombres]
+    en_cache = cache.get_many([w.clave() for w in widgets])
+    calculados = {w.nombre: w.calcular() for w in widgets if w.clave() not in en_cache}
+    datos, aciertos, nuevos = _armar(widgets, en_cache, calculados)
+    for ttl, entradas in nuevos.items():
+        cache.set_many(entradas, timeout=ttl)
+    return datos, aciertos
+
+
+_ejecutor = None
+
+
+def ejecutor_widgets():
+    """
+    Pool acotado (DASHBOARD_HILOS) en el que avalores calcula los widgets.
+    Cada hilo usa su propia conexión a la base, así que el tamaño del pool
+    es también el máximo de conexiones extra que abre el dashboard.
+    """
+    global _ejecutor
+    if _ejecutor is None:
+        _ejecutor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'DASHBOARD_HILOS', 8), thread_name_prefix='widgets',
+        )
+    return _ejecutor
+
+
+def _calcular_en_hilo(widget):
+    # Como al inicio y al final de una petición: respeta CONN_MAX_AGE
+    close_old_connections()
+    try:
+        return widget.calcular()
+    finally:
+        close_old_connections()
+
+
+async def avalores(nombres):
+    """
+    Versión asíncrona de valores(): los widgets que faltan se calculan a la
+    vez en ejecutor_widgets(), así que la espera es la de la consulta más
+    lenta y no la suma de todas.
+    """
+    widgets = [obtener_widget(nombre) for nombre in nombres]
+    en_cache = await cache.aget_many([w.clave() for w in widgets])
+    faltan = [w for w in widgets if w.clave() not in en_cache]
+    loop = asyncio.get_running_loop()
+    resultados = await asyncio.gather(*[
+        loop.run_in_executor(ejecutor_widgets(), _calcular_en_hilo, widget) for widget in faltan
+    ])
+    datos, aciertos, nuevos = _armar(widgets, en_cache, {w.nombre: v for w, v in zip(faltan, resultados)})
+    for ttl, entradas in nuevos.items():
+        await cache.aset_many(entradas, timeout=ttl)
+    return datos, aciertos
+
+
+def invalidar(*nombres):
+    cache.delete_many([obtener_widget(nombre).clave() for nombre in nombres])
+
+
+def invalidar_al_confirmar(*nombres):
+    transaction.on_commit(partial(invalidar, *nombres))
+
+
+def _receptor(nombres, sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    invalidar_al_confirmar(*nombres)
+
+
+def conectar_senales():
+    """
+    Conecta post_save/post_delete de cada modelo con los widgets que lo
+    usan. Se llama desde CoreConfig.ready().
+    """
+    por_modelo = {}
+    for widget in widgets_registrados():
+        for etiqueta in widget.modelos:
+            por_modelo.setdefault(etiqueta, []).append(widget.nombre)
+    for etiqueta, nombres in por_modelo.items():
+        modelo = apps.get_model(etiqueta)
+        receptor = partial(_receptor, tuple(nombres))
+        for evento, senal in (('guardado', post_save), ('eliminado', post_delete)):
+            # weak=False: el partial no tiene otra referencia que lo mantenga vivo
+            senal.connect(receptor, sender=modelo, weak=False, dispatch_uid=f'core_widgets_{etiqueta}_{evento}')
+
+
+# ----------------------------------------
+# WIDGETS DEL DASHBOARD
+# ----------------------------------------
+class Conteo(Widget):
+    ttl = 15 * 60
+
+    def queryset(self):
+        return apps.get_model(self.modelos[0])._default_manager.all()
+
+    def calcular(self):
+        return self.queryset().count()
+
+
+@registrar
+class TotalUsuarios(Conteo):
+    nombre = 'usuarios'
+    modelos = ('usuarios.Usuario',)
+
+
+@registrar
+class TotalProductos(Conteo):
+    nombre = 'productos'
+    modelos = ('catalogo.Producto',)
+
+
+@registrar
+class TotalClientes(Conteo):
+    nombre = 'clientes'
+    modelos = ('pedidos.Cliente',)
+
+
+@registrar
+class TotalProveedores(Conteo):
+    nombre = 'proveedores'
+    modelos = ('proveedores.Proveedor',)
+
+
+@registrar
+class PedidosPendientes(Conteo):
+    nombre = 'pedidos_pendientes'
+    ttl = 5 * 60
+    # Las transiciones (update) invalidan a mano, ver pedidos/estados.py
+    modelos = ('pedidos.Pedido',)
+
+    def queryset(self):
+        return super().queryset().filter(estado='Pendiente')
+
+
+@registrar
+class ProductosPorVencer(Widget):
+    nombre = 'por_vencer'
+    ttl = 15 * 60
+    modelos = ('catalogo.Producto', 'catalogo.ReglaAlertaVencimiento', 'catalogo.ProductoReglaAlerta')
+
+    def clave(self):
+        # Cambia de día aunque nadie toque los productos
+        return f'{super().clave()}:{date.today():%Y%m%d}'
+
+    def calcular(self):
+        from pedidos.alertas import productos_por_vencer
+
+        # Ventana de las reglas de alerta de cada producto (7 días si no tiene)
+        return list(productos_por_vencer(date.today()).order_by('caducidad').values('nombre', 'marca', 'caducidad'))
+
+
+@registrar
+class VentasUltimos30Dias(Widget):
+    nombre = 'ventas'
+    ttl = 10 * 60
+    # El checkout crea el Pedido (post_save); cancelar y recalcular_ventas
+    # invalidan a mano
+    modelos = ('pedidos.Pedido',)
+
+    def clave(self):
+        return f'{super().clave()}:{date.today():%Y%m%d}'
+
+    def calcular(self):
+        from pedidos.ventas import ventas_por_dia
+
+        # Formato día/mes (ej: 12/10); Decimal -> float para Chart.js
+        registros = list(ventas_por_dia(date.today() - timedelta(days=30)))
+        return {
+            'fechas': json.dumps([r.dia.strftime("%d/%m") for r in registros]),
+            'montos': json.dumps([float(r.total) for r in registros]),
+        }
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     
     # --- ¡NUEVA APP AÑADIDA! ---
     'proveedores.apps.ProveedoresConfig',
+    'reportes.apps.ReportesConfig',
     'rest_framework',
     'rest_framework.authtoken',
     'api',
@@ -81,6 +82,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'pedidos.context_processors.carrito',
             ],
         },
     },
@@ -181,6 +183,75 @@ MESSAGE_TAGS = {
     msg.ERROR: 'danger',
 }
 
+# ----------------------------------------------------------------------
+# Caché
+# ----------------------------------------------------------------------
+# En desarrollo basta la caché en memoria del proceso. En producción (varios
+# workers) debe apuntar a un servidor compartido para que los contadores de
+# versión del catálogo y las facetas cacheadas sean los mismos en todos.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "forneria",
+        }
+    }
+
+# Hilos con los que la vista asíncrona del dashboard (/dashboard/async/)
+# calcula en paralelo los widgets que no están en caché. Cada hilo abre su
+# propia conexión: es el máximo de conexiones extra por proceso.
+DASHBOARD_HILOS = 8
+# Cada cuántos segundos el productor de /dashboard/eventos/ revisa pedidos
+# pendientes, stock mínimo y vencimientos (uno por proceso, no por cliente).
+DASHBOARD_EVENTOS_INTERVALO = 5
+# Segundos que dura cada flujo de eventos antes de cerrarse; el navegador
+# reconecta solo (campo retry:).
+DASHBOARD_EVENTOS_DURACION = 5 * 60
+# Bajo WSGI cada dashboard abierto ocupa un hilo del servidor durante todo
+# el flujo. Solo se sirve con esta opción (runserver); en producción los
+# eventos en vivo requieren ASGI y sin ella la vista responde 204.
+DASHBOARD_EVENTOS_WSGI = os.getenv("DASHBOARD_EVENTOS_WSGI", "False") == "True"
+
+# ----------------------------------------------------------------------
+# Carrito de compras
+# ----------------------------------------------------------------------
+# Dónde se guardan las líneas del carrito (ver pedidos/carrito.py):
+#   'pedidos.carrito.AlmacenSesion' -> dentro de la sesión (se pierde con ella)
+#   'pedidos.carrito.AlmacenBD'     -> tabla linea_carrito (persistente)
+#   'pedidos.carrito.AlmacenCache'  -> caché por defecto (Redis en producción)
+CARRITO_BACKEND = 'pedidos.carrito.AlmacenBD'
+# Vencimiento de los carritos en caché y de los anónimos en la base (segundos)
+CARRITO_TTL = 30 * 24 * 60 * 60
+# Segundos que se retienen las unidades agregadas al carrito (ver
+# pedidos/reservas.py); `python manage.py liberar_reservas` las devuelve.
+RESERVA_TTL = 15 * 60
+# Unidades que un mismo carrito puede tener reservadas en total, para que
+# un solo visitante no acapare el stock
+RESERVA_MAX_UNIDADES = 50
+# Segundos que se recuerda la clave de idempotencia de cada checkout
+# (pedidos/servicios.py); `limpiar_carritos` borra las vencidas.
+PEDIDO_CLAVE_TTL = 60 * 60
+
+# ----------------------------------------------------------------------
+# Reportes en segundo plano
+# ----------------------------------------------------------------------
+# Segundos durante los que un reporte generado se reutiliza para pedidos
+# idénticos (mismo reporte, formato y filtros) antes de volver a generarlo.
+# Los archivos los genera `python manage.py procesar_reportes`.
+REPORTES_TTL = 15 * 60
+# Segundos durante los que un reporte listo se puede descargar; después
+# `procesar_reportes` borra el trabajo y su archivo.
+REPORTES_RETENCION = 7 * 24 * 60 * 60
+# Carpeta privada de los archivos generados (no se publica como MEDIA)
+REPORTES_ROOT = BASE_DIR / 'reportes_generados'
+
 # ----------------------------------------------------------------------
 # Configuraciones de Sesión
 # ----------------------------------------------------------------------
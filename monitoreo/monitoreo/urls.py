@@ -1,10 +1,12 @@
 """
 URL configuration for monitoreo project.
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from core.views import servir_media
 from rest_framework.authtoken.views import obtain_auth_token
 
 
@@ -29,6 +31,7 @@ urlpatterns = [
 
     # --- ¡NUEVA LÍNEA AÑADIDA! ---
     path('proveedores/', include(('proveedores.urls', 'proveedores'), namespace='proveedores')),
+    path('reportes/', include(('reportes.urls', 'reportes'), namespace='reportes')),
     path('api/', include('api.urls')), # <--- Agrega esta línea
     path('api/login/', obtain_auth_token, name='api_login'),
     
@@ -37,4 +40,8 @@ urlpatterns = [
 
 # Configuración para servir archivos multimedia (imágenes) en modo de desarrollo
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # (los blobs de 'contenido/' se sirven con Cache-Control inmutable)
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), servir_media,
+                {'document_root': settings.MEDIA_ROOT}),
+    ]
\ No newline at end of file
@@ -1,36 +1,32 @@
-import csv
-from django.http import HttpResponse
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils.text import slugify
+
+from reportes.exportacion import accion_exportar_csv
 
 # --- ¡Importaciones Corregidas! ---
 from .models import (
-    Cliente, Venta, DetalleVenta, Pedido, DetallePedido, Lote
+    Cliente, Venta, DetalleVenta, Pedido, DetallePedido, Lote, TransicionPedido
 )
+from . import estados
 
 # --- Acción personalizada: exportar ventas ---
-def exportar_ventas_csv(modeladmin, request, queryset):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="ventas.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['ID Venta', 'Usuario Email', 'Usuario Nombre', 'Estado', 'Cliente ID', 'Num detalles', 'Fecha'])
+exportar_ventas_csv = accion_exportar_csv('ventas', "📤 Exportar ventas seleccionadas a CSV")
 
-    qs = queryset.select_related('Usuarios', 'clientes_idclientes')
-    for venta in qs:
-        usuario_email = getattr(venta.Usuarios, 'email', '')
-        usuario_nombre = " ".join(filter(None, [getattr(venta.Usuarios, 'first_name',''), getattr(venta.Usuarios, 'last_name','')])).strip()
-        cliente_id = getattr(venta.clientes_idclientes, 'idclientes', getattr(venta.clientes_idclientes, 'pk', ''))
-        num_detalles = venta.detalleventa_set.count() if hasattr(venta, 'detalleventa_set') else 0
-        fecha = getattr(venta, 'fecha_pedido', '')
-        writer.writerow([
-            venta.idventa,
-            usuario_email,
-            usuario_nombre,
-            venta.EstadoPedido or '',
-            cliente_id,
-            num_detalles,
-            fecha
-        ])
-exportar_ventas_csv.short_description = "📤 Exportar ventas seleccionadas a CSV"
+# --- Acciones de estado de pedidos (un UPDATE por acción, ver pedidos/estados.py) ---
+def accion_transicionar(destino):
+    def accion(modeladmin, request, queryset):
+        cambiados = estados.transicionar(queryset, destino, usuario=request.user)
+        ignorados = queryset.count() - cambiados
+        modeladmin.message_user(request, f"{cambiados} pedidos pasaron a «{destino}».")
+        if ignorados:
+            modeladmin.message_user(
+                request, f"{ignorados} pedidos no pueden pasar a «{destino}» desde su estado actual.",
+                messages.WARNING,
+            )
+    accion.short_description = f"Pasar a «{destino}»"
+    accion.__name__ = 'pasar_a_' + slugify(destino).replace('-', '_')
+    accion.allowed_permissions = ('change',)
+    return accion
 
 # --- Admin Operacionales ---
 @admin.register(Cliente)
@@ -69,6 +65,15 @@ class DetallePedidoInline(admin.TabularInline):
     extra = 0
     readonly_fields = ('producto', 'cantidad', 'precio')
 
+# --- Inline para la bitácora de estados (solo lectura) ---
+class TransicionPedidoInline(admin.TabularInline):
+    model = TransicionPedido
+    extra = 0
+    fields = ('fecha', 'desde', 'hacia', 'usuario')
+    readonly_fields = fields
+    def has_add_permission(self, request, obj=None): return False
+    def has_delete_permission(self, request, obj=None): return False
+
 # --- Admin para Pedido ---
 @admin.register(Pedido)
 class PedidoAdmin(admin.ModelAdmin):
@@ -76,6 +81,15 @@ class PedidoAdmin(admin.ModelAdmin):
     list_filter = ('estado', 'fecha_pedido')
     search_fields = ('id', 'usuario__email')
     ordering = ('-fecha_pedido',)
-    list_editable = ('estado',)
-    inlines = [DetallePedidoInline]
+    list_select_related = ('usuario',)
+    # El estado solo cambia por las acciones (transiciones válidas y bitácora);
+    # cliente y total los fija el checkout (ResumenPedido los replica)
+    readonly_fields = ('usuario', 'total', 'estado')
+    inlines = [DetallePedidoInline, TransicionPedidoInline]
+    actions = [
+        accion_transicionar(estados.EN_PREPARACION),
+        accion_transicionar(estados.ENVIADO),
+        accion_transicionar(estados.COMPLETADO),
+        accion_transicionar(estados.CANCELADO),
+    ]
     def has_module_permission(self, request): return request.user.is_superuser
\ No newline at end of file
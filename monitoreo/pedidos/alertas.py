@@ -0,0 +1,142 @@
+"""
+Alertas de vencimiento: ReglaAlertaVencimiento -> Notificacion.
+
+Un par ProductoReglaAlerta avisa desde `caducidad - dias_anticipacion`
+hasta la caducidad. evaluar_alertas() (comando evaluar_alertas, pensado
+para cron o para quedar corriendo) busca con una sola consulta los pares
+cuyo aviso empieza y escribe una Notificacion por par y por usuario del
+personal con bulk_create.
+
+La consulta no resta días a fechas en SQL (cada base lo escribe distinto):
+las reglas usan pocos valores de dias_anticipacion, así que la condición
+es un OR con un rango sobre caducidad por cada valor.
+
+Es incremental: MarcaAlertas recuerda el último día evaluado, el último
+par visto y la hora de la última ejecución. La siguiente solo considera
+los pares que entraron en su ventana después de ese día, los pares nuevos
+y los productos modificados desde entonces (Producto.modificado). Repetir
+el mismo día no encuentra nada. Aun así, la restricción única de
+Notificacion (usuario, producto, regla, caducidad) y ignore_conflicts
+hacen que volver a evaluar, con `completo=True` o en paralelo, no duplique
+avisos.
+"""
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from catalogo.models import Producto, ProductoReglaAlerta, ReglaAlertaVencimiento
+from usuarios.models import Usuario
+
+from .models import MarcaAlertas, Notificacion
+
+MOTOR = 'vencimiento'
+# Ventana de los productos sin reglas asignadas (la del dashboard)
+DIAS_POR_DEFECTO = 7
+
+
+def _anticipaciones():
+    return sorted(set(ReglaAlertaVencimiento.objects.values_list('dias_anticipacion', flat=True)))
+
+
+def _por_anticipacion(anticipaciones, condicion):
+    """
+    OR de `condicion(dias)` restringida a las reglas con esa anticipación.
+    """
+    return reduce(or_, [Q(regla__dias_anticipacion=dias) & condicion(dias) for dias in anticipaciones], Q(pk__in=[]))
+
+
+def pares_a_notificar(hoy, marca=None):
+    """
+    ProductoReglaAlerta en su ventana de aviso hoy. Con `marca`, solo los
+    que la ejecución anterior no pudo ver.
+    """
+    anticipaciones = _anticipaciones()
+    en_ventana = _por_anticipacion(
+        anticipaciones, lambda dias: Q(producto__caducidad__gte=hoy, producto__caducidad__lte=hoy + timedelta(days=dias)),
+    )
+    pares = ProductoReglaAlerta.objects.filter(en_ventana)
+    if marca is not None:
+        pares = pares.filter(
+            # Su aviso empezó después del último día evaluado...
+            _por_anticipacion(anticipaciones, lambda dias: Q(producto__caducidad__gt=marca.hasta + timedelta(days=dias)))
+            # ...o el par o el producto cambiaron desde la última ejecución
+            | Q(pk__gt=marca.ultimo_par)
+            | Q(producto__modificado__gte=marca.ejecutado)
+        )
+    return pares.order_by()
+
+
+def mensaje_alerta(nombre, caducidad, regla):
+    return f"{nombre} vence el {caducidad:%d/%m/%Y} (regla {regla})."[:255]
+
+
+@transaction.atomic
+def evaluar_alertas(hoy=None, completo=False, batch_size=1000):
+    """
+    Escribe las notificaciones de vencimiento pendientes y avanza la marca.
+    Con `completo`, ignora la marca y revisa todos los pares en ventana.
+    Devuelve (pares evaluados, notificaciones creadas).
+    """
+    hoy = hoy or timezone.localdate()
+    ahora = timezone.now()
+    marca, creada = MarcaAlertas.objects.select_for_update().get_or_create(
+        motor=MOTOR, defaults={'hasta': hoy, 'ejecutado': ahora},
+    )
+    # Antes de evaluar: un par creado durante la consulta queda para la próxima
+    ultimo_par = ProductoReglaAlerta.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0
+    pares = list(pares_a_notificar(hoy, None if creada or completo else marca).values_list(
+        'pk', 'producto_id', 'producto__nombre', 'producto__caducidad', 'regla_id', 'regla__nombre',
+    ))
+
+    creadas = 0
+    if pares:
+        destinatarios = list(Usuario.objects.filter(is_active=True, is_staff=True).values_list('pk', flat=True))
+        # Las ya avisadas se descartan antes de insertar, mirando solo los
+        # productos de estos pares; `creadas` cuenta lo que de verdad se
+        # inserta porque la marca (select_for_update) serializa las evaluaciones
+        productos = sorted({producto for _, producto, *_ in pares})
+        avisadas = set()
+        for i in range(0, len(productos), batch_size):
+            avisadas.update(Notificacion.objects.filter(
+                producto_id__in=productos[i:i + batch_size], regla__isnull=False,
+            ).values_list('usuario_id', 'producto_id', 'regla_id', 'caducidad'))
+        nuevas = [
+            Notificacion(
+                usuario_id=usuario, producto_id=producto, regla_id=regla, caducidad=caducidad,
+                mensaje=mensaje_alerta(nombre, caducidad, nombre_regla),
+            )
+            for _, producto, nombre, caducidad, regla, nombre_regla in pares
+            for usuario in destinatarios
+            if (usuario, producto, regla, caducidad) not in avisadas
+        ]
+        Notificacion.objects.bulk_create(
+            nuevas,
+            batch_size=batch_size,
+            # Un aviso creado por otra vía choca con notificacion_alerta_unica y se omite
+            ignore_conflicts=True,
+        )
+        creadas = len(nuevas)
+
+    marca.hasta = max(marca.hasta, hoy)
+    marca.ultimo_par = max(marca.ultimo_par, ultimo_par)
+    marca.ejecutado = ahora
+    marca.save()
+    return len(pares), creadas
+
+
+def productos_por_vencer(hoy):
+    """
+    Productos en su ventana de aviso hoy: la de sus reglas o, si no tienen,
+    los DIAS_POR_DEFECTO días del dashboard.
+    """
+    reglas = ProductoReglaAlerta.objects.filter(producto=OuterRef('pk'))
+    sin_reglas = ~Exists(reglas) & Q(caducidad__lte=hoy + timedelta(days=DIAS_POR_DEFECTO))
+    con_reglas = [
+        Exists(reglas.filter(regla__dias_anticipacion=dias)) & Q(caducidad__lte=hoy + timedelta(days=dias))
+        for dias in _anticipaciones()
+    ]
+    return Producto.objects.filter(reduce(or_, con_reglas, sin_reglas), caducidad__gte=hoy)
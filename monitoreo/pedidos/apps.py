@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class PedidosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pedidos'
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+        from . import signals  # noqa: F401
+        from .carrito import fusionar_carrito_al_iniciar_sesion
+        user_logged_in.connect(fusionar_carrito_al_iniciar_sesion, dispatch_uid='pedidos_fusionar_carrito')
@@ -0,0 +1,87 @@
+"""
+Búsqueda del listado de pedidos.
+
+Cada cliente tiene sus términos normalizados (ver catalogo.busqueda.normalizar)
+en TerminoCliente: las palabras de su nombre y apellido, el correo completo y
+sus partes ("cliente", "forneria", "cl"). Se escriben al crear el usuario y
+se reescriben, solo los que cambian, cuando modifica sus datos
+(pedidos/signals.py).
+
+Cada palabra de la búsqueda se resuelve con `termino LIKE 'palabra%'` sobre
+el índice único (termino, usuario), y el pedido debe coincidir con todas
+(AND). El costo depende de los clientes que coinciden, no del tamaño de la
+tabla de pedidos. A cambio solo se encuentran prefijos de palabra: "munoz"
+y "mu" encuentran a "Muñoz", pero "noz" no (un `LIKE '%q%'` no puede usar
+el índice y recorre la tabla completa).
+"""
+import re
+
+from catalogo.busqueda import normalizar
+
+LARGO_BUSQUEDA = 191
+
+_SEPARADORES_CORREO = re.compile(r'[@._+-]+')
+
+
+def terminos_cliente(usuario):
+    """
+    Conjunto de términos por los que se puede buscar a `usuario`.
+    """
+    terminos = set(normalizar(f"{usuario.first_name} {usuario.last_name}").split())
+    correo = normalizar(usuario.email or '').strip()
+    if correo:
+        terminos.add(correo)
+        terminos.update(p for p in _SEPARADORES_CORREO.split(correo) if p)
+    return {t[:LARGO_BUSQUEDA] for t in terminos}
+
+
+def indexar_cliente(usuario):
+    """
+    Deja los TerminoCliente de `usuario` al día, tocando solo las filas
+    que cambiaron.
+    """
+    from .models import TerminoCliente
+
+    nuevos = terminos_cliente(usuario)
+    actuales = set(TerminoCliente.objects.filter(usuario_id=usuario.pk).values_list('termino', flat=True))
+    if nuevos == actuales:
+        return
+    quitados = actuales - nuevos
+    if quitados:
+        TerminoCliente.objects.filter(usuario_id=usuario.pk, termino__in=quitados).delete()
+    TerminoCliente.objects.bulk_create(
+        [TerminoCliente(usuario_id=usuario.pk, termino=t) for t in nuevos - actuales],
+        ignore_conflicts=True,
+    )
+
+
+def estado_buscado(q):
+    """
+    Estado de pedido que coincide con `q` ("enviado", "en preparacion"), o None.
+    """
+    from .models import Pedido
+
+    buscado = normalizar(q.strip())
+    for estado, _ in Pedido.ESTADO_CHOICES:
+        if normalizar(estado) == buscado:
+            return estado
+    return None
+
+
+def buscar_pedidos(queryset, q):
+    """
+    Filtra `queryset` (de ResumenPedido) por cliente (prefijos de nombre,
+    apellido o correo) o por estado.
+    """
+    from .models import TerminoCliente
+
+    q = (q or '').strip()
+    if not q:
+        return queryset
+    estado = estado_buscado(q)
+    if estado:
+        return queryset.filter(estado=estado)
+    for palabra in dict.fromkeys(normalizar(q).split()):
+        clientes = TerminoCliente.objects.filter(termino__startswith=palabra[:LARGO_BUSQUEDA])
+        queryset = queryset.filter(usuario_id__in=clientes.values('usuario_id'))
+    return queryset
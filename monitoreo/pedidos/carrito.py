@@ -0,0 +1,345 @@
+"""
+Carrito de compras de la tienda.
+
+Dónde se guardan las líneas lo decide settings.CARRITO_BACKEND:
+
+* AlmacenSesion: dentro de la sesión ({'<producto_id>': cantidad}), como
+  siempre. Cada cambio reescribe la fila completa de la sesión y el carrito
+  muere con ella.
+* AlmacenBD: una fila LineaCarrito por producto. Agregar un producto es un
+  UPDATE (o INSERT) de esa sola línea; el carrito del usuario sobrevive a la
+  sesión y se comparte entre dispositivos.
+* AlmacenCache: un registro pequeño por carrito en la caché (Redis en
+  producción), con vencimiento CARRITO_TTL.
+
+Con los dos últimos, el carrito anónimo se identifica con un token guardado
+una sola vez en la sesión, y al iniciar sesión se fusiona con el carrito del
+usuario (ver fusionar_carrito_al_iniciar_sesion).
+
+Para mostrarlo, los productos de todas las líneas se cargan con UNA consulta
+(`in_bulk` con `.only()`) y los totales se calculan en la misma pasada. Las
+líneas cuyo producto ya no existe se quitan en vez de romper la página.
+"""
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from catalogo.models import Producto
+
+from .models import LineaCarrito
+from .reservas import liberar, reservar, transferir as transferir_reservas
+
+CLAVE_SESION = 'carrito'
+CLAVE_ANONIMO = 'carrito_anonimo'
+
+# Lo que necesitan el carrito y el checkout; el resto de la fila no se lee
+CAMPOS_PRODUCTO = ('id', 'nombre', 'marca', 'precio', 'stock_actual')
+
+
+def normalizar_lineas(datos):
+    """
+    {'12': 2, ...} -> {12: 2, ...}, descartando ids o cantidades inválidas
+    y cantidades <= 0.
+    """
+    lineas = {}
+    for producto_id, cantidad in datos.items():
+        try:
+            producto_id, cantidad = int(producto_id), int(cantidad)
+        except (TypeError, ValueError):
+            continue
+        if cantidad > 0:
+            lineas[producto_id] = lineas.get(producto_id, 0) + cantidad
+    return lineas
+
+
+def ttl_carrito():
+    return getattr(settings, 'CARRITO_TTL', 30 * 24 * 60 * 60)
+
+
+# ----------------------------------------
+# ALMACENES
+# ----------------------------------------
+class AlmacenSesion:
+    """
+    Líneas dentro de request.session.
+    """
+
+    def __init__(self, request, usuario=None):
+        self.session = request.session
+        usuario = usuario or getattr(request, 'user', None)
+        self.usuario_id = usuario.pk if usuario is not None and usuario.is_authenticated else None
+
+    def dueno(self, crear=False):
+        """
+        Identifica el carrito: 'u<id>' para usuarios, 'a<token>' para
+        visitantes. El token se guarda en la sesión solo cuando se necesita.
+        """
+        if self.usuario_id is not None:
+            return f'u{self.usuario_id}'
+        token = self.session.get(CLAVE_ANONIMO)
+        if token is None and crear:
+            token = self.session[CLAVE_ANONIMO] = secrets.token_hex(16)
+        return f'a{token}' if token else None
+
+    def leer(self):
+        return normalizar_lineas(self.session.get(CLAVE_SESION, {}))
+
+    def _guardar(self, lineas):
+        self.session[CLAVE_SESION] = {str(pk): cantidad for pk, cantidad in lineas.items()}
+
+    def agregar(self, producto_id, cantidad):
+        lineas = self.leer()
+        lineas[producto_id] = lineas.get(producto_id, 0) + cantidad
+        self._guardar(lineas)
+
+    def quitar(self, producto_ids):
+        lineas = self.leer()
+        for producto_id in producto_ids:
+            lineas.pop(producto_id, None)
+        self._guardar(lineas)
+
+    def vaciar(self):
+        self.session[CLAVE_SESION] = {}
+
+    def absorber(self, dueno):
+        # El carrito de sesión ya pasa intacto a la sesión autenticada
+        pass
+
+
+class AlmacenServidor(AlmacenSesion):
+    """
+    Base de los almacenes fuera de la sesión: las líneas se guardan por
+    `dueno`, y la sesión solo lleva el token del carrito anónimo.
+    """
+
+    def _migrar_sesion(self):
+        # Carrito guardado en la sesión antes de cambiar de almacén
+        lineas = normalizar_lineas(self.session.pop(CLAVE_SESION, {}))
+        if lineas:
+            dueno = self.dueno(crear=True)
+            for producto_id, cantidad in lineas.items():
+                self._agregar(dueno, producto_id, cantidad)
+
+    def leer(self):
+        if CLAVE_SESION in self.session:
+            self._migrar_sesion()
+        dueno = self.dueno()
+        return self._leer(dueno) if dueno else {}
+
+    def agregar(self, producto_id, cantidad):
+        if CLAVE_SESION in self.session:
+            self._migrar_sesion()
+        self._agregar(self.dueno(crear=True), producto_id, cantidad)
+
+    def quitar(self, producto_ids):
+        dueno = self.dueno()
+        if dueno:
+            self._quitar(dueno, producto_ids)
+
+    def vaciar(self):
+        dueno = self.dueno()
+        if dueno:
+            self._vaciar(dueno)
+
+    def absorber(self, origen):
+        """
+        Suma las líneas del carrito `origen` (el anónimo) a este y lo borra.
+        """
+        destino = self.dueno()
+        if not destino or origen == destino:
+            return
+        for producto_id, cantidad in self._leer(origen).items():
+            self._agregar(destino, producto_id, cantidad)
+        self._vaciar(origen)
+
+
+class AlmacenBD(AlmacenServidor):
+    """
+    Una fila LineaCarrito por (dueño, producto).
+    """
+
+    def _lineas(self, dueno):
+        return LineaCarrito.objects.filter(dueno=dueno)
+
+    def _leer(self, dueno):
+        return dict(self._lineas(dueno).values_list('producto_id', 'cantidad'))
+
+    def _agregar(self, dueno, producto_id, cantidad):
+        lineas = self._lineas(dueno).filter(producto_id=producto_id)
+        if lineas.update(cantidad=F('cantidad') + cantidad, actualizado=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                LineaCarrito.objects.create(dueno=dueno, producto_id=producto_id, cantidad=cantidad)
+        except IntegrityError:
+            # Otra petición creó la línea entre el UPDATE y el INSERT
+            lineas.update(cantidad=F('cantidad') + cantidad, actualizado=timezone.now())
+
+    def _quitar(self, dueno, producto_ids):
+        self._lineas(dueno).filter(producto_id__in=producto_ids).delete()
+
+    def _vaciar(self, dueno):
+        self._lineas(dueno).delete()
+
+    def unidades(self):
+        dueno = self.dueno()
+        if not dueno:
+            return 0
+        return self._lineas(dueno).aggregate(total=Sum('cantidad'))['total'] or 0
+
+
+class AlmacenCache(AlmacenServidor):
+    """
+    Un registro {producto_id: cantidad} por carrito en la caché por defecto.
+    """
+
+    def _clave(self, dueno):
+        return f'carrito:{dueno}'
+
+    def _leer(self, dueno):
+        return dict(cache.get(self._clave(dueno), {}))
+
+    def _escribir(self, dueno, lineas):
+        if lineas:
+            cache.set(self._clave(dueno), lineas, timeout=ttl_carrito())
+        else:
+            cache.delete(self._clave(dueno))
+
+    def _agregar(self, dueno, producto_id, cantidad):
+        lineas = self._leer(dueno)
+        lineas[producto_id] = lineas.get(producto_id, 0) + cantidad
+        self._escribir(dueno, lineas)
+
+    def _quitar(self, dueno, producto_ids):
+        lineas = self._leer(dueno)
+        for producto_id in producto_ids:
+            lineas.pop(producto_id, None)
+        self._escribir(dueno, lineas)
+
+    def _vaciar(self, dueno):
+        cache.delete(self._clave(dueno))
+
+
+def clase_almacen():
+    return import_string(getattr(settings, 'CARRITO_BACKEND', 'pedidos.carrito.AlmacenSesion'))
+
+
+# ----------------------------------------
+# CARRITO
+# ----------------------------------------
+class ContenidoCarrito:
+    """
+    Líneas hidratadas del carrito: `items` es una lista de
+    {'producto', 'cantidad', 'subtotal'}, como la espera ver_carrito.html.
+    """
+
+    def __init__(self, items, quitadas):
+        self.items = items
+        self.quitadas = quitadas
+        self.total = sum(item['subtotal'] for item in items)
+        self.unidades = sum(item['cantidad'] for item in items)
+
+
+class Carrito:
+    def __init__(self, request):
+        self.almacen = clase_almacen()(request)
+
+    def lineas(self):
+        """
+        {producto_id: cantidad}, sin cargar los productos.
+        """
+        return self.almacen.leer()
+
+    def unidades(self):
+        """
+        Total de unidades (para el contador del menú).
+        """
+        if hasattr(self.almacen, 'unidades'):
+            return self.almacen.unidades()
+        return sum(self.lineas().values())
+
+    def __bool__(self):
+        return bool(self.lineas())
+
+    def dueno(self, crear=False):
+        return self.almacen.dueno(crear)
+
+    def agregar(self, producto, cantidad=1):
+        """
+        Reserva las unidades (ver pedidos/reservas.py) y las suma al carrito.
+        Lanza SinDisponibilidad si no alcanzan.
+        """
+        cantidad = max(int(cantidad), 1)
+        reservar(self.dueno(crear=True), producto, cantidad)
+        self.almacen.agregar(producto.pk, cantidad)
+
+    def quitar(self, *producto_ids):
+        """
+        Quita las líneas y devuelve al stock lo que tenían reservado.
+        """
+        producto_ids = [int(pk) for pk in producto_ids]
+        self.almacen.quitar(producto_ids)
+        dueno = self.dueno()
+        if dueno:
+            liberar(dueno, producto_ids)
+
+    def vaciar(self):
+        self.almacen.vaciar()
+        dueno = self.dueno()
+        if dueno:
+            liberar(dueno)
+
+    def contenido(self):
+        """
+        Carga los productos del carrito en una consulta y calcula subtotales
+        y totales. Quita del carrito las líneas cuyo producto ya no existe.
+        """
+        lineas = self.lineas()
+        productos = Producto.objects.only(*CAMPOS_PRODUCTO).in_bulk(list(lineas)) if lineas else {}
+
+        items = []
+        faltantes = []
+        for producto_id, cantidad in lineas.items():
+            producto = productos.get(producto_id)
+            if producto is None:
+                faltantes.append(producto_id)
+                continue
+            items.append({
+                'producto': producto,
+                'cantidad': cantidad,
+                'subtotal': int(producto.precio or 0) * cantidad,
+            })
+
+        if faltantes:
+            self.almacen.quitar(faltantes)
+        return ContenidoCarrito(items, len(faltantes))
+
+
+def fusionar_carrito_al_iniciar_sesion(sender, request, user, **kwargs):
+    """
+    Receptor de user_logged_in: pasa el carrito anónimo al del usuario.
+    login() conserva los datos de la sesión, así que el token sigue ahí.
+    """
+    if request is None or not hasattr(request, 'session'):
+        return
+    token = request.session.pop(CLAVE_ANONIMO, None)
+    if token:
+        almacen = clase_almacen()(request, usuario=user)
+        almacen.absorber(f'a{token}')
+        transferir_reservas(f'a{token}', almacen.dueno())
+
+
+def limpiar_carritos_anonimos(dias):
+    """
+    Borra las líneas de carritos anónimos (AlmacenBD) sin cambios hace más
+    de `dias` días. Devuelve cuántas se borraron.
+    """
+    limite = timezone.now() - timedelta(days=dias)
+    borradas, _ = LineaCarrito.objects.filter(dueno__startswith='a', actualizado__lt=limite).delete()
+    return borradas
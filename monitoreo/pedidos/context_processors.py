@@ -0,0 +1,13 @@
+from django.utils.functional import SimpleLazyObject
+
+from .carrito import Carrito
+
+
+def carrito(request):
+    """
+    Unidades en el carrito para el contador del menú. Se calcula solo si la
+    plantilla lo usa (con AlmacenBD es un SUM sobre las líneas del dueño).
+    """
+    if not hasattr(request, 'session'):
+        return {}
+    return {'carrito_unidades': SimpleLazyObject(lambda: Carrito(request).unidades())}
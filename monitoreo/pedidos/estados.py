@@ -0,0 +1,125 @@
+"""
+Máquina de estados de los pedidos.
+
+Pedido.estado solo avanza por las transiciones de TRANSICIONES:
+
+    Pendiente -> En preparación -> Enviado -> Completado
+        \\               \\
+         +-> Cancelado <--+
+
+transicionar() mueve un conjunto de pedidos (miles, desde una acción del
+admin) con un solo UPDATE protegido por el estado de origen, así que un
+pedido que otro usuario movió mientras tanto no se toca; ResumenPedido se
+actualiza con otro UPDATE en la misma transacción. Cada cambio deja una
+fila en TransicionPedido (bulk_create). Al cancelar, el stock de todos
+los detalles se repone con un UPDATE por lote, no una línea a la vez, y
+los pedidos se restan de VentaDiaria/VentaHoraria (pedidos/ventas.py).
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from catalogo.models import Producto
+from catalogo.facetas import invalidar_si_cambia_disponibilidad
+from core.widgets import invalidar_al_confirmar
+
+from .models import DetallePedido, Pedido, ResumenPedido, TransicionPedido
+from .reservas import bloquear_productos
+from .ventas import descontar_ventas
+
+PENDIENTE = 'Pendiente'
+EN_PREPARACION = 'En preparación'
+ENVIADO = 'Enviado'
+COMPLETADO = 'Completado'
+CANCELADO = 'Cancelado'
+
+TRANSICIONES = {
+    PENDIENTE: {EN_PREPARACION, CANCELADO},
+    EN_PREPARACION: {ENVIADO, CANCELADO},
+    ENVIADO: {COMPLETADO},
+    COMPLETADO: set(),
+    CANCELADO: set(),
+}
+
+
+class TransicionInvalida(Exception):
+    def __init__(self, desde, hacia):
+        self.desde = desde
+        self.hacia = hacia
+        super().__init__(f"Un pedido {desde.lower()} no puede pasar a {hacia.lower()}.")
+
+
+def origenes(destino):
+    """
+    Estados desde los que se puede llegar a `destino`.
+    """
+    if destino not in TRANSICIONES:
+        raise ValueError(f"Estado desconocido: {destino}")
+    return sorted(estado for estado, destinos in TRANSICIONES.items() if destino in destinos)
+
+
+def puede_pasar(desde, hacia):
+    return hacia in TRANSICIONES.get(desde, ())
+
+
+def _reponer_stock(pedido_ids, batch_size):
+    for i in range(0, len(pedido_ids), batch_size):
+        sumas = dict(
+            DetallePedido.objects.filter(pedido_id__in=pedido_ids[i:i + batch_size]).order_by()
+            .values('producto_id').annotate(total=Sum('cantidad')).values_list('producto_id', 'total')
+        )
+        if not sumas:
+            continue
+        # Mismo orden de bloqueo que el checkout: productos por id
+        bloquear_productos(sumas)
+        Producto.objects.filter(pk__in=sumas).update(stock_actual=F('stock_actual') + Case(
+            *[When(pk=pk, then=Value(total)) for pk, total in sumas.items()],
+            default=Value(0), output_field=IntegerField(),
+        ))
+        # update() no dispara las señales del catálogo
+        invalidar_si_cambia_disponibilidad(sumas)
+
+
+@transaction.atomic
+def transicionar(pedidos, destino, usuario=None, batch_size=1000):
+    """
+    Pasa a `destino` los pedidos del queryset `pedidos` que puedan hacerlo
+    y registra cada cambio. Los que estén en otro estado se ignoran.
+    Devuelve cuántos pedidos cambiaron.
+    """
+    permitidos = origenes(destino)
+    # Se bloquean y leen una vez: el estado anterior va a la bitácora
+    filas = list(
+        pedidos.filter(estado__in=permitidos).select_for_update()
+        .order_by('pk').values_list('pk', 'estado', 'fecha_pedido', 'total')
+    )
+    if not filas:
+        return 0
+
+    ids = [pk for pk, *_ in filas]
+    Pedido.objects.filter(pk__in=ids, estado__in=permitidos).update(estado=destino)
+    ResumenPedido.objects.filter(pk__in=ids).update(estado=destino)
+    TransicionPedido.objects.bulk_create(
+        [TransicionPedido(pedido_id=pk, desde=estado, hacia=destino, usuario=usuario) for pk, estado, *_ in filas],
+        batch_size=batch_size,
+    )
+
+    # update() no dispara señales: el dashboard se invalida a mano
+    invalidar_al_confirmar('pedidos_pendientes')
+    if destino == CANCELADO:
+        _reponer_stock(ids, batch_size)
+        # Los cancelados dejan de contar en el gráfico de ventas
+        descontar_ventas([(fecha, total) for _, _, fecha, total in filas])
+        invalidar_al_confirmar('ventas')
+    return len(ids)
+
+
+def transicionar_pedido(pedido, destino, usuario=None):
+    """
+    Cambia el estado de un solo pedido. Lanza TransicionInvalida si no está
+    permitido (o si otro usuario lo cambió antes).
+    """
+    if not puede_pasar(pedido.estado, destino) or not transicionar(
+        Pedido.objects.filter(pk=pedido.pk, estado=pedido.estado), destino, usuario,
+    ):
+        raise TransicionInvalida(pedido.estado, destino)
+    pedido.estado = destino
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pedidos.alertas import evaluar_alertas
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera las notificaciones de vencimiento según las reglas de alerta de cada producto. '
+        'Solo revisa lo que cambió desde la ejecución anterior; repetirlo no duplica avisos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo', action='store_true',
+            help='Revisa todos los pares en ventana, no solo los nuevos (p. ej. tras cambiar los días de una regla).',
+        )
+        parser.add_argument(
+            '--cada', type=float, default=None,
+            help='Queda corriendo y evalúa cada N minutos, en vez de una sola vez (alternativa a programarlo con cron).',
+        )
+
+    def handle(self, *args, **options):
+        completo = options['completo']
+        try:
+            while True:
+                inicio = time.perf_counter()
+                pares, creadas = evaluar_alertas(completo=completo)
+                self.stdout.write(self.style.SUCCESS(
+                    f"✔ {pares} pares producto/regla evaluados, {creadas} notificaciones creadas "
+                    f"en {time.perf_counter() - inicio:.2f}s."
+                ))
+                if options['cada'] is None:
+                    break
+                # Solo la primera vuelta es completa
+                completo = False
+                time.sleep(options['cada'] * 60)
+        except KeyboardInterrupt:
+            self.stdout.write("Detenido.")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pedidos.reservas import liberar_vencidas, recontar
+
+
+class Command(BaseCommand):
+    help = 'Libera las reservas de stock vencidas (carritos abandonados). Pensado para correr cada minuto.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=500,
+            help='Productos por transacción (por defecto 500).',
+        )
+        parser.add_argument(
+            '--recontar', action='store_true',
+            help='Además recalcula Producto.stock_reservado desde las reservas (corrige desvíos).',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        liberadas = liberar_vencidas(batch_size=options['batch'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ {liberadas} reservas vencidas liberadas en {time.perf_counter() - inicio:.2f}s."
+        ))
+        if options['recontar']:
+            corregidos = recontar()
+            self.stdout.write(f"  Contador recalculado: {corregidos} productos corregidos.")
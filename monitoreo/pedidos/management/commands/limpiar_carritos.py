@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from pedidos.carrito import limpiar_carritos_anonimos, ttl_carrito
+from pedidos.servicios import limpiar_claves_vencidas
+
+
+class Command(BaseCommand):
+    help = 'Borra las líneas de carritos anónimos abandonados (CARRITO_BACKEND = AlmacenBD) y las claves de pedido vencidas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=float, default=None,
+            help='Antigüedad mínima en días (por defecto CARRITO_TTL).',
+        )
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else ttl_carrito() / 86400
+        borradas = limpiar_carritos_anonimos(dias)
+        self.stdout.write(self.style.SUCCESS(f"✔ {borradas} líneas de carritos anónimos borradas (más de {dias:g} días)."))
+        claves = limpiar_claves_vencidas()
+        self.stdout.write(f"  {claves} claves de pedido vencidas borradas.")
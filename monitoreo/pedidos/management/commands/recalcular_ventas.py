@@ -0,0 +1,28 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pedidos.ventas import recalcular
+
+
+class Command(BaseCommand):
+    help = 'Rearma VentaDiaria y VentaHoraria (gráfico de ventas del dashboard) desde los pedidos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=None,
+            help='Solo los últimos N días (por defecto, todo el historial).',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['dias'] is not None:
+            desde = timezone.localdate() - timedelta(days=options['dias'])
+        inicio = time.perf_counter()
+        dias = recalcular(desde)
+        alcance = f"desde {desde:%d/%m/%Y}" if desde else "todo el historial"
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ Ventas recalculadas ({alcance}): {dias} días con ventas en {time.perf_counter() - inicio:.2f}s."
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pedidos.resumen import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Rearma ResumenPedido (modelo de lectura de listado, detalle y exportación) desde los pedidos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=1000,
+            help='Pedidos por transacción (por defecto 1000).',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        escritos = reconstruir(batch_size=options['batch'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ {escritos} resúmenes de pedido reconstruidos en {time.perf_counter() - inicio:.2f}s."
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0007_almacenamiento_contenido'),
+        ('pedidos', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LineaCarrito',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dueno', models.CharField(max_length=40)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='catalogo.producto')),
+            ],
+            options={
+                'db_table': 'linea_carrito',
+                'constraints': [models.UniqueConstraint(fields=('dueno', 'producto'), name='linea_carrito_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0008_stock_reservado'),
+        ('pedidos', '0003_linea_carrito'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dueno', models.CharField(max_length=40)),
+                ('cantidad', models.PositiveIntegerField()),
+                ('expira', models.DateTimeField(db_index=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='catalogo.producto')),
+            ],
+            options={
+                'db_table': 'reserva_stock',
+                'constraints': [models.UniqueConstraint(fields=('dueno', 'producto'), name='reserva_stock_unica')],
+            },
+        ),
+    ]
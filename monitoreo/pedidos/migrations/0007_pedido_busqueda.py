@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:30
+
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def texto_busqueda(usuario):
+    # Copia congelada de la normalización de entonces (minúsculas, sin
+    # tildes, espacios simples, 191 caracteres): no depende del código vivo
+    texto = ' '.join(f"{usuario.first_name} {usuario.last_name} {usuario.email}".split())
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))[:191]
+
+
+def llenar_busqueda(apps, schema_editor):
+    # Un UPDATE por cliente con pedidos
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    Usuario = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    clientes = Usuario.objects.filter(pk__in=Pedido.objects.values('usuario_id'))
+    for usuario in clientes.only('first_name', 'last_name', 'email').iterator(chunk_size=1000):
+        Pedido.objects.filter(usuario_id=usuario.pk).update(busqueda=texto_busqueda(usuario))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0006_transicion_pedido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='busqueda',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=191),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_pedido', 'id'], name='pedido_fecha_id_idx'),
+        ),
+        migrations.RunPython(llenar_busqueda, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:32
+
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+
+# Copia congelada del backfill (pedidos.resumen y pedidos.busqueda de
+# entonces): la migración no depende del código vivo de la app.
+
+def texto_busqueda(usuario):
+    texto = ' '.join(f"{usuario.first_name} {usuario.last_name} {usuario.email}".split())
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))[:191]
+
+
+def armar_resumen(ResumenPedido, pedido, filas):
+    usuario = pedido.usuario
+    productos = [
+        {
+            'nombre': nombre,
+            'marca': marca or '',
+            'cantidad': cantidad,
+            'precio': int(precio or 0),
+            'subtotal': int(precio or 0) * cantidad,
+        }
+        for nombre, marca, cantidad, precio in filas
+    ]
+    return ResumenPedido(
+        pedido_id=pedido.pk,
+        usuario_id=usuario.pk,
+        fecha_pedido=pedido.fecha_pedido,
+        estado=pedido.estado,
+        total=pedido.total,
+        cliente=f"{usuario.first_name} {usuario.last_name}".strip(),
+        correo=usuario.email,
+        busqueda=texto_busqueda(usuario),
+        lineas=len(productos),
+        unidades=sum(p['cantidad'] for p in productos),
+        productos=productos,
+    )
+
+
+def llenar_resumenes(apps, schema_editor, batch_size=1000):
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    DetallePedido = apps.get_model('pedidos', 'DetallePedido')
+    ResumenPedido = apps.get_model('pedidos', 'ResumenPedido')
+    ultimo = 0
+    while True:
+        pedidos = list(
+            Pedido.objects.filter(pk__gt=ultimo).select_related('usuario').order_by('pk')[:batch_size]
+        )
+        if not pedidos:
+            return
+        ultimo = pedidos[-1].pk
+
+        filas = {}
+        detalles = (
+            DetallePedido.objects.filter(pedido_id__in=[p.pk for p in pedidos]).order_by('pedido_id', 'pk')
+            .values_list('pedido_id', 'producto__nombre', 'producto__marca', 'cantidad', 'precio')
+        )
+        for pedido_id, *fila in detalles:
+            filas.setdefault(pedido_id, []).append(fila)
+
+        with transaction.atomic():
+            ResumenPedido.objects.filter(pk__in=[p.pk for p in pedidos]).delete()
+            ResumenPedido.objects.bulk_create([
+                armar_resumen(ResumenPedido, pedido, filas.get(pedido.pk, [])) for pedido in pedidos
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0007_pedido_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='pedido',
+            name='busqueda',
+        ),
+        migrations.CreateModel(
+            name='ResumenPedido',
+            fields=[
+                ('pedido', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='pedidos.pedido')),
+                ('fecha_pedido', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('En preparación', 'En preparación'), ('Enviado', 'Enviado'), ('Completado', 'Completado'), ('Cancelado', 'Cancelado')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cliente', models.CharField(max_length=301)),
+                ('correo', models.CharField(max_length=191)),
+                ('busqueda', models.CharField(db_index=True, max_length=191)),
+                ('lineas', models.PositiveIntegerField()),
+                ('unidades', models.PositiveIntegerField()),
+                ('productos', models.JSONField(default=list)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'resumen_pedido',
+                'indexes': [models.Index(fields=['fecha_pedido', 'pedido'], name='resumen_fecha_pedido_idx')],
+            },
+        ),
+        migrations.RunPython(llenar_resumenes, migrations.RunPython.noop),
+    ]
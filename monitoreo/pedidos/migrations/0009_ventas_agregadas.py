@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0008_resumen_pedido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('dia', models.DateField(primary_key=True, serialize=False)),
+                ('pedidos', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'db_table': 'venta_diaria',
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaHoraria',
+            fields=[
+                ('hora', models.DateTimeField(primary_key=True, serialize=False)),
+                ('pedidos', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'db_table': 'venta_horaria',
+            },
+        ),
+    ]
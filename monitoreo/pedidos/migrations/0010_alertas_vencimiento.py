@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0008_stock_reservado'),
+        ('pedidos', '0009_ventas_agregadas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaAlertas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('motor', models.CharField(max_length=50, unique=True)),
+                ('hasta', models.DateField()),
+                ('ultimo_par', models.IntegerField(default=0)),
+                ('ejecutado', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'marca_alertas',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='caducidad',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='regla',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='catalogo.reglaalertavencimiento'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificacion',
+            constraint=models.UniqueConstraint(fields=('usuario', 'producto', 'regla', 'caducidad'), name='notificacion_alerta_unica'),
+        ),
+    ]
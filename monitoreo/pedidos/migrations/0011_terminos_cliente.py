@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:25
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def terminos_cliente(usuario):
+    # Copia congelada de pedidos.busqueda.terminos_cliente
+    def normalizar(texto):
+        descompuesto = unicodedata.normalize('NFKD', (texto or '').lower())
+        return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+    terminos = set(normalizar(f"{usuario.first_name} {usuario.last_name}").split())
+    correo = normalizar(usuario.email).strip()
+    if correo:
+        terminos.add(correo)
+        terminos.update(p for p in re.split(r'[@._+-]+', correo) if p)
+    return {t[:191] for t in terminos}
+
+
+def llenar_terminos(apps, schema_editor):
+    TerminoCliente = apps.get_model('pedidos', 'TerminoCliente')
+    Usuario = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    lote = []
+    for usuario in Usuario.objects.only('first_name', 'last_name', 'email').iterator(chunk_size=1000):
+        lote.extend(TerminoCliente(usuario_id=usuario.pk, termino=t) for t in terminos_cliente(usuario))
+        if len(lote) >= 1000:
+            TerminoCliente.objects.bulk_create(lote)
+            lote = []
+    TerminoCliente.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0010_alertas_vencimiento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='resumenpedido',
+            name='busqueda',
+        ),
+        migrations.CreateModel(
+            name='TerminoCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=191)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'termino_cliente',
+                'unique_together': {('termino', 'usuario')},
+            },
+        ),
+        migrations.RunPython(llenar_terminos, migrations.RunPython.noop),
+    ]
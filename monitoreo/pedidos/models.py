@@ -1,6 +1,8 @@
 from django.db import models
 from usuarios.models import Usuario
-from catalogo.models import Producto
+from catalogo.models import Producto, ReglaAlertaVencimiento
+
+from .busqueda import LARGO_BUSQUEDA
 
 class Cliente(models.Model):
     idclientes = models.IntegerField(primary_key=True)
@@ -20,6 +22,8 @@ class Pedido(models.Model):
     fecha_pedido = models.DateTimeField(auto_now_add=True)
     total = models.DecimalField(max_digits=10, decimal_places=2)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='Pendiente')
+    class Meta:
+        indexes = [models.Index(fields=['fecha_pedido', 'id'], name='pedido_fecha_id_idx')]
     def __str__(self):
         return f"Pedido {self.id} de {self.usuario.email}"
 
@@ -31,9 +35,141 @@ class DetallePedido(models.Model):
     def __str__(self):
         return f"{self.cantidad} x {self.producto.nombre}"
 
+class ResumenPedido(models.Model):
+    """
+    Modelo de lectura del pedido: todo lo que muestran el listado, el
+    detalle y la exportación en una sola fila (ver pedidos/resumen.py).
+    Lo escriben el checkout y los cambios de estado, en su misma transacción.
+    `productos` es la lista [{nombre, marca, cantidad, precio, subtotal}]
+    tal como se compró.
+    """
+    pedido = models.OneToOneField(Pedido, primary_key=True, related_name='resumen', on_delete=models.CASCADE)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='+')
+    fecha_pedido = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=Pedido.ESTADO_CHOICES)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    cliente = models.CharField(max_length=301)
+    correo = models.CharField(max_length=191)
+    lineas = models.PositiveIntegerField()
+    unidades = models.PositiveIntegerField()
+    productos = models.JSONField(default=list)
+    class Meta:
+        db_table = 'resumen_pedido'
+        indexes = [models.Index(fields=['fecha_pedido', 'pedido'], name='resumen_fecha_pedido_idx')]
+    def __str__(self):
+        return f"Resumen del pedido {self.pedido_id}"
+
+class TerminoCliente(models.Model):
+    """
+    Términos normalizados del nombre y el correo de un cliente, para buscar
+    sus pedidos por prefijo (ver pedidos/busqueda.py).
+    """
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='+')
+    termino = models.CharField(max_length=LARGO_BUSQUEDA)
+    class Meta:
+        db_table = 'termino_cliente'
+        unique_together = ('termino', 'usuario')
+    def __str__(self):
+        return f"{self.termino} -> {self.usuario_id}"
+
+class VentaDiaria(models.Model):
+    """
+    Ventas (pedidos no cancelados) por día, en hora local. Se actualiza en
+    la transacción del checkout y de las cancelaciones (ver pedidos/ventas.py).
+    """
+    dia = models.DateField(primary_key=True)
+    pedidos = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    class Meta:
+        db_table = 'venta_diaria'
+    def __str__(self):
+        return f"{self.dia}: {self.pedidos} pedidos, ${self.total}"
+
+class VentaHoraria(models.Model):
+    """
+    Como VentaDiaria, por hora (inicio de la hora, en hora local).
+    """
+    hora = models.DateTimeField(primary_key=True)
+    pedidos = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    class Meta:
+        db_table = 'venta_horaria'
+    def __str__(self):
+        return f"{self.hora:%Y-%m-%d %H}h: {self.pedidos} pedidos, ${self.total}"
+
+class LineaCarrito(models.Model):
+    """
+    Línea del carrito cuando CARRITO_BACKEND es AlmacenBD (ver pedidos/carrito.py).
+    `dueno` es 'u<id de usuario>' o 'a<token>' para visitantes anónimos.
+    """
+    dueno = models.CharField(max_length=40)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
+    cantidad = models.PositiveIntegerField()
+    actualizado = models.DateTimeField(auto_now=True)
+    class Meta:
+        db_table = 'linea_carrito'
+        constraints = [
+            models.UniqueConstraint(fields=['dueno', 'producto'], name='linea_carrito_unica'),
+        ]
+    def __str__(self):
+        return f"{self.cantidad} x {self.producto_id} ({self.dueno})"
+
+class ReservaStock(models.Model):
+    """
+    Unidades de un producto retenidas para el carrito de `dueno` hasta
+    `expira` (ver pedidos/reservas.py). Su suma por producto se lleva en
+    Producto.stock_reservado.
+    """
+    dueno = models.CharField(max_length=40)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
+    cantidad = models.PositiveIntegerField()
+    expira = models.DateTimeField(db_index=True)
+    class Meta:
+        db_table = 'reserva_stock'
+        constraints = [
+            models.UniqueConstraint(fields=['dueno', 'producto'], name='reserva_stock_unica'),
+        ]
+    def __str__(self):
+        return f"{self.cantidad} x {self.producto_id} ({self.dueno}) hasta {self.expira:%H:%M}"
+
+class TransicionPedido(models.Model):
+    """
+    Bitácora de cambios de estado de los pedidos (solo se agregan filas,
+    ver pedidos/estados.py).
+    """
+    pedido = models.ForeignKey(Pedido, related_name='transiciones', on_delete=models.CASCADE)
+    desde = models.CharField(max_length=20)
+    hacia = models.CharField(max_length=20)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    fecha = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        db_table = 'transicion_pedido'
+        ordering = ['fecha', 'id']
+    def __str__(self):
+        return f"Pedido {self.pedido_id}: {self.desde} -> {self.hacia}"
+
+class ClavePedido(models.Model):
+    """
+    Clave de idempotencia del checkout (ver pedidos/servicios.py). Cada
+    formulario de ver_carrito.html lleva una; un reintento con la misma
+    clave devuelve `pedido` en vez de comprar otra vez.
+    """
+    clave = models.CharField(max_length=64, unique=True)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, null=True, blank=True)
+    expira = models.DateTimeField(db_index=True)
+    class Meta:
+        db_table = 'clave_pedido'
+    def __str__(self):
+        return f"{self.clave} -> pedido {self.pedido_id}"
+
 class Notificacion(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE, null=True, blank=True)
+    # Alertas de vencimiento (pedidos/alertas.py): regla y caducidad que la
+    # generaron. Una sola por usuario, producto, regla y caducidad.
+    regla = models.ForeignKey(ReglaAlertaVencimiento, on_delete=models.CASCADE, null=True, blank=True)
+    caducidad = models.DateField(null=True, blank=True)
     mensaje = models.CharField(max_length=255)
     leido = models.BooleanField(default=False)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -41,6 +177,27 @@ class Notificacion(models.Model):
         return self.mensaje
     class Meta:
         ordering = ['-fecha_creacion']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'producto', 'regla', 'caducidad'], name='notificacion_alerta_unica',
+            ),
+        ]
+
+class MarcaAlertas(models.Model):
+    """
+    Hasta dónde llegó la última evaluación de alertas de vencimiento (ver
+    pedidos/alertas.py): la siguiente solo mira lo que cambió desde ahí.
+    """
+    motor = models.CharField(max_length=50, unique=True)
+    # Último día evaluado
+    hasta = models.DateField()
+    # Mayor ProductoReglaAlerta.id visto: los pares nuevos se evalúan completos
+    ultimo_par = models.IntegerField(default=0)
+    ejecutado = models.DateTimeField()
+    class Meta:
+        db_table = 'marca_alertas'
+    def __str__(self):
+        return f"{self.motor} hasta {self.hasta}"
 
 class Venta(models.Model):
     idventa = models.IntegerField(primary_key=True, db_column='idventa')
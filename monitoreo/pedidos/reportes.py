@@ -0,0 +1,57 @@
+"""
+Reportes exportables de pedidos y ventas (ver reportes.exportacion).
+"""
+from django.db.models import Count
+
+from reportes.exportacion import Columna, Reporte, registrar
+
+from .busqueda import buscar_pedidos
+from .models import ResumenPedido, Venta
+
+
+@registrar
+class ReportePedidos(Reporte):
+    nombre = 'pedidos'
+    titulo = 'Pedidos'
+    archivo = 'pedidos'
+    # Modelo de lectura: una consulta, sin JOIN con usuarios
+    modelo = ResumenPedido
+    orden = ('-fecha_pedido', '-pk')
+    permiso = 'pedidos.view_pedido'
+    columnas = (
+        Columna("ID", 'pk', ancho=10),
+        Columna("Cliente", 'cliente', ancho=30),
+        Columna("Correo", 'correo', ancho=30),
+        Columna("Fecha del Pedido", lambda p: p.fecha_pedido.strftime("%d/%m/%Y %H:%M"), ancho=20),
+        Columna("Productos", lambda p: ", ".join(f"{x['cantidad']} x {x['nombre']}" for x in p.productos), ancho=40),
+        Columna("Unidades", 'unidades', ancho=10),
+        Columna("Total", lambda p: float(p.total), ancho=12),
+        Columna("Estado", 'estado', ancho=15),
+    )
+
+    def filtrar(self, qs, parametros):
+        # Misma búsqueda que pedido_list
+        return buscar_pedidos(qs, parametros.get('q'))
+
+
+@registrar
+class ReporteVentas(Reporte):
+    nombre = 'ventas'
+    titulo = 'Ventas'
+    archivo = 'ventas'
+    modelo = Venta
+    select_related = ('Usuarios', 'clientes_idclientes')
+    orden = ('-idventa',)
+    permiso = 'pedidos.view_venta'
+    columnas = (
+        Columna("ID Venta", 'idventa', ancho=10),
+        Columna("Usuario Email", 'Usuarios.email', ancho=30),
+        Columna("Usuario Nombre", lambda v: f"{v.Usuarios.first_name} {v.Usuarios.last_name}".strip(), ancho=30),
+        Columna("Estado", 'EstadoPedido', ancho=15),
+        Columna("Cliente ID", 'clientes_idclientes_id', ancho=10),
+        Columna("Num detalles", 'num_detalles', ancho=12),
+    )
+
+    def preparar(self, qs):
+        # El conteo de detalles va en el mismo SELECT (antes, un COUNT por venta)
+        return super().preparar(qs.annotate(num_detalles=Count('detalleventa')))
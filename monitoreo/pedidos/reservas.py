@@ -0,0 +1,203 @@
+"""
+Reservas de stock para los carritos.
+
+Al agregar un producto al carrito se retienen esas unidades por RESERVA_TTL
+segundos (ReservaStock), de modo que quien llega al checkout a tiempo tiene
+su pan asegurado. El total retenido de cada producto se lleva en el
+contador Producto.stock_reservado, que la tienda lee directamente
+(stock_actual - stock_reservado) sin sumar reservas en cada página.
+
+* reservar: UPDATE condicional del contador (solo si alcanza lo disponible)
+  y alta/renovación de la reserva, en una transacción. Cada carrito retiene
+  como máximo RESERVA_MAX_UNIDADES unidades en total, para que un solo
+  visitante no pueda acaparar el stock.
+* El checkout (pedidos/servicios.py) convierte la reserva del comprador en
+  venta: descuenta stock_actual y libera lo retenido en el mismo UPDATE.
+* liberar devuelve en el acto lo retenido por un carrito (al quitar
+  productos o vaciarlo).
+* liberar_vencidas (comando liberar_reservas) borra por lotes las reservas
+  vencidas y descuenta el contador con un solo UPDATE por lote.
+
+Todas las operaciones bloquean primero las filas de Producto (en orden de
+id) y después las de ReservaStock, así no hay interbloqueos entre ellas.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from catalogo.facetas import invalidar_si_cambia_disponibilidad
+from catalogo.models import Producto
+from catalogo.version import incrementar_version_catalogo
+
+from .models import ReservaStock
+
+
+class SinDisponibilidad(Exception):
+    def __init__(self, producto, disponible):
+        self.disponible = disponible
+        if disponible:
+            mensaje = f"Solo quedan {disponible} unidades disponibles de {producto.nombre}."
+        else:
+            mensaje = f"{producto.nombre} está agotado por ahora."
+        super().__init__(mensaje)
+
+
+class LimiteReserva(SinDisponibilidad):
+    """
+    El carrito llegó a RESERVA_MAX_UNIDADES. `disponible` es lo que aún
+    puede agregar.
+    """
+
+    def __init__(self, disponible):
+        self.disponible = disponible
+        Exception.__init__(self, f"Puedes reservar hasta {max_unidades()} unidades por carrito.")
+
+
+def max_unidades():
+    return getattr(settings, 'RESERVA_MAX_UNIDADES', 50)
+
+
+def ttl_reserva():
+    return timedelta(seconds=getattr(settings, 'RESERVA_TTL', 15 * 60))
+
+
+def bloquear_productos(producto_ids):
+    # SELECT ... FOR UPDATE en orden de id (SQLite lo ignora: ya serializa
+    # las escrituras)
+    return list(
+        Producto.objects.select_for_update().filter(pk__in=producto_ids)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+
+@transaction.atomic
+def reservar(dueno, producto, cantidad):
+    """
+    Retiene `cantidad` unidades más de `producto` para `dueno` y renueva el
+    vencimiento de su reserva. Lanza SinDisponibilidad si no alcanzan y
+    LimiteReserva si el carrito pasaría de RESERVA_MAX_UNIDADES.
+    """
+    # El tope se revisa con las reservas del carrito bloqueadas (después del
+    # producto, en el orden de siempre): dos pedidos simultáneos del mismo
+    # carrito no pueden pasarlo. En MySQL el FOR UPDATE sobre el índice de
+    # `dueno` bloquea también el hueco, así que ni la primera reserva se cuela.
+    bloquear_productos([producto.pk])
+    apartadas = sum(
+        ReservaStock.objects.select_for_update().filter(dueno=dueno).values_list('cantidad', flat=True)
+    )
+    if apartadas + cantidad > max_unidades():
+        raise LimiteReserva(max(max_unidades() - apartadas, 0))
+
+    retenidas = Producto.objects.filter(
+        pk=producto.pk, stock_actual__gte=F('stock_reservado') + cantidad,
+    ).update(stock_reservado=F('stock_reservado') + cantidad)
+    if not retenidas:
+        actual = Producto.objects.filter(pk=producto.pk).only('stock_actual', 'stock_reservado').first()
+        raise SinDisponibilidad(producto, actual.stock_disponible if actual else 0)
+
+    # La fila del producto y las del carrito ya están bloqueadas: nadie más
+    # toca esta reserva
+    expira = timezone.now() + ttl_reserva()
+    renovadas = ReservaStock.objects.filter(dueno=dueno, producto=producto).update(
+        cantidad=F('cantidad') + cantidad, expira=expira,
+    )
+    if not renovadas:
+        ReservaStock.objects.create(dueno=dueno, producto=producto, cantidad=cantidad, expira=expira)
+    invalidar_si_cambia_disponibilidad({producto.pk: -cantidad})
+
+
+@transaction.atomic
+def transferir(origen, destino):
+    """
+    Pasa las reservas de `origen` (carrito anónimo) a `destino` (usuario),
+    sumándolas a las que ya tuviera.
+    """
+    reservas = ReservaStock.objects.filter(dueno=origen)
+    bloquear_productos(reservas.values_list('producto_id', flat=True))
+    for reserva in reservas:
+        sumadas = ReservaStock.objects.filter(dueno=destino, producto_id=reserva.producto_id).update(
+            cantidad=F('cantidad') + reserva.cantidad, expira=max(reserva.expira, timezone.now()),
+        )
+        if sumadas:
+            reserva.delete()
+        else:
+            reserva.dueno = destino
+            reserva.save(update_fields=['dueno'])
+
+
+def _borrar_y_descontar(reservas):
+    """
+    Borra `reservas` y descuenta sus cantidades de Producto.stock_reservado
+    con un solo UPDATE. Las filas de Producto ya deben estar bloqueadas.
+    """
+    sumas = dict(
+        reservas.order_by().values('producto_id').annotate(total=Sum('cantidad'))
+        .values_list('producto_id', 'total')
+    )
+    borradas, _ = reservas.delete()
+    if sumas:
+        Producto.objects.filter(pk__in=sumas).update(stock_reservado=F('stock_reservado') - Case(
+            *[When(pk=pk, then=Value(total)) for pk, total in sumas.items()],
+            default=Value(0), output_field=IntegerField(),
+        ))
+        invalidar_si_cambia_disponibilidad(sumas)
+    return borradas
+
+
+@transaction.atomic
+def liberar(dueno, producto_ids=None):
+    """
+    Devuelve las unidades que retiene `dueno` (solo las de `producto_ids`,
+    si se indican). Devuelve cuántas reservas se borraron.
+    """
+    reservas = ReservaStock.objects.filter(dueno=dueno)
+    if producto_ids is not None:
+        reservas = reservas.filter(producto_id__in=producto_ids)
+    bloquear_productos(reservas.values_list('producto_id', flat=True))
+    return _borrar_y_descontar(reservas)
+
+
+def liberar_vencidas(batch_size=500, ahora=None):
+    """
+    Borra las reservas vencidas y descuenta su cantidad de
+    Producto.stock_reservado, de a `batch_size` productos por transacción.
+    Devuelve cuántas reservas se liberaron.
+    """
+    ahora = ahora or timezone.now()
+    liberadas = 0
+    while True:
+        producto_ids = list(
+            ReservaStock.objects.filter(expira__lte=ahora)
+            .order_by('producto_id').values_list('producto_id', flat=True).distinct()[:batch_size]
+        )
+        if not producto_ids:
+            return liberadas
+
+        with transaction.atomic():
+            bloquear_productos(producto_ids)
+            borradas = _borrar_y_descontar(
+                ReservaStock.objects.filter(producto_id__in=producto_ids, expira__lte=ahora)
+            )
+        liberadas += borradas
+
+
+@transaction.atomic
+def recontar():
+    """
+    Recalcula Producto.stock_reservado desde las reservas existentes
+    (corrige cualquier desvío del contador). Devuelve los productos corregidos.
+    """
+    suma = (
+        ReservaStock.objects.filter(producto=OuterRef('pk')).order_by()
+        .values('producto').annotate(total=Sum('cantidad')).values('total')
+    )
+    real = Coalesce(Subquery(suma, output_field=IntegerField()), 0)
+    desviados = Producto.objects.annotate(real=real).exclude(stock_reservado=F('real'))
+    corregidos = Producto.objects.filter(pk__in=list(desviados.values_list('pk', flat=True))).update(stock_reservado=real)
+    if corregidos:
+        transaction.on_commit(incrementar_version_catalogo)
+    return corregidos
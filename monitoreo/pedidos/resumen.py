@@ -0,0 +1,89 @@
+"""
+Modelo de lectura de los pedidos (ResumenPedido).
+
+El listado, el detalle y la exportación de pedidos leen una sola fila por
+pedido, sin JOIN con usuarios, detalles ni productos:
+
+* el checkout (pedidos/servicios.py) crea el resumen en la misma
+  transacción que el pedido, con los nombres y precios que ya tiene a mano;
+* los cambios de estado (pedidos/estados.py) lo actualizan en el mismo
+  UPDATE masivo;
+* si el cliente cambia su nombre o correo, pedidos/signals.py reescribe sus
+  resúmenes con un UPDATE.
+
+Los productos quedan como se compraron (nombre y precio del momento), igual
+que DetallePedido.precio. `reconstruir` (comando reconstruir_resumenes)
+vuelve a armar todos los resúmenes desde los pedidos.
+"""
+from django.db import transaction
+
+
+def nombre_cliente(usuario):
+    return f"{usuario.first_name} {usuario.last_name}".strip()
+
+
+def armar_resumen(modelo, pedido, usuario, filas):
+    """
+    ResumenPedido (sin guardar) de `pedido`. `filas` son tuplas
+    (nombre, marca, cantidad, precio) de sus detalles.
+    """
+    productos = [
+        {
+            'nombre': nombre,
+            'marca': marca or '',
+            'cantidad': cantidad,
+            'precio': int(precio or 0),
+            'subtotal': int(precio or 0) * cantidad,
+        }
+        for nombre, marca, cantidad, precio in filas
+    ]
+    return modelo(
+        pedido_id=pedido.pk,
+        usuario_id=usuario.pk,
+        fecha_pedido=pedido.fecha_pedido,
+        estado=pedido.estado,
+        total=pedido.total,
+        cliente=nombre_cliente(usuario),
+        correo=usuario.email,
+        lineas=len(productos),
+        unidades=sum(p['cantidad'] for p in productos),
+        productos=productos,
+    )
+
+
+def reconstruir_con(Pedido, DetallePedido, ResumenPedido, batch_size=1000):
+    """
+    Rearma los resúmenes de todos los pedidos, de a `batch_size` por
+    transacción (3 consultas y un INSERT por lote). Devuelve cuántos escribió.
+    """
+    escritos = 0
+    ultimo = 0
+    while True:
+        pedidos = list(
+            Pedido.objects.filter(pk__gt=ultimo).select_related('usuario').order_by('pk')[:batch_size]
+        )
+        if not pedidos:
+            return escritos
+        ultimo = pedidos[-1].pk
+
+        filas = {}
+        detalles = (
+            DetallePedido.objects.filter(pedido_id__in=[p.pk for p in pedidos]).order_by('pedido_id', 'pk')
+            .values_list('pedido_id', 'producto__nombre', 'producto__marca', 'cantidad', 'precio')
+        )
+        for pedido_id, *fila in detalles:
+            filas.setdefault(pedido_id, []).append(fila)
+
+        with transaction.atomic():
+            ResumenPedido.objects.filter(pk__in=[p.pk for p in pedidos]).delete()
+            ResumenPedido.objects.bulk_create([
+                armar_resumen(ResumenPedido, pedido, pedido.usuario, filas.get(pedido.pk, []))
+                for pedido in pedidos
+            ])
+        escritos += len(pedidos)
+
+
+def reconstruir(batch_size=1000):
+    from .models import DetallePedido, Pedido, ResumenPedido
+
+    return reconstruir_con(Pedido, DetallePedido, ResumenPedido, batch_size)
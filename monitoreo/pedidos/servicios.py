@@ -0,0 +1,206 @@
+"""
+Checkout: convierte un carrito en un Pedido descontando el stock.
+
+Todo ocurre en una transacción:
+
+* El stock se descuenta con un UPDATE condicional por línea
+  (`... SET stock_actual = stock_actual - n WHERE id = x AND stock_actual >= n`).
+  La base evalúa la condición con la fila bloqueada, así que dos compras
+  simultáneas nunca dejan el stock negativo: la segunda actualiza 0 filas.
+* Las líneas se procesan en orden de id para que dos checkouts que comparten
+  productos tomen los bloqueos en el mismo orden (sin interbloqueos).
+* Si a una línea le falta stock se lanza StockInsuficiente y la transacción
+  revierte los descuentos ya hechos.
+* Las unidades reservadas por otros carritos (Producto.stock_reservado) no se
+  venden; las reservadas por el propio comprador se convierten en venta en
+  el mismo UPDATE (ver pedidos/reservas.py).
+
+Un pedido de N productos cuesta N + 6 consultas (antes 3N + 1), incluidos el
+INSERT de su ResumenPedido y los UPDATE de VentaDiaria/VentaHoraria, más 3
+para leer y cerrar las reservas del comprador.
+
+La vista usa realizar_checkout_idempotente: el formulario del carrito lleva
+una clave única y la clave se inserta (tabla con restricción UNIQUE) en la
+misma transacción que el pedido. Un doble clic o un reintento de red con la
+misma clave encuentra la fila y devuelve el pedido original sin volver a
+descontar stock; si llega mientras el primero aún corre, el INSERT espera
+al índice único y luego lee el resultado.
+"""
+import re
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from catalogo.models import Producto
+from catalogo.facetas import invalidar_si_cambia_disponibilidad
+
+from .carrito import normalizar_lineas
+from .models import ClavePedido, DetallePedido, Pedido, ReservaStock, ResumenPedido
+from .reservas import bloquear_productos
+from .resumen import armar_resumen
+from .ventas import registrar_venta
+
+
+class ErrorCheckout(Exception):
+    pass
+
+
+class CarritoVacio(ErrorCheckout):
+    def __init__(self):
+        super().__init__("Tu carrito está vacío.")
+
+
+class ProductoNoDisponible(ErrorCheckout):
+    def __init__(self, producto_id):
+        self.producto_id = producto_id
+        super().__init__("Uno de los productos de tu carrito ya no está disponible.")
+
+
+class StockInsuficiente(ErrorCheckout):
+    def __init__(self, producto, solicitado):
+        self.producto = producto
+        self.solicitado = solicitado
+        self.disponible = producto.stock_disponible
+        super().__init__(f"No hay suficiente stock para {producto.nombre}.")
+
+
+class ClaveInvalida(ErrorCheckout):
+    def __init__(self):
+        super().__init__("No pudimos confirmar tu compra. Revisa tu carrito y vuelve a intentarlo.")
+
+
+def _descontar_stock(producto_id, cantidad, reservado=0):
+    # Lo vendible es stock_actual - (lo reservado por otros carritos)
+    return Producto.objects.filter(
+        pk=producto_id, stock_actual__gte=F('stock_reservado') - reservado + cantidad,
+    ).update(
+        stock_actual=F('stock_actual') - cantidad,
+        stock_reservado=F('stock_reservado') - reservado,
+    )
+
+
+@transaction.atomic
+def realizar_checkout(usuario, carrito, dueno=None):
+    """
+    Crea el Pedido del carrito y descuenta el stock. Lanza ErrorCheckout
+    (sin dejar cambios) si el carrito está vacío o algo no alcanza.
+    `dueno` es el dueño del carrito: sus reservas se convierten en venta.
+    """
+    lineas = normalizar_lineas(carrito)
+    if not lineas:
+        raise CarritoVacio()
+
+    reservas = {}
+    if dueno:
+        bloquear_productos(lineas)
+        reservas = dict(
+            ReservaStock.objects.filter(dueno=dueno, producto_id__in=lineas)
+            .values_list('producto_id', 'cantidad')
+        )
+
+    for producto_id in sorted(lineas):
+        if not _descontar_stock(producto_id, lineas[producto_id], reservas.get(producto_id, 0)):
+            producto = Producto.objects.filter(pk=producto_id).only('nombre', 'stock_actual', 'stock_reservado').first()
+            if producto is None:
+                raise ProductoNoDisponible(producto_id)
+            raise StockInsuficiente(producto, lineas[producto_id])
+
+    if reservas:
+        ReservaStock.objects.filter(dueno=dueno, producto_id__in=reservas).delete()
+
+    # Las filas ya están bloqueadas por los UPDATE: el precio leído es el vigente
+    filas = Producto.objects.filter(pk__in=lineas).values_list(
+        'pk', 'nombre', 'marca', 'precio', 'stock_actual', 'stock_reservado',
+    )
+    productos, disponibles = {}, {}
+    for pk, nombre, marca, precio, actual, reservado in filas:
+        productos[pk] = (nombre, marca, int(precio or 0))
+        disponibles[pk] = (actual or 0) - reservado
+    total = sum(productos[pk][2] * cantidad for pk, cantidad in lineas.items())
+
+    pedido = Pedido.objects.create(usuario=usuario, total=total)
+    DetallePedido.objects.bulk_create([
+        DetallePedido(pedido=pedido, producto_id=pk, cantidad=cantidad, precio=productos[pk][2])
+        for pk, cantidad in lineas.items()
+    ])
+    # Modelo de lectura para el listado, el detalle y la exportación
+    armar_resumen(ResumenPedido, pedido, usuario, [
+        (productos[pk][0], productos[pk][1], cantidad, productos[pk][2]) for pk, cantidad in lineas.items()
+    ]).save(force_insert=True)
+    # Agregados del gráfico de ventas (ver pedidos/ventas.py)
+    registrar_venta(pedido)
+    # update() no dispara las señales del catálogo: las facetas solo se
+    # invalidan si algún producto se agotó
+    invalidar_si_cambia_disponibilidad(
+        {pk: reservas.get(pk, 0) - cantidad for pk, cantidad in lineas.items()}, disponibles,
+    )
+    return pedido
+
+
+# ----------------------------------------
+# IDEMPOTENCIA
+# ----------------------------------------
+FORMATO_CLAVE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+
+def nueva_clave_pedido():
+    return secrets.token_urlsafe(24)
+
+
+def ttl_clave_pedido():
+    return timedelta(seconds=getattr(settings, 'PEDIDO_CLAVE_TTL', 60 * 60))
+
+
+def _pedido_de_clave(usuario, clave):
+    """
+    Pedido ya creado con `clave`, o None si la clave no se ha usado.
+    """
+    registro = ClavePedido.objects.select_related('pedido').filter(clave=clave).first()
+    if registro is None:
+        return None
+    if registro.usuario_id != usuario.pk or registro.pedido is None:
+        raise ClaveInvalida()
+    return registro.pedido
+
+
+def realizar_checkout_idempotente(usuario, clave, carrito, dueno=None):
+    """
+    Como realizar_checkout, pero a lo más una vez por `clave`. Devuelve
+    (pedido, repetido): `repetido` es True si la clave ya tenía pedido.
+    """
+    if not clave or not FORMATO_CLAVE.match(clave):
+        raise ClaveInvalida()
+
+    # Camino rápido del reintento: una consulta por índice, sin transacción
+    pedido = _pedido_de_clave(usuario, clave)
+    if pedido is not None:
+        return pedido, True
+
+    try:
+        with transaction.atomic():
+            # Se inserta antes de comprar: un duplicado concurrente queda
+            # esperando en el índice único en vez de repetir el checkout.
+            # Si la compra falla, la clave se revierte con todo lo demás.
+            registro = ClavePedido.objects.create(
+                clave=clave, usuario=usuario, expira=timezone.now() + ttl_clave_pedido(),
+            )
+            pedido = realizar_checkout(usuario, carrito, dueno=dueno)
+            ClavePedido.objects.filter(pk=registro.pk).update(pedido=pedido)
+    except IntegrityError:
+        pedido = _pedido_de_clave(usuario, clave)
+        if pedido is None:
+            raise ClaveInvalida()
+        return pedido, True
+    return pedido, False
+
+
+def limpiar_claves_vencidas():
+    """
+    Borra las claves de pedido vencidas. Devuelve cuántas se borraron.
+    """
+    borradas, _ = ClavePedido.objects.filter(expira__lte=timezone.now()).delete()
+    return borradas
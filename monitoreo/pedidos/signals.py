@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from usuarios.models import Usuario
+
+from .busqueda import indexar_cliente
+from .models import ResumenPedido
+from .resumen import nombre_cliente
+
+CAMPOS_BUSQUEDA = {'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=Usuario, dispatch_uid='pedidos_resumen_usuario_guardado')
+def actualizar_resumenes_cliente(sender, instance, created, update_fields=None, **kwargs):
+    # loaddata: los datos de la fixture pueden estar incompletos
+    if kwargs.get('raw'):
+        return
+    # Un solo UPDATE, y sin escrituras si el nombre y el correo no cambiaron
+    # (p. ej. el login solo guarda last_login)
+    if update_fields is not None and not CAMPOS_BUSQUEDA & set(update_fields):
+        return
+    indexar_cliente(instance)
+    if created:
+        return
+    cliente = nombre_cliente(instance)
+    ResumenPedido.objects.filter(usuario_id=instance.pk).exclude(cliente=cliente, correo=instance.email).update(
+        cliente=cliente, correo=instance.email,
+    )
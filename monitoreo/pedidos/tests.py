@@ -1,3 +1,512 @@
-from django.test import TestCase
+import sys
+import threading
+import time
+from datetime import date, timedelta
 
-# Create your tests here.
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from catalogo.models import Categoria, Nutricional, Producto, ProductoReglaAlerta, ReglaAlertaVencimiento
+from catalogo.version import version_catalogo
+from usuarios.models import Usuario
+
+from . import estados
+from .alertas import evaluar_alertas, productos_por_vencer
+from .busqueda import buscar_pedidos
+from .carrito import Carrito
+from .resumen import reconstruir
+from .ventas import recalcular, ventas_por_dia
+from .models import (
+    ClavePedido, DetallePedido, Notificacion, Pedido, ReservaStock, ResumenPedido, TerminoCliente, TransicionPedido, VentaDiaria, VentaHoraria,
+)
+from .reservas import LimiteReserva, SinDisponibilidad, liberar, liberar_vencidas, reservar
+from .servicios import (
+    CarritoVacio, ClaveInvalida, StockInsuficiente, nueva_clave_pedido, realizar_checkout,
+    realizar_checkout_idempotente,
+)
+
+
+def crear_producto(nombre, stock, precio=1000, dias=3):
+    categoria, _ = Categoria.objects.get_or_create(nombre='Panadería')
+    return Producto.objects.create(
+        nombre=nombre, precio=precio, stock_actual=stock, tipo='Artesanal',
+        caducidad=date.today() + timedelta(days=dias),
+        Categorias=categoria, Nutricional=Nutricional.objects.create(),
+    )
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@forneria.cl', password='x', first_name='Ana', last_name='Soto', run='11111111-1',
+        )
+        self.pan = crear_producto('Pan amasado', stock=10, precio=500)
+        self.torta = crear_producto('Torta de mil hojas', stock=2, precio=12000)
+
+    def test_descuenta_stock_y_crea_detalles(self):
+        pedido = realizar_checkout(self.usuario, {str(self.pan.pk): 3, str(self.torta.pk): 1})
+
+        self.pan.refresh_from_db()
+        self.torta.refresh_from_db()
+        self.assertEqual(self.pan.stock_actual, 7)
+        self.assertEqual(self.torta.stock_actual, 1)
+        self.assertEqual(pedido.total, 3 * 500 + 12000)
+        self.assertEqual(pedido.detalles.count(), 2)
+
+    def test_falta_de_stock_revierte_todo(self):
+        with self.assertRaises(StockInsuficiente):
+            realizar_checkout(self.usuario, {str(self.pan.pk): 3, str(self.torta.pk): 5})
+
+        self.pan.refresh_from_db()
+        self.assertEqual(self.pan.stock_actual, 10)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(DetallePedido.objects.exists())
+
+    def test_carrito_vacio(self):
+        with self.assertRaises(CarritoVacio):
+            realizar_checkout(self.usuario, {str(self.pan.pk): 0})
+
+
+class ClavePedidoTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@forneria.cl', password='x', first_name='Ana', last_name='Soto', run='11111111-1',
+        )
+        self.pan = crear_producto('Pan amasado', stock=10)
+
+    def test_reintento_devuelve_el_mismo_pedido(self):
+        clave = nueva_clave_pedido()
+        pedido, repetido = realizar_checkout_idempotente(self.usuario, clave, {self.pan.pk: 2})
+        self.assertFalse(repetido)
+
+        # El reintento ya no trae carrito (se vació): igual responde el pedido
+        with self.assertNumQueries(1):
+            otra_vez, repetido = realizar_checkout_idempotente(self.usuario, clave, {})
+        self.assertTrue(repetido)
+        self.assertEqual(otra_vez.pk, pedido.pk)
+        self.pan.refresh_from_db()
+        self.assertEqual(self.pan.stock_actual, 8)
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    def test_compra_fallida_no_consume_la_clave(self):
+        clave = nueva_clave_pedido()
+        with self.assertRaises(StockInsuficiente):
+            realizar_checkout_idempotente(self.usuario, clave, {self.pan.pk: 50})
+        self.assertFalse(ClavePedido.objects.exists())
+
+        pedido, repetido = realizar_checkout_idempotente(self.usuario, clave, {self.pan.pk: 1})
+        self.assertFalse(repetido)
+
+    def test_clave_ajena_o_invalida(self):
+        clave = nueva_clave_pedido()
+        realizar_checkout_idempotente(self.usuario, clave, {self.pan.pk: 1})
+        otro = Usuario.objects.create_user(
+            email='otro@forneria.cl', password='x', first_name='Luis', last_name='Paz', run='22222222-2',
+        )
+        with self.assertRaises(ClaveInvalida):
+            realizar_checkout_idempotente(otro, clave, {self.pan.pk: 1})
+        with self.assertRaises(ClaveInvalida):
+            realizar_checkout_idempotente(self.usuario, 'x', {self.pan.pk: 1})
+
+
+class EstadosPedidoTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@forneria.cl', password='x', first_name='Ana', last_name='Soto', run='11111111-1',
+        )
+        self.pan = crear_producto('Pan amasado', stock=100)
+        self.pedidos = [realizar_checkout(self.usuario, {self.pan.pk: 2}) for _ in range(5)]
+
+    def test_transicion_masiva_con_bitacora(self):
+        enviado = self.pedidos[0]
+        estados.transicionar(Pedido.objects.filter(pk=enviado.pk), estados.EN_PREPARACION)
+        estados.transicionar(Pedido.objects.filter(pk=enviado.pk), estados.ENVIADO)
+
+        # El enviado ya no puede volver a preparación: se ignora
+        with self.assertNumQueries(6):  # SELECT FOR UPDATE, 2 UPDATE (pedido y resumen), INSERT + savepoint
+            cambiados = estados.transicionar(Pedido.objects.all(), estados.EN_PREPARACION, self.usuario)
+        self.assertEqual(cambiados, 4)
+        self.assertEqual(Pedido.objects.filter(estado=estados.EN_PREPARACION).count(), 4)
+        self.assertEqual(TransicionPedido.objects.filter(usuario=self.usuario).count(), 4)
+        self.assertEqual(
+            list(enviado.transiciones.values_list('desde', 'hacia')),
+            [(estados.PENDIENTE, estados.EN_PREPARACION), (estados.EN_PREPARACION, estados.ENVIADO)],
+        )
+
+    def test_cancelar_repone_stock(self):
+        estados.transicionar(Pedido.objects.all(), estados.CANCELADO)
+
+        self.pan.refresh_from_db()
+        self.assertEqual(self.pan.stock_actual, 100)
+        with self.assertRaises(estados.TransicionInvalida):
+            estados.transicionar_pedido(self.pedidos[0], estados.EN_PREPARACION)
+
+
+class ResumenPedidoTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@forneria.cl', password='x', first_name='Ana', last_name='Muñoz', run='11111111-1',
+        )
+        self.pan = crear_producto('Pan amasado', stock=100, precio=500)
+        self.torta = crear_producto('Torta de mil hojas', stock=5, precio=12000)
+        self.pedido = realizar_checkout(self.usuario, {self.pan.pk: 3, self.torta.pk: 1})
+
+    def test_checkout_escribe_el_resumen(self):
+        resumen = ResumenPedido.objects.get(pk=self.pedido.pk)
+        self.assertEqual((resumen.cliente, resumen.lineas, resumen.unidades), ('Ana Muñoz', 2, 4))
+        self.assertEqual(resumen.total, 3 * 500 + 12000)
+        self.assertIn({'nombre': 'Pan amasado', 'marca': '', 'cantidad': 3, 'precio': 500, 'subtotal': 1500},
+                      resumen.productos)
+
+        estados.transicionar(Pedido.objects.filter(pk=self.pedido.pk), estados.CANCELADO)
+        resumen.refresh_from_db()
+        self.assertEqual(resumen.estado, estados.CANCELADO)
+
+    def test_reconstruir(self):
+        ResumenPedido.objects.all().delete()
+        self.assertEqual(reconstruir(), 1)
+        self.assertEqual(ResumenPedido.objects.get().unidades, 4)
+
+    def test_busca_por_cliente_y_estado(self):
+        self.assertEqual(
+            set(TerminoCliente.objects.filter(usuario=self.usuario).values_list('termino', flat=True)),
+            {'ana', 'munoz', 'cliente@forneria.cl', 'cliente', 'forneria', 'cl'},
+        )
+        for q in ('muñoz', 'ANA MUNOZ', 'mu an', 'forneria', 'cliente@forn', 'pendiente'):
+            self.assertEqual(list(buscar_pedidos(ResumenPedido.objects.all(), q)), [self.pedido.resumen], q)
+        # Solo prefijos de palabra, y todas las palabras deben coincidir
+        for q in ('noz', 'ana rojas', 'enviado'):
+            self.assertFalse(buscar_pedidos(ResumenPedido.objects.all(), q).exists(), q)
+
+    def test_cambio_de_nombre_actualiza_el_resumen(self):
+        self.usuario.last_name = 'Rojas'
+        self.usuario.save()
+        self.assertTrue(buscar_pedidos(ResumenPedido.objects.all(), 'rojas').exists())
+        self.assertFalse(buscar_pedidos(ResumenPedido.objects.all(), 'munoz').exists())
+        self.assertEqual(ResumenPedido.objects.get().cliente, 'Ana Rojas')
+
+    def test_loaddata_no_toca_el_modelo_de_lectura(self):
+        # loaddata guarda con raw=True
+        self.usuario.last_name = 'Rojas'
+        self.usuario.save_base(raw=True)
+        self.assertEqual(ResumenPedido.objects.get().cliente, 'Ana Muñoz')
+        self.assertFalse(buscar_pedidos(ResumenPedido.objects.all(), 'rojas').exists())
+
+    def test_listado_con_consultas_constantes(self):
+        admin = Usuario.objects.create_superuser(
+            email='admin@forneria.cl', password='x', first_name='Ad', last_name='Min', run='99999999-9',
+        )
+        for _ in range(30):
+            realizar_checkout(self.usuario, {self.pan.pk: 1})
+        self.client.force_login(admin)
+
+        # sesión, usuario, página (LIMIT 21), conteo acotado y contador del carrito
+        with self.assertNumQueries(5):
+            respuesta = self.client.get('/pedidos/', {'q': 'ana'})
+        self.assertEqual(len(respuesta.context['pedidos']), 20)
+        self.assertTrue(respuesta.context['page_obj'].has_next())
+
+        # El detalle: sesión, usuario, resumen y contador del carrito
+        with self.assertNumQueries(4):
+            respuesta = self.client.get(f'/pedidos/{self.pedido.pk}/')
+        self.assertContains(respuesta, 'Torta de mil hojas')
+
+
+class VentasAgregadasTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@forneria.cl', password='x', first_name='Ana', last_name='Soto', run='11111111-1',
+        )
+        self.pan = crear_producto('Pan amasado', stock=100, precio=500)
+        self.pedidos = [realizar_checkout(self.usuario, {self.pan.pk: n}) for n in (1, 2, 3)]
+
+    def agregados(self):
+        return (
+            list(VentaDiaria.objects.values_list('pedidos', 'total')),
+            list(VentaHoraria.objects.values_list('pedidos', 'total')),
+        )
+
+    def test_checkout_y_cancelacion_actualizan_los_agregados(self):
+        self.assertEqual(self.agregados(), ([(3, 3000)], [(3, 3000)]))
+
+        estados.transicionar(Pedido.objects.filter(pk=self.pedidos[2].pk), estados.CANCELADO)
+        self.assertEqual(self.agregados(), ([(2, 1500)], [(2, 1500)]))
+        self.assertEqual(len(ventas_por_dia(timezone.localdate())), 1)
+
+    def test_recalcular_corrige_desvios(self):
+        estados.transicionar(Pedido.objects.filter(pk=self.pedidos[0].pk), estados.CANCELADO)
+        esperado = self.agregados()
+        VentaDiaria.objects.update(pedidos=99)
+        VentaHoraria.objects.all().delete()
+
+        self.assertEqual(recalcular(), 1)
+        self.assertEqual(self.agregados(), esperado)
+
+
+class ReservaStockTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@forneria.cl', password='x', first_name='Ana', last_name='Soto', run='11111111-1',
+        )
+        self.pan = crear_producto('Pan amasado', stock=5)
+
+    def test_reserva_bloquea_a_otros_carritos(self):
+        reservar('atoken', self.pan, 3)
+
+        with self.assertRaises(SinDisponibilidad):
+            reservar('otro', self.pan, 3)
+        with self.assertRaises(StockInsuficiente):
+            realizar_checkout(self.usuario, {self.pan.pk: 3})
+
+    def test_checkout_convierte_la_reserva(self):
+        reservar(f'u{self.usuario.pk}', self.pan, 3)
+        realizar_checkout(self.usuario, {self.pan.pk: 3}, dueno=f'u{self.usuario.pk}')
+
+        self.pan.refresh_from_db()
+        self.assertEqual((self.pan.stock_actual, self.pan.stock_reservado), (2, 0))
+        self.assertFalse(ReservaStock.objects.exists())
+
+    def test_liberar_vencidas(self):
+        reservar('a1', self.pan, 2)
+        reservar('a2', self.pan, 1)
+        ReservaStock.objects.filter(dueno='a1').update(expira=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(liberar_vencidas(), 1)
+        self.pan.refresh_from_db()
+        self.assertEqual(self.pan.stock_reservado, 1)
+
+    def test_facetas_solo_se_invalidan_al_agotarse_o_volver(self):
+        cache.clear()
+        version = version_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            reservar('a1', self.pan, 2)
+            realizar_checkout(self.usuario, {self.pan.pk: 1})
+        self.assertEqual(version_catalogo(), version)
+
+        # Se reservan las 2 que quedaban: el pan deja de verse en la tienda
+        with self.captureOnCommitCallbacks(execute=True):
+            reservar('a2', self.pan, 2)
+        self.assertGreater(version_catalogo(), version)
+
+        version = version_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            liberar('a2')
+        self.assertGreater(version_catalogo(), version)
+
+
+class CarritoTests(TestCase):
+    ALMACENES = ('pedidos.carrito.AlmacenSesion', 'pedidos.carrito.AlmacenBD', 'pedidos.carrito.AlmacenCache')
+
+    def setUp(self):
+        cache.clear()
+        self.torta = crear_producto('Torta', stock=5, precio=9000)
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        request.user = AnonymousUser()
+        return request
+
+    def test_contenido_quita_productos_inexistentes(self):
+        for almacen in self.ALMACENES:
+            with self.subTest(almacen=almacen), override_settings(CARRITO_BACKEND=almacen):
+                pan = crear_producto('Pan del día', stock=5, precio=500)
+                carrito = Carrito(self.request())
+                carrito.agregar(pan, 2)
+                carrito.agregar(self.torta, 1)
+                pan.delete()
+
+                contenido = carrito.contenido()
+                self.assertEqual([item['producto'] for item in contenido.items], [self.torta])
+                self.assertEqual((contenido.total, contenido.unidades), (9000, 1))
+                # AlmacenBD borra la línea junto con el producto (CASCADE)
+                self.assertEqual(contenido.quitadas, 0 if almacen.endswith('BD') else 1)
+                self.assertEqual(carrito.lineas(), {self.torta.pk: 1})
+                self.assertEqual(carrito.contenido().quitadas, 0)
+                carrito.vaciar()
+
+    def test_fusion_al_iniciar_sesion(self):
+        usuario = Usuario.objects.create_user(
+            email='cliente@forneria.cl', password='x', first_name='Ana', last_name='Soto', run='11111111-1',
+        )
+        for almacen in self.ALMACENES[1:]:
+            with self.subTest(almacen=almacen), override_settings(CARRITO_BACKEND=almacen):
+                pan = crear_producto('Pan del día', stock=5, precio=500)
+                # Carrito guardado del usuario (otro dispositivo)
+                request = self.request()
+                request.user = usuario
+                Carrito(request).agregar(self.torta, 1)
+
+                self.client.logout()
+                self.client.post(reverse('pedidos:agregar_al_carrito', args=[pan.pk]), {'cantidad': 2})
+                self.client.post(reverse('pedidos:agregar_al_carrito', args=[self.torta.pk]))
+                self.client.force_login(usuario)
+
+                request.session = self.client.session
+                self.assertEqual(Carrito(request).lineas(), {pan.pk: 2, self.torta.pk: 2})
+                self.assertNotIn('carrito_anonimo', self.client.session)
+                self.assertEqual(
+                    dict(ReservaStock.objects.values_list('producto_id', 'cantidad')), {pan.pk: 2, self.torta.pk: 2},
+                )
+                self.assertEqual(set(ReservaStock.objects.values_list('dueno', flat=True)), {f'u{usuario.pk}'})
+
+                Carrito(request).vaciar()
+                ReservaStock.objects.all().delete()
+
+    def test_agregar_solo_por_post(self):
+        url = reverse('pedidos:agregar_al_carrito', args=[self.torta.pk])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertFalse(ReservaStock.objects.exists())
+
+    @override_settings(RESERVA_MAX_UNIDADES=3)
+    def test_tope_de_unidades_por_carrito(self):
+        pan = crear_producto('Pan amasado', stock=10)
+        reservar('atoken', pan, 2)
+        with self.assertRaises(LimiteReserva) as error:
+            reservar('atoken', self.torta, 2)
+        self.assertEqual(error.exception.disponible, 1)
+        reservar('atoken', self.torta, 1)
+
+        # La vista muestra el aviso y no retiene nada más
+        self.client.post(reverse('pedidos:agregar_al_carrito', args=[pan.pk]), {'cantidad': 3})
+        self.client.post(reverse('pedidos:agregar_al_carrito', args=[pan.pk]), {'cantidad': 1})
+        pan.refresh_from_db()
+        self.assertEqual(pan.stock_reservado, 5)
+
+    def test_quitar_y_vaciar_liberan_reservas(self):
+        for almacen in self.ALMACENES:
+            with self.subTest(almacen=almacen), override_settings(CARRITO_BACKEND=almacen):
+                pan = crear_producto('Pan del día', stock=5)
+                carrito = Carrito(self.request())
+                carrito.agregar(pan, 2)
+                carrito.agregar(self.torta, 3)
+
+                carrito.quitar(pan.pk)
+                pan.refresh_from_db()
+                self.assertEqual(pan.stock_reservado, 0)
+                self.assertEqual(list(ReservaStock.objects.values_list('producto_id', flat=True)), [self.torta.pk])
+
+                carrito.vaciar()
+                self.torta.refresh_from_db()
+                self.assertEqual(self.torta.stock_reservado, 0)
+                self.assertFalse(ReservaStock.objects.exists())
+
+
+class AlertasVencimientoTests(TestCase):
+    def setUp(self):
+        Usuario.objects.create_superuser(
+            email='admin@forneria.cl', password='x', first_name='Ad', last_name='Min', run='99999999-9',
+        )
+        self.hoy = date.today()
+        self.tres = ReglaAlertaVencimiento.objects.create(nombre='Tres días', dias_anticipacion=3)
+        self.diez = ReglaAlertaVencimiento.objects.create(nombre='Diez días', dias_anticipacion=10)
+        self.pan = crear_producto('Pan amasado', stock=10, dias=3)
+        self.torta = crear_producto('Torta de mil hojas', stock=2, dias=20)
+        ProductoReglaAlerta.objects.create(producto=self.pan, regla=self.tres)
+        ProductoReglaAlerta.objects.create(producto=self.torta, regla=self.diez)
+
+    def test_incremental_e_idempotente(self):
+        self.assertEqual(evaluar_alertas(self.hoy), (1, 1))
+        # El mismo día no hay nada nuevo que mirar
+        self.assertEqual(evaluar_alertas(self.hoy), (0, 0))
+
+        # Diez días después entra la torta (y el pan ya venció)
+        self.assertEqual(evaluar_alertas(self.hoy + timedelta(days=10)), (1, 1))
+        self.assertEqual(evaluar_alertas(self.hoy + timedelta(days=10), completo=True), (1, 0))
+        self.assertEqual(
+            sorted(Notificacion.objects.values_list('producto__nombre', 'regla__nombre')),
+            [('Pan amasado', 'Tres días'), ('Torta de mil hojas', 'Diez días')],
+        )
+
+    def test_par_nuevo_ya_dentro_de_su_ventana(self):
+        evaluar_alertas(self.hoy)
+        mes = ReglaAlertaVencimiento.objects.create(nombre='Un mes', dias_anticipacion=30)
+        ProductoReglaAlerta.objects.create(producto=self.torta, regla=mes)
+        self.assertEqual(evaluar_alertas(self.hoy), (1, 1))
+
+    def test_cambio_de_caducidad_con_save_se_reevalua(self):
+        self.assertEqual(evaluar_alertas(self.hoy), (1, 1))
+        # Cualquier save() (admin, seed) marca el producto como modificado
+        self.torta.caducidad = self.hoy + timedelta(days=2)
+        self.torta.save()
+        self.assertEqual(evaluar_alertas(self.hoy), (1, 1))
+
+    def test_productos_por_vencer_segun_reglas(self):
+        crear_producto('Queque', stock=1, dias=5)
+        crear_producto('Kuchen', stock=1, dias=9)
+        self.assertEqual(
+            sorted(productos_por_vencer(self.hoy).values_list('nombre', flat=True)), ['Pan amasado', 'Queque'],
+        )
+
+
+class CheckoutConcurrenteTests(TransactionTestCase):
+    """
+    Varios hilos compran el mismo producto a la vez: nunca se vende más que
+    el stock inicial.
+    """
+    HILOS = 8
+    PEDIDOS_POR_HILO = 25
+    STOCK = 100
+
+    def setUp(self):
+        # `otro` tiene id menor: se descuenta primero y debe revertirse
+        # cuando a `producto` le falta stock
+        self.otro = crear_producto('Hallulla', stock=self.STOCK * 10)
+        self.producto = crear_producto('Marraqueta', stock=self.STOCK)
+        self.usuarios = [
+            Usuario.objects.create_user(
+                email=f'cliente{i}@forneria.cl', password='x', first_name='C', last_name=str(i), run=f'{i}-0',
+            )
+            for i in range(self.HILOS)
+        ]
+
+    def _comprar(self, usuario, resultados):
+        try:
+            for _ in range(self.PEDIDOS_POR_HILO):
+                # SQLite serializa las escrituras y responde "locked" en vez de
+                # esperar: se reintenta como haría el cliente
+                for _ in range(50):
+                    try:
+                        realizar_checkout(usuario, {self.otro.pk: 1, self.producto.pk: 1})
+                        resultados.append('ok')
+                        break
+                    except StockInsuficiente:
+                        resultados.append('sin_stock')
+                        break
+                    except OperationalError:
+                        time.sleep(0.01)
+        finally:
+            connection.close()
+
+    def test_sin_sobreventa(self):
+        resultados = []
+        hilos = [threading.Thread(target=self._comprar, args=(u, resultados)) for u in self.usuarios]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        self.producto.refresh_from_db()
+        self.otro.refresh_from_db()
+        exitosos = resultados.count('ok')
+        vendidos = sum(DetallePedido.objects.filter(producto=self.producto).values_list('cantidad', flat=True))
+
+        self.assertEqual(exitosos, self.STOCK)
+        self.assertEqual(self.producto.stock_actual, 0)
+        self.assertEqual(vendidos, self.STOCK)
+        self.assertEqual(Pedido.objects.count(), exitosos)
+        # Los pedidos rechazados no descontaron la otra línea
+        self.assertEqual(self.otro.stock_actual, self.STOCK * 10 - exitosos)
+        sys.stderr.write(
+            f"\n  checkout concurrente: {len(resultados)} intentos, {exitosos} pedidos, "
+            f"{len(resultados) / duracion:,.0f} intentos/s con {self.HILOS} hilos ({connection.vendor})\n"
+        )
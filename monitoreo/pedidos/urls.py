@@ -6,6 +6,7 @@ app_name = 'pedidos'
 urlpatterns = [
     # --- URLs para el Carrito de Compras ---
     path('tienda/', views.ver_productos, name='ver_productos'),
+    path('tienda/autocompletar/', views.autocompletar_productos, name='autocompletar_productos'),
     path('carrito/agregar/<int:pk>/', views.agregar_al_carrito, name='agregar_al_carrito'),
     path('carrito/', views.ver_carrito, name='ver_carrito'),
     path('pedido/realizar/', views.realizar_pedido, name='realizar_pedido'),
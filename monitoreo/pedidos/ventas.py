@@ -0,0 +1,122 @@
+"""
+Ventas agregadas por día y por hora (VentaDiaria, VentaHoraria).
+
+El gráfico del dashboard lee a lo más 31 filas de VentaDiaria en vez de
+agrupar todos los pedidos del mes en cada carga. Las tablas se mantienen
+en la misma transacción que los cambios que las afectan:
+
+* registrar_venta: el checkout suma el pedido a su día y a su hora
+  (UPDATE ... SET pedidos = pedidos + 1, o INSERT si es la primera venta).
+* descontar_ventas: al cancelar se restan los pedidos, con un UPDATE por
+  tabla para todo el lote.
+
+Solo cuentan los pedidos no cancelados, y los días y horas son locales
+(TIME_ZONE), igual que TruncDate. `recalcular` (comando recalcular_ventas)
+las rearma desde los pedidos para la carga inicial o para corregirlas.
+"""
+from datetime import datetime, time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from core.widgets import invalidar_al_confirmar
+
+from .models import Pedido, VentaDiaria, VentaHoraria
+
+
+def claves(fecha):
+    """
+    (día, inicio de la hora) locales de `fecha`.
+    """
+    local = timezone.localtime(fecha)
+    return local.date(), local.replace(minute=0, second=0, microsecond=0)
+
+
+def _sumar(modelo, campo, clave, pedidos, total):
+    filas = modelo.objects.filter(**{campo: clave})
+    if filas.update(pedidos=F('pedidos') + pedidos, total=F('total') + total):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**{campo: clave}, pedidos=pedidos, total=total)
+    except IntegrityError:
+        # Otro checkout creó la fila entre el UPDATE y el INSERT
+        filas.update(pedidos=F('pedidos') + pedidos, total=F('total') + total)
+
+
+def registrar_venta(pedido):
+    dia, hora = claves(pedido.fecha_pedido)
+    _sumar(VentaDiaria, 'dia', dia, 1, pedido.total)
+    _sumar(VentaHoraria, 'hora', hora, 1, pedido.total)
+
+
+def _por_clave(campo, deltas, indice, salida):
+    return Case(
+        *[When(**{campo: clave}, then=Value(valores[indice])) for clave, valores in deltas.items()],
+        default=Value(0), output_field=salida,
+    )
+
+
+def _restar(modelo, campo, deltas):
+    if not deltas:
+        return
+    modelo.objects.filter(**{f'{campo}__in': list(deltas)}).update(
+        pedidos=F('pedidos') - _por_clave(campo, deltas, 0, IntegerField()),
+        total=F('total') - _por_clave(campo, deltas, 1, DecimalField(max_digits=14, decimal_places=2)),
+    )
+
+
+def descontar_ventas(pedidos):
+    """
+    Resta de los agregados los `pedidos`, tuplas (fecha_pedido, total).
+    """
+    por_dia, por_hora = {}, {}
+    for fecha, total in pedidos:
+        dia, hora = claves(fecha)
+        for deltas, clave in ((por_dia, dia), (por_hora, hora)):
+            cantidad, suma = deltas.get(clave, (0, 0))
+            deltas[clave] = (cantidad + 1, suma + total)
+    _restar(VentaDiaria, 'dia', por_dia)
+    _restar(VentaHoraria, 'hora', por_hora)
+
+
+def ventas_por_dia(desde):
+    return VentaDiaria.objects.filter(dia__gte=desde, pedidos__gt=0).order_by('dia')
+
+
+def ventas_por_hora(desde):
+    return VentaHoraria.objects.filter(hora__gte=desde, pedidos__gt=0).order_by('hora')
+
+
+@transaction.atomic
+def recalcular(desde=None):
+    """
+    Rearma los agregados desde los pedidos (desde el día `desde`, o todos).
+    Devuelve cuántos días quedaron con ventas.
+    """
+    from .estados import CANCELADO
+
+    pedidos = Pedido.objects.exclude(estado=CANCELADO).order_by()
+    diarias, horarias = VentaDiaria.objects.all(), VentaHoraria.objects.all()
+    if desde is not None:
+        inicio = timezone.make_aware(datetime.combine(desde, time.min))
+        pedidos = pedidos.filter(fecha_pedido__gte=inicio)
+        diarias, horarias = diarias.filter(dia__gte=desde), horarias.filter(hora__gte=inicio)
+
+    por_dia = list(
+        pedidos.annotate(clave=TruncDate('fecha_pedido')).values('clave')
+        .annotate(cantidad=Count('id'), suma=Sum('total')).values_list('clave', 'cantidad', 'suma')
+    )
+    por_hora = list(
+        pedidos.annotate(clave=TruncHour('fecha_pedido')).values('clave')
+        .annotate(cantidad=Count('id'), suma=Sum('total')).values_list('clave', 'cantidad', 'suma')
+    )
+
+    diarias.delete()
+    horarias.delete()
+    VentaDiaria.objects.bulk_create([VentaDiaria(dia=d, pedidos=n, total=t) for d, n, t in por_dia])
+    VentaHoraria.objects.bulk_create([VentaHoraria(hora=h, pedidos=n, total=t) for h, n, t in por_hora])
+    invalidar_al_confirmar('ventas')
+    return len(por_dia)
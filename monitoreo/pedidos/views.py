@@ -1,16 +1,30 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
-from django.db.models import Q
-from django.core.paginator import Paginator
-from django.http import HttpResponse
-import openpyxl
-from openpyxl.utils import get_column_letter
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET, require_POST
 
 # --- Importaciones ---
-from .models import Pedido, DetallePedido, Cliente
+from .models import Cliente, ResumenPedido
 from .forms import ClienteForm
+from .busqueda import buscar_pedidos
+from .carrito import Carrito
+from .reservas import SinDisponibilidad
+from .servicios import (
+    CarritoVacio, ErrorCheckout, ProductoNoDisponible, nueva_clave_pedido, realizar_checkout_idempotente
+)
 from catalogo.models import Producto
+from catalogo.autocompletar import sugerencias
+from catalogo.busqueda import buscar
+from catalogo.trigramas import buscar_aproximado
+from catalogo.facetas import (
+    aplicar_filtros, calcular_facetas, enlaces_facetas, seleccion_desde_request
+)
+from core.paginacion import KeysetPaginator
+from reportes.views import solicitar_exportacion
 
 # --------------------
 # Vistas de la Tienda (Públicas / Clientes)
@@ -19,7 +33,7 @@ from catalogo.models import Producto
 def ver_productos(request):
     """
     Vista para que los clientes vean los productos disponibles.
-    Incluye filtros persistentes y paginación.
+    Incluye filtros persistentes y paginación por cursor (sin COUNT/OFFSET).
     """
     DEFAULT_SORT = 'alpha_asc'
     DEFAULT_PER_PAGE = 9
@@ -55,60 +69,92 @@ def ver_productos(request):
     else:
         per_page = request.session.get(SESSION_KEY_PER_PAGE, DEFAULT_PER_PAGE)
 
-    page_number = request.GET.get('page', 1)
+    cursor = request.GET.get('cursor')
 
-    # --- Filtro base (Solo productos con stock) ---
-    productos_list = Producto.objects.filter(stock_actual__gt=0)
+    # --- Filtro base (Solo productos con stock sin reservar) ---
+    productos_list = Producto.objects.filter(stock_actual__gt=F('stock_reservado'))
 
-    # --- Filtro de búsqueda ---
+    # --- Filtro de búsqueda (índice invertido, ver catalogo/busqueda.py) ---
+    # Si la búsqueda exacta no encuentra nada se reintenta tolerando errores
+    # de tipeo con el índice de trigramas ("marraketa" -> "marraqueta").
+    correcciones = []
     if search_query:
-        productos_list = productos_list.filter(
-            Q(nombre__icontains=search_query) |
-            Q(descripcion__icontains=search_query)
-        )
+        exactos = buscar(productos_list, search_query)
+        if exactos.exists():
+            productos_list = exactos
+        else:
+            productos_list, correcciones = buscar_aproximado(productos_list, search_query)
+
+    # --- Facetas (una sola consulta agrupada, cacheada por versión del catálogo) ---
+    seleccion = seleccion_desde_request(request.GET)
+    facetas = enlaces_facetas(
+        calcular_facetas(productos_list, seleccion, clave_filtros=search_query),
+        request.GET,
+    )
+    productos_list = aplicar_filtros(productos_list, seleccion)
 
-    # --- Ordenamiento ---
-    if sort_by == 'precio_asc':
-        productos_list = productos_list.order_by('precio')
+    # --- Ordenamiento (también define la clave del cursor) ---
+    if sort_by == 'relevancia' and search_query:
+        orden = ['-relevancia', 'nombre']
+    elif sort_by == 'precio_asc':
+        orden = ['precio_orden']
     elif sort_by == 'precio_desc':
-        productos_list = productos_list.order_by('-precio')
+        orden = ['-precio_orden']
     elif sort_by == 'alpha_desc':
-        productos_list = productos_list.order_by('-nombre')
+        orden = ['-nombre']
     else:
-        productos_list = productos_list.order_by('nombre')
+        orden = ['nombre']
+    if sort_by in ('precio_asc', 'precio_desc'):
+        productos_list = productos_list.annotate(precio_orden=Coalesce('precio', 0))
 
-    paginator = Paginator(productos_list, per_page)
-    try:
-        page_obj = paginator.get_page(page_number)
-    except Exception:
-        page_obj = paginator.get_page(1)
+    paginator = KeysetPaginator(productos_list, orden, per_page, contar='aprox')
+    page_obj = paginator.pagina(cursor)
 
     context = {
         'page_obj': page_obj,
-        'paginator': paginator,
         'current_q': search_query,
+        'correcciones': correcciones,
         'current_sort': sort_by,
         'current_per_page': per_page,
         'per_page_options': PER_PAGE_OPTIONS,
+        'facetas': facetas,
+        'facetas_activas': bool(seleccion),
     }
     return render(request, 'pedidos/ver_productos.html', context)
 
 
+@require_GET
+@cache_control(public=True, max_age=60)
+def autocompletar_productos(request):
+    """
+    Sugerencias para la búsqueda mientras se escribe (JSON).
+    Responde desde el trie en memoria (más una consulta por pk para el
+    stock) y no toca la sesión.
+    """
+    prefijo = request.GET.get('q', '')[:50]
+    if len(prefijo.strip()) < 2:
+        return JsonResponse({'sugerencias': []})
+    return JsonResponse({'sugerencias': sugerencias(prefijo)})
+
+
+@require_POST
 def agregar_al_carrito(request, pk):
     """
-    Agrega un producto al carrito almacenado en la sesión.
+    Agrega un producto al carrito y reserva sus unidades. Solo POST: un
+    prefetch o un crawler que siga el enlace no debe retener stock.
     """
-    producto = get_object_or_404(Producto, pk=pk)
+    producto = get_object_or_404(Producto.objects.only('nombre'), pk=pk)
     try:
         cantidad = int(request.POST.get('cantidad', 1))
     except (TypeError, ValueError):
         cantidad = 1
 
-    carrito = request.session.get('carrito', {})
-    carrito[str(pk)] = carrito.get(str(pk), 0) + cantidad
-    request.session['carrito'] = carrito
-
-    messages.success(request, f'¡Producto "{producto.nombre}" agregado al carrito!')
+    try:
+        Carrito(request).agregar(producto, cantidad)
+    except SinDisponibilidad as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f'¡Producto "{producto.nombre}" agregado al carrito!')
     
     # --- CAMBIO CLAVE AQUÍ ---
     # request.META.get('HTTP_REFERER') obtiene la URL exacta anterior (con filtros y paginación).
@@ -120,32 +166,16 @@ def ver_carrito(request):
     """
     Muestra el contenido del carrito, calcula subtotales y total general.
     """
-    carrito = request.session.get('carrito', {})
-    items_carrito = []
-    total_carrito = 0
-    total_items = 0  # Variable para contar la cantidad total de productos
-
-    for producto_id, cantidad in carrito.items():
-        producto = get_object_or_404(Producto, pk=producto_id)
-        
-        # --- SEGURIDAD: Convertir a enteros para cálculo matemático ---
-        precio_num = int(producto.precio or 0)
-        cantidad_num = int(cantidad or 0)
-        
-        subtotal = precio_num * cantidad_num
-        
-        items_carrito.append({
-            'producto': producto, 
-            'cantidad': cantidad_num, 
-            'subtotal': subtotal
-        })
-        total_carrito += subtotal
-        total_items += cantidad_num # Sumar al contador de items
+    # Una sola consulta para todas las líneas (ver pedidos/carrito.py)
+    contenido = Carrito(request).contenido()
+    if contenido.quitadas:
+        messages.warning(request, "Quitamos de tu carrito productos que ya no están disponibles.")
 
     return render(request, 'pedidos/ver_carrito.html', {
-        'items_carrito': items_carrito,
-        'total_carrito': total_carrito,
-        'total_items': total_items # Enviamos el total de unidades al template
+        'items_carrito': contenido.items,
+        'total_carrito': contenido.total,
+        'total_items': contenido.unidades, # Enviamos el total de unidades al template
+        'clave_pedido': nueva_clave_pedido(), # Idempotencia del botón "Confirmar Pedido"
     })
 
 
@@ -154,46 +184,33 @@ def realizar_pedido(request):
     """
     Procesa el carrito y crea un Pedido en la base de datos.
     """
-    carrito = request.session.get('carrito', {})
-    if not carrito:
-        messages.warning(request, "Tu carrito está vacío.")
-        return redirect('pedidos:ver_productos')
+    if request.method != 'POST':
+        return redirect('pedidos:ver_carrito')
 
-    total_pedido = 0
-    items_para_pedido = []
-    
-    # 1. Calcular total y validar productos
-    for producto_id, cantidad in carrito.items():
-        producto = get_object_or_404(Producto, pk=producto_id)
-        
-        # Validación básica de stock antes de procesar
-        if cantidad > producto.stock_actual:
-            messages.error(request, f"No hay suficiente stock para {producto.nombre}.")
-            return redirect('pedidos:ver_carrito')
-            
-        precio_num = int(producto.precio or 0)
-        total_pedido += precio_num * cantidad
-        items_para_pedido.append((producto, cantidad, precio_num))
-
-    # 2. Crear el Pedido
-    pedido = Pedido.objects.create(usuario=request.user, total=total_pedido)
-    
-    # 3. Crear Detalles y Descontar Stock
-    for producto, cantidad, precio in items_para_pedido:
-        DetallePedido.objects.create(
-            pedido=pedido, 
-            producto=producto, 
-            cantidad=cantidad, 
-            precio=precio
-        )
-        # Descontar stock
-        producto.stock_actual -= cantidad
-        producto.save()
+    carrito = Carrito(request)
 
-    # 4. Limpiar carrito
-    request.session['carrito'] = {}
-    
-    messages.success(request, "¡Pedido realizado con éxito!")
+    # Descuento de stock y creación del pedido en una sola transacción
+    # (las reservas del carrito se convierten en venta). Con la misma clave
+    # (doble clic, reintento) se devuelve el pedido ya creado.
+    try:
+        pedido, repetido = realizar_checkout_idempotente(
+            request.user, request.POST.get('clave'), carrito.lineas(), dueno=carrito.dueno(),
+        )
+    except CarritoVacio as e:
+        messages.warning(request, str(e))
+        return redirect('pedidos:ver_productos')
+    except ProductoNoDisponible as e:
+        carrito.quitar(e.producto_id)
+        messages.error(request, str(e))
+        return redirect('pedidos:ver_carrito')
+    except ErrorCheckout as e:
+        messages.error(request, str(e))
+        return redirect('pedidos:ver_carrito')
+
+    if not repetido:
+        # Limpiar carrito
+        carrito.vaciar()
+        messages.success(request, "¡Pedido realizado con éxito!")
     return redirect('pedidos:pedido_exitoso')
 
 
@@ -270,70 +287,37 @@ def cliente_delete(request, pk):
 @permission_required('pedidos.view_pedido', raise_exception=True)
 def pedido_list(request):
     """
-    Lista de pedidos con opción de búsqueda.
+    Lista de pedidos con opción de búsqueda y paginación por cursor.
     """
-    pedidos = Pedido.objects.all().order_by('-fecha_pedido')
-    
-    # Filtro simple por nombre de cliente o estado
-    q = request.GET.get('q')
-    if q:
-        pedidos = pedidos.filter(
-            Q(usuario__first_name__icontains=q) |
-            Q(usuario__last_name__icontains=q) |
-            Q(usuario__email__icontains=q) |
-            Q(estado__icontains=q)
-        )
+    # Modelo de lectura: una fila por pedido, sin JOIN (ver pedidos/resumen.py)
+    pedidos = ResumenPedido.objects.defer('productos')
 
-    return render(request, 'pedidos/pedido_list.html', {'pedidos': pedidos})
+    # Búsqueda por cliente (prefijos en TerminoCliente) o por estado
+    # (ver pedidos/busqueda.py)
+    q = request.GET.get('q', '').strip()
+    pedidos = buscar_pedidos(pedidos, q)
+
+    # 20 pedidos por página, los más recientes primero (índice fecha_pedido, pedido)
+    paginator = KeysetPaginator(pedidos, ['-fecha_pedido', '-pk'], 20, contar='aprox')
+    page_obj = paginator.pagina(request.GET.get('cursor'))
+
+    return render(request, 'pedidos/pedido_list.html', {
+        'pedidos': page_obj,
+        'page_obj': page_obj,
+        'current_q': q,
+    })
 
 
 @login_required
 @permission_required('pedidos.view_pedido', raise_exception=True)
 def exportar_pedidos_excel(request):
-    pedidos = Pedido.objects.all().order_by('-fecha_pedido')
-
-    # Crear un libro de Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Pedidos"
-
-    # Encabezados
-    columnas = ["ID", "Cliente", "Correo", "Fecha del Pedido", "Total", "Estado"]
-    for col_num, titulo in enumerate(columnas, 1):
-        c = ws.cell(row=1, column=col_num)
-        c.value = titulo
-        c.font = openpyxl.styles.Font(bold=True)
-
-    # Filas de datos
-    for row_num, pedido in enumerate(pedidos, 2):
-        ws.cell(row=row_num, column=1).value = pedido.id
-        ws.cell(row=row_num, column=2).value = f"{pedido.usuario.first_name} {pedido.usuario.last_name}"
-        ws.cell(row=row_num, column=3).value = pedido.usuario.email
-        ws.cell(row=row_num, column=4).value = pedido.fecha_pedido.strftime("%d/%m/%Y %H:%M")
-        ws.cell(row=row_num, column=5).value = float(pedido.total)
-        ws.cell(row=row_num, column=6).value = pedido.estado
-
-    # Ajustar ancho automático
-    for col_num in range(1, len(columnas) + 1):
-        columna = get_column_letter(col_num)
-        ws.column_dimensions[columna].width = 20
-
-    # Respuesta HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="pedidos.xlsx"'
-    wb.save(response)
-    return response
+    # Se genera en segundo plano (procesar_reportes), con la búsqueda del listado
+    return solicitar_exportacion(request, 'pedidos', {'q': request.GET.get('q', '').strip()})
 
 
 @login_required
 @permission_required('pedidos.view_pedido', raise_exception=True)
 def pedido_detail(request, pk):
-    pedido = get_object_or_404(Pedido, pk=pk)
-    
-    # Calcular subtotales para mostrarlos en el template si no están guardados
-    for detalle in pedido.detalles.all():
-        detalle.subtotal = detalle.cantidad * detalle.precio
-
-    return render(request, 'pedidos/pedido_detail.html', {'pedido': pedido})
\ No newline at end of file
+    # Cliente, productos y subtotales vienen en la fila del resumen
+    pedido = get_object_or_404(ResumenPedido, pk=pk)
+    return render(request, 'pedidos/pedido_detail.html', {'pedido': pedido})
@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import TrabajoReporte
+
+
+# --- Admin para Trabajos de Reporte ---
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'reporte', 'formato', 'estado', 'filas', 'solicitado_por', 'creado', 'terminado', 'expira')
+    list_filter = ('estado', 'reporte', 'formato')
+    ordering = ('-creado',)
+    list_select_related = ('solicitado_por',)
+    readonly_fields = ('huella', 'iniciado', 'terminado', 'filas', 'error')
+    def has_module_permission(self, request): return request.user.is_superuser
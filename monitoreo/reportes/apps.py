@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class ReportesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'reportes'
+
+    def ready(self):
+        # Cada app declara sus reportes en su propio módulo `reportes.py`
+        autodiscover_modules('reportes')
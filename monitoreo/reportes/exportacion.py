@@ -0,0 +1,231 @@
+"""
+Motor único de exportación a Excel (XLSX) y CSV.
+
+Cada reporte se declara una sola vez como una subclase de `Reporte` con su
+lista de `Columna`, en el módulo `reportes.py` de la app dueña de los datos
+(se cargan solos al iniciar, ver ReportesConfig.ready). Las vistas y las
+acciones del admin solo piden el reporte por nombre.
+
+Para que la memoria no crezca con el número de filas:
+
+* La consulta se recorre en bloques de CHUNK_SIZE filas con paginación por
+  cursor (KeysetPaginator.recorrer, una consulta "seek" por bloque) y el
+  `select_related` del reporte (sin consultas N+1 por fila). No se usa
+  `.iterator()`: con mysqlclient no hay cursores del lado del servidor y
+  el driver traería el resultado completo a memoria.
+* XLSX: openpyxl en modo write-only, que vuelca cada fila a disco; el libro
+  se arma en un archivo temporal y se envía con FileResponse. Los anchos de
+  columna vienen de la declaración (no se recorren las celdas al final).
+* CSV: StreamingHttpResponse, el archivo nunca existe completo.
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+
+from core.paginacion import KeysetPaginator
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CHUNK_SIZE = 2000
+FILAS_POR_BLOQUE_CSV = 500
+
+_registro = {}
+
+
+class ReporteNoEncontrado(LookupError):
+    pass
+
+
+def _ruta(ruta):
+    """
+    'usuario.email' -> función que devuelve obj.usuario.email, o '' si algún
+    tramo es None.
+    """
+    partes = ruta.split('.')
+
+    def obtener(obj):
+        for parte in partes:
+            if obj is None:
+                return ''
+            obj = getattr(obj, parte)
+        return '' if obj is None else obj
+    return obtener
+
+
+class Columna:
+    """
+    Una columna del reporte. `valor` es una ruta de atributos ('Categorias.nombre')
+    o una función que recibe el objeto.
+    """
+
+    def __init__(self, titulo, valor, ancho=15):
+        self.titulo = titulo
+        self.ancho = ancho
+        self.obtener = valor if callable(valor) else _ruta(valor)
+
+
+class Reporte:
+    nombre = None          # clave con la que se registra y se pide
+    titulo = ''            # nombre de la hoja de Excel
+    archivo = None         # nombre del archivo descargado, sin extensión
+    modelo = None
+    columnas = ()
+    select_related = ()
+    orden = ('pk',)
+    permiso = None         # permiso para encargar/descargar el reporte en segundo plano
+
+    def queryset(self):
+        return self.modelo._default_manager.all()
+
+    def filtrar(self, qs, parametros):
+        """
+        Aplica los `parametros` de un trabajo en segundo plano (p. ej. la
+        búsqueda del listado). Por defecto no filtra.
+        """
+        return qs
+
+    def preparar(self, qs):
+        """
+        Ajusta la consulta (propia o recibida, p. ej. la selección del admin)
+        para recorrerla: relaciones en el mismo SELECT y orden estable.
+        """
+        if self.select_related:
+            qs = qs.select_related(*self.select_related)
+        return qs.order_by(*self.orden)
+
+    @property
+    def encabezados(self):
+        return [c.titulo for c in self.columnas]
+
+    def valores(self, objetos):
+        obtener = [c.obtener for c in self.columnas]
+        for obj in objetos:
+            yield [f(obj) for f in obtener]
+
+    def objetos(self, qs=None, chunk_size=CHUNK_SIZE, parametros=None):
+        """
+        Objetos del reporte en `orden`, leídos de a `chunk_size` por consulta.
+        """
+        qs = self.queryset() if qs is None else qs
+        if parametros:
+            qs = self.filtrar(qs, parametros)
+        return KeysetPaginator(self.preparar(qs), self.orden, chunk_size).recorrer()
+
+    def filas(self, qs=None, chunk_size=CHUNK_SIZE, parametros=None):
+        return self.valores(self.objetos(qs, chunk_size, parametros))
+
+
+# --- Registro ---
+def registrar(clase):
+    """
+    Decorador: registra el reporte bajo `clase.nombre`.
+    """
+    _registro[clase.nombre] = clase()
+    return clase
+
+
+def obtener_reporte(nombre):
+    try:
+        return _registro[nombre]
+    except KeyError:
+        raise ReporteNoEncontrado(f"reporte desconocido: {nombre}")
+
+
+def reportes_registrados():
+    return dict(_registro)
+
+
+# --- Escritores ---
+def escribir_xlsx(reporte, filas, destino):
+    """
+    Escribe `filas` en `destino` (ruta o archivo binario) como un libro XLSX.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(reporte.titulo or reporte.nombre)
+    # En write-only los anchos deben fijarse antes de la primera fila
+    for i, columna in enumerate(reporte.columnas, 1):
+        hoja.column_dimensions[get_column_letter(i)].width = columna.ancho
+
+    negrita = Font(bold=True)
+    encabezados = []
+    for titulo in reporte.encabezados:
+        celda = WriteOnlyCell(hoja, value=titulo)
+        celda.font = negrita
+        encabezados.append(celda)
+    hoja.append(encabezados)
+
+    for fila in filas:
+        hoja.append(fila)
+    libro.save(destino)
+
+
+class _Eco:
+    """
+    Pseudo-archivo para csv.writer: devuelve lo escrito en vez de guardarlo.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(reporte, filas):
+    """
+    Genera el CSV en bloques de texto de FILAS_POR_BLOQUE_CSV filas.
+    """
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(reporte.encabezados)
+    bloque = []
+    for fila in filas:
+        bloque.append(escritor.writerow(fila))
+        if len(bloque) >= FILAS_POR_BLOQUE_CSV:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+# --- Respuestas HTTP ---
+def respuesta_xlsx(reporte, qs=None):
+    temporal = tempfile.TemporaryFile()
+    escribir_xlsx(reporte, reporte.filas(qs), temporal)
+    temporal.seek(0)
+    # FileResponse cierra (y así borra) el temporal al terminar de enviarlo
+    return FileResponse(
+        temporal, as_attachment=True,
+        filename=f"{reporte.archivo or reporte.nombre}.xlsx",
+        content_type=CONTENT_TYPE_XLSX,
+    )
+
+
+def respuesta_csv(reporte, qs=None):
+    response = StreamingHttpResponse(
+        generar_csv(reporte, reporte.filas(qs)), content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{reporte.archivo or reporte.nombre}.csv"'
+    return response
+
+
+def exportar(nombre, formato=None, qs=None):
+    """
+    Respuesta de descarga del reporte `nombre`; XLSX salvo formato='csv'.
+    """
+    reporte = obtener_reporte(nombre)
+    if formato == 'csv':
+        return respuesta_csv(reporte, qs)
+    return respuesta_xlsx(reporte, qs)
+
+
+def accion_exportar_csv(nombre, descripcion):
+    """
+    Acción de admin que exporta a CSV las filas seleccionadas con el reporte `nombre`.
+    """
+    def accion(modeladmin, request, queryset):
+        return respuesta_csv(obtener_reporte(nombre), queryset)
+    accion.__name__ = f'exportar_{nombre}_csv'
+    accion.short_description = descripcion
+    return accion
@@ -0,0 +1,94 @@
+import copy
+import os
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reportes.exportacion import escribir_xlsx, generar_csv, obtener_reporte, ReporteNoEncontrado
+
+
+def rss_mib():
+    """
+    Memoria residente actual del proceso (pico, si no hay /proc).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide tiempo y memoria del motor de exportación. Por defecto lee todas '
+        'las filas del reporte desde la base, por el mismo camino que las descargas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reporte', default='productos', help='Reporte a exportar (por defecto productos).')
+        parser.add_argument('--formato', choices=['xlsx', 'csv'], default='xlsx')
+        parser.add_argument(
+            '--sintetico', action='store_true',
+            help='Genera --filas copias de una fila real en vez de leer la base (mide solo el escritor).',
+        )
+        parser.add_argument(
+            '--filas', type=int, default=1_000_000,
+            help='Filas sintéticas a escribir con --sintetico (por defecto 1.000.000).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            reporte = obtener_reporte(options['reporte'])
+        except ReporteNoEncontrado as e:
+            raise CommandError(f"✖ {e}")
+
+        if options['sintetico']:
+            prototipo = reporte.preparar(reporte.queryset()).first()
+            if prototipo is None:
+                raise CommandError(f"✖ El reporte {reporte.nombre} no tiene filas de las que partir.")
+            total = options['filas']
+            objetos = self._sinteticos(prototipo, total)
+        else:
+            total = reporte.queryset().count()
+            if not total:
+                raise CommandError(f"✖ El reporte {reporte.nombre} no tiene filas en la base.")
+            objetos = reporte.objetos()
+
+        muestras = []
+        paso = max(total // 10, 1)
+
+        def medir(objetos):
+            for i, obj in enumerate(objetos, 1):
+                yield obj
+                if i % paso == 0:
+                    muestras.append((i, time.perf_counter() - inicio, rss_mib()))
+
+        base = rss_mib()
+        inicio = time.perf_counter()
+        filas = reporte.valores(medir(objetos))
+        with tempfile.TemporaryFile() as destino:
+            if options['formato'] == 'xlsx':
+                escribir_xlsx(reporte, filas, destino)
+            else:
+                for bloque in generar_csv(reporte, filas):
+                    destino.write(bloque.encode())
+            duracion = time.perf_counter() - inicio
+            tamano = destino.tell()
+
+        self.stdout.write(f"RSS inicial: {base:.1f} MiB")
+        for i, segundos, rss in muestras:
+            self.stdout.write(f"  {i:>10,} filas  {segundos:7.2f}s  RSS {rss:7.1f} MiB")
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ {total:,} filas {options['formato']} en {duracion:.2f}s "
+            f"({total / duracion if duracion else 0:,.0f} filas/s), {tamano / 1024 / 1024:.1f} MiB; "
+            f"pico RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB."
+        ))
+
+    def _sinteticos(self, prototipo, total):
+        # Copias superficiales: cada fila es un objeto nuevo, como al leer la base
+        for i in range(1, total + 1):
+            obj = copy.copy(prototipo)
+            obj.pk = i
+            yield obj
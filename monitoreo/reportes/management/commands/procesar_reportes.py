@@ -0,0 +1,81 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+
+from reportes.models import TrabajoReporte
+from reportes.trabajos import ejecutar, limpiar_vencidos, reintentar_colgados, tomar_siguiente
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker de exportaciones: genera los reportes encargados desde la web '
+        '(TrabajoReporte pendientes) y borra los archivos vencidos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help='Procesa los pendientes y termina (para cron), en vez de quedar escuchando.',
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2,
+            help='Segundos de espera cuando no hay trabajos (por defecto 2).',
+        )
+        parser.add_argument(
+            '--colgados-minutos', type=int, default=30,
+            help='Reintenta los trabajos que llevan más de N minutos procesando (por defecto 30).',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Procesando reportes..."))
+        ultima_limpieza = 0
+        try:
+            while True:
+                # Un worker de larga vida no pasa por el ciclo de request: las
+                # conexiones cerradas por el servidor (wait_timeout de MySQL) o
+                # más viejas que CONN_MAX_AGE se descartan aquí
+                close_old_connections()
+                trabajo = None
+                try:
+                    if time.monotonic() - ultima_limpieza > 60:
+                        reintentados = reintentar_colgados(options['colgados_minutos'])
+                        borrados = limpiar_vencidos()
+                        ultima_limpieza = time.monotonic()
+                        if reintentados or borrados:
+                            self.stdout.write(f"  {reintentados} trabajos reintentados, {borrados} vencidos borrados.")
+
+                    trabajo = tomar_siguiente()
+                    if trabajo is None:
+                        if options['una_vez']:
+                            break
+                        time.sleep(options['intervalo'])
+                        continue
+
+                    inicio = time.perf_counter()
+                    ejecutar(trabajo)
+                except DatabaseError as e:
+                    # Un error de base no termina el worker. El trabajo que no
+                    # se pudo guardar queda 'procesando' y reintentar_colgados
+                    # lo devuelve a la cola.
+                    logger.exception("Error de base en el worker de reportes")
+                    if trabajo is None and options['una_vez']:
+                        raise CommandError(f"✖ Error de base de datos: {e}")
+                    self.stdout.write(self.style.ERROR(
+                        f"✖ Error de base de datos{f' en #{trabajo.pk}' if trabajo else ''}: {e}"
+                    ))
+                    close_old_connections()
+                    time.sleep(options['intervalo'])
+                    continue
+
+                if trabajo.estado == TrabajoReporte.LISTO:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✔ #{trabajo.pk} {trabajo}: {trabajo.filas} filas en {time.perf_counter() - inicio:.2f}s"
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f"✖ #{trabajo.pk} {trabajo}: {trabajo.error}"))
+        except KeyboardInterrupt:
+            self.stdout.write("Detenido.")
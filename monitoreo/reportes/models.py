@@ -0,0 +1,77 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class AlmacenamientoReportes(FileSystemStorage):
+    """
+    FileSystemStorage sobre REPORTES_ROOT, leído en cada uso (como MEDIA_ROOT
+    en el storage por defecto) para que override_settings lo respete.
+    """
+
+    @property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.REPORTES_ROOT)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+almacenamiento_reportes = AlmacenamientoReportes()
+
+
+def obtener_almacenamiento_reportes():
+    # Fuera de MEDIA_ROOT: los reportes tienen datos personales y solo se
+    # entregan por la vista de descarga, que revisa permisos
+    return almacenamiento_reportes
+
+
+class TrabajoReporte(models.Model):
+    """
+    Exportación encargada desde la web y generada por `procesar_reportes`
+    fuera del ciclo de la petición. Los pedidos idénticos (misma `huella`)
+    reutilizan el archivo mientras no venza.
+    """
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    LISTO = 'listo'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESANDO, 'Procesando'),
+        (LISTO, 'Listo'),
+        (ERROR, 'Error'),
+    ]
+
+    reporte = models.CharField(max_length=50)
+    formato = models.CharField(max_length=10, default='xlsx')
+    parametros = models.JSONField(default=dict, blank=True)
+    huella = models.CharField(max_length=64, db_index=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    archivo = models.FileField(upload_to='reportes/', storage=obtener_almacenamiento_reportes, blank=True)
+    filas = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+    )
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+    expira = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'trabajo_reporte'
+        ordering = ['-creado']
+        indexes = [models.Index(fields=['estado', 'creado'])]
+
+    def __str__(self):
+        return f"{self.reporte}.{self.formato} ({self.get_estado_display()})"
+
+    @property
+    def en_curso(self):
+        return self.estado in (self.PENDIENTE, self.PROCESANDO)
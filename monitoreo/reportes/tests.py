@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from catalogo.models import Categoria
+
+from .models import TrabajoReporte
+from .trabajos import ejecutar, limpiar_vencidos, solicitar
+
+
+class ProcesarReportesTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta)
+        ajustes = override_settings(REPORTES_ROOT=carpeta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        Categoria.objects.create(nombre='Panadería')
+
+    def test_error_de_base_no_detiene_el_worker(self):
+        caido, _ = solicitar('categorias', 'csv')
+        siguiente, _ = solicitar('categorias', 'xlsx')
+        fallas = [OperationalError('server has gone away')]
+
+        def ejecutar_con_caida(trabajo):
+            if fallas:
+                raise fallas.pop()
+            return ejecutar(trabajo)
+
+        comando = 'reportes.management.commands.procesar_reportes'
+        with mock.patch(f'{comando}.ejecutar', ejecutar_con_caida), \
+                mock.patch(f'{comando}.close_old_connections') as cerrar, \
+                self.assertLogs(comando, 'ERROR'):
+            call_command('procesar_reportes', '--una-vez', '--intervalo', '0', stdout=StringIO())
+
+        caido.refresh_from_db()
+        siguiente.refresh_from_db()
+        # El caído queda 'procesando' para reintentar_colgados; el resto sigue
+        self.assertEqual(caido.estado, TrabajoReporte.PROCESANDO)
+        self.assertEqual(siguiente.estado, TrabajoReporte.LISTO)
+        self.assertEqual(siguiente.filas, 1)
+        self.assertGreaterEqual(cerrar.call_count, 3)
+
+    def test_retencion_separada_de_la_reutilizacion(self):
+        trabajo, _ = solicitar('categorias', 'csv')
+        ejecutar(trabajo)
+        ruta = trabajo.archivo.path
+        self.assertTrue(ruta.startswith(settings.REPORTES_ROOT))
+
+        # Pasada la ventana de reutilización se genera otro, pero el archivo sigue
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(terminado=timezone.now() - timedelta(hours=1))
+        self.assertFalse(solicitar('categorias', 'csv')[1])
+        self.assertEqual(limpiar_vencidos(), 0)
+        self.assertTrue(os.path.exists(ruta))
+
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(expira=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(limpiar_vencidos(), 1)
+        self.assertFalse(os.path.exists(ruta))
@@ -0,0 +1,154 @@
+"""
+Exportaciones en segundo plano.
+
+La vista solo registra un TrabajoReporte (`solicitar`) y redirige a su
+página de estado; el comando `procesar_reportes` los toma (`tomar_siguiente`)
+y genera el archivo con el motor de reportes.exportacion (`ejecutar`).
+
+Un pedido con el mismo reporte, formato y parámetros que otro en curso, o
+que uno listo hace menos de REPORTES_TTL segundos, reutiliza ese trabajo y
+su archivo en vez de generar uno nuevo. El archivo se puede seguir
+descargando durante REPORTES_RETENCION segundos (TrabajoReporte.expira);
+después `limpiar_vencidos` lo borra.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+
+from .exportacion import escribir_xlsx, generar_csv, obtener_reporte
+from .models import TrabajoReporte
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ('xlsx', 'csv')
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'REPORTES_TTL', 15 * 60))
+
+
+def retencion():
+    # Nunca menos que la ventana de reutilización
+    return max(timedelta(seconds=getattr(settings, 'REPORTES_RETENCION', 7 * 24 * 60 * 60)), ttl())
+
+
+def calcular_huella(nombre, formato, parametros):
+    datos = json.dumps([nombre, formato, parametros or {}], sort_keys=True, default=str)
+    return hashlib.sha256(datos.encode()).hexdigest()
+
+
+def solicitar(nombre, formato='xlsx', parametros=None, usuario=None):
+    """
+    Devuelve (trabajo, reutilizado). Lanza ReporteNoEncontrado si `nombre`
+    no está registrado.
+    """
+    obtener_reporte(nombre)
+    formato = formato if formato in FORMATOS else 'xlsx'
+    parametros = {k: v for k, v in (parametros or {}).items() if v not in (None, '')}
+    huella = calcular_huella(nombre, formato, parametros)
+
+    vigente = (
+        TrabajoReporte.objects.filter(huella=huella)
+        .filter(
+            Q(estado__in=[TrabajoReporte.PENDIENTE, TrabajoReporte.PROCESANDO]) |
+            Q(estado=TrabajoReporte.LISTO, terminado__gt=timezone.now() - ttl())
+        )
+        .order_by('-creado').first()
+    )
+    if vigente:
+        return vigente, True
+
+    trabajo = TrabajoReporte.objects.create(
+        reporte=nombre, formato=formato, parametros=parametros,
+        huella=huella, solicitado_por=usuario,
+    )
+    return trabajo, False
+
+
+def tomar_siguiente():
+    """
+    Marca como 'procesando' el trabajo pendiente más antiguo y lo devuelve.
+    El UPDATE condicional hace que dos workers no tomen el mismo trabajo.
+    """
+    pendientes = TrabajoReporte.objects.filter(estado=TrabajoReporte.PENDIENTE)
+    while True:
+        pk = pendientes.order_by('creado', 'pk').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        tomados = pendientes.filter(pk=pk).update(
+            estado=TrabajoReporte.PROCESANDO, iniciado=timezone.now(),
+        )
+        if tomados:
+            return TrabajoReporte.objects.get(pk=pk)
+
+
+def _contar(filas, trabajo):
+    trabajo.filas = 0
+    for fila in filas:
+        trabajo.filas += 1
+        yield fila
+
+
+def ejecutar(trabajo):
+    """
+    Genera el archivo del trabajo. Los errores quedan registrados en el
+    trabajo (estado 'error') en vez de propagarse.
+    """
+    try:
+        reporte = obtener_reporte(trabajo.reporte)
+        filas = _contar(reporte.filas(parametros=trabajo.parametros), trabajo)
+        with tempfile.TemporaryFile() as temporal:
+            if trabajo.formato == 'csv':
+                for bloque in generar_csv(reporte, filas):
+                    temporal.write(bloque.encode('utf-8'))
+            else:
+                escribir_xlsx(reporte, filas, temporal)
+            temporal.seek(0)
+            nombre = f"{reporte.archivo or reporte.nombre}-{trabajo.huella[:12]}.{trabajo.formato}"
+            trabajo.archivo.save(nombre, File(temporal), save=False)
+    except Exception as e:
+        logger.exception("Falló el trabajo de reporte %s", trabajo.pk)
+        trabajo.estado = TrabajoReporte.ERROR
+        trabajo.error = str(e)
+    else:
+        trabajo.estado = TrabajoReporte.LISTO
+        trabajo.error = ''
+    trabajo.terminado = timezone.now()
+    trabajo.expira = trabajo.terminado + retencion()
+    trabajo.save()
+    return trabajo
+
+
+def reintentar_colgados(minutos=30):
+    """
+    Devuelve a 'pendiente' los trabajos que quedaron 'procesando' por más de
+    `minutos` (worker caído a mitad de camino).
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return TrabajoReporte.objects.filter(
+        estado=TrabajoReporte.PROCESANDO, iniciado__lt=limite,
+    ).update(estado=TrabajoReporte.PENDIENTE, iniciado=None)
+
+
+def limpiar_vencidos():
+    """
+    Borra los trabajos terminados cuyo plazo de descarga (REPORTES_RETENCION)
+    ya venció, junto con el archivo.
+    """
+    borrados = 0
+    vencidos = TrabajoReporte.objects.filter(
+        estado__in=[TrabajoReporte.LISTO, TrabajoReporte.ERROR], expira__lt=timezone.now(),
+    )
+    for trabajo in vencidos.iterator():
+        if trabajo.archivo:
+            trabajo.archivo.delete(save=False)
+        trabajo.delete()
+        borrados += 1
+    return borrados
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'reportes'
+
+urlpatterns = [
+    path('', views.trabajo_list, name='trabajo_list'),
+    path('<int:pk>/', views.trabajo_detail, name='trabajo_detail'),
+    path('<int:pk>/descargar/', views.trabajo_descargar, name='trabajo_descargar'),
+]
@@ -0,0 +1,72 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404, redirect, render
+
+from .exportacion import ReporteNoEncontrado, obtener_reporte, reportes_registrados
+from .models import TrabajoReporte
+from .trabajos import solicitar
+
+
+def _puede_ver(usuario, nombre):
+    try:
+        permiso = obtener_reporte(nombre).permiso
+    except ReporteNoEncontrado:
+        return False
+    return permiso is None or usuario.has_perm(permiso)
+
+
+def solicitar_exportacion(request, nombre, parametros=None):
+    """
+    Encarga el reporte `nombre` al worker y redirige a la página del trabajo.
+    Para usar desde las vistas de exportación de cada app.
+    """
+    trabajo, reutilizado = solicitar(
+        nombre, request.GET.get('formato', 'xlsx'), parametros, usuario=request.user,
+    )
+    if reutilizado and trabajo.estado == TrabajoReporte.LISTO:
+        messages.info(request, 'Ya había un reporte reciente con los mismos datos; puedes descargarlo.')
+    else:
+        messages.success(request, 'Tu reporte se está generando. Puedes esperar aquí o volver más tarde.')
+    return redirect('reportes:trabajo_detail', pk=trabajo.pk)
+
+
+# ----------------------------------------
+# ESTADO Y DESCARGA DE TRABAJOS
+# ----------------------------------------
+@login_required
+def trabajo_list(request):
+    """
+    Últimos trabajos de los reportes que el usuario puede ver.
+    """
+    visibles = [n for n in reportes_registrados() if _puede_ver(request.user, n)]
+    trabajos = (
+        TrabajoReporte.objects.filter(reporte__in=visibles)
+        .select_related('solicitado_por').order_by('-creado')[:30]
+    )
+    return render(request, 'reportes/trabajo_list.html', {'trabajos': trabajos})
+
+
+@login_required
+def trabajo_detail(request, pk):
+    trabajo = get_object_or_404(TrabajoReporte, pk=pk)
+    if not _puede_ver(request.user, trabajo.reporte):
+        raise PermissionDenied
+    return render(request, 'reportes/trabajo_detail.html', {'trabajo': trabajo})
+
+
+@login_required
+def trabajo_descargar(request, pk):
+    trabajo = get_object_or_404(TrabajoReporte, pk=pk)
+    if not _puede_ver(request.user, trabajo.reporte):
+        raise PermissionDenied
+    if trabajo.estado != TrabajoReporte.LISTO or not trabajo.archivo:
+        messages.warning(request, 'El reporte todavía no está disponible.')
+        return redirect('reportes:trabajo_detail', pk=pk)
+
+    archivo = obtener_reporte(trabajo.reporte).archivo or trabajo.reporte
+    return FileResponse(
+        trabajo.archivo.open('rb'), as_attachment=True,
+        filename=f"{archivo}.{trabajo.formato}",
+    )
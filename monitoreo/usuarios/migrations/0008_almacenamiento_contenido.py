@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:58
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0007_alter_rol_options_alter_usuario_direccion_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usuario',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.obtener_almacenamiento_contenido, upload_to='avatares/', verbose_name='Avatar'),
+        ),
+    ]
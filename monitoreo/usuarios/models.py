@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 
+from core.storage import obtener_almacenamiento_contenido
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -52,7 +54,11 @@ class Usuario(AbstractUser):
     fono = models.IntegerField(blank=True, null=True)
     
     # --- ¡CAMPO AÑADIDO AQUÍ! ---
-    avatar = models.ImageField(upload_to='avatares/', null=True, blank=True, verbose_name='Avatar')
+    avatar = models.ImageField(
+        upload_to='avatares/',
+        storage=obtener_almacenamiento_contenido,
+        null=True, blank=True, verbose_name='Avatar',
+    )
     
     Direccion = models.ForeignKey('Direccion', on_delete=models.DO_NOTHING, null=True, blank=True)
     Roles = models.ForeignKey('Rol', on_delete=models.DO_NOTHING, null=True, blank=True)
@@ -0,0 +1,46 @@
+"""
+Reportes exportables de usuarios (ver reportes.exportacion).
+"""
+from django.db.models import Q
+
+from reportes.exportacion import Columna, Reporte, registrar
+
+from .models import Usuario
+
+
+def _direccion(usuario):
+    if usuario.Direccion:
+        return f"{usuario.Direccion.calle} {usuario.Direccion.numero}"
+    return "Sin Dirección"
+
+
+@registrar
+class ReporteUsuarios(Reporte):
+    nombre = 'usuarios'
+    titulo = 'Usuarios'
+    archivo = 'usuarios'
+    modelo = Usuario
+    select_related = ('Roles', 'Direccion')
+    permiso = 'usuarios.view_usuario'
+    columnas = (
+        Columna("ID", 'id', ancho=8),
+        Columna("Nombre", 'first_name', ancho=20),
+        Columna("Apellido", 'last_name', ancho=20),
+        Columna("Email", 'email', ancho=30),
+        Columna("Run", 'run', ancho=15),
+        Columna("Fono", 'fono', ancho=15),
+        Columna("Rol", lambda u: u.Roles.nombre if u.Roles else "Sin Rol", ancho=20),
+        Columna("Dirección", _direccion, ancho=30),
+    )
+
+    def filtrar(self, qs, parametros):
+        # Misma búsqueda de texto que usuario_list
+        q = parametros.get('q')
+        if q:
+            qs = qs.filter(
+                Q(first_name__icontains=q) |
+                Q(last_name__icontains=q) |
+                Q(email__icontains=q) |
+                Q(run__icontains=q)
+            )
+        return qs
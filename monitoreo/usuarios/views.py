@@ -3,16 +3,14 @@ from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
 from django.db.models import Q
-from django.core.paginator import Paginator
-from django.http import HttpResponse
-import openpyxl
-from openpyxl.utils import get_column_letter
 
 # Importamos los formularios y modelos desde la app local 'usuarios'
 from .forms import (
     CustomRegisterForm, UserProfileForm, DireccionForm
 )
 from .models import Usuario, Direccion, Rol
+from core.paginacion import KeysetPaginator
+from reportes.views import solicitar_exportacion
 
 # --------------------
 # Vistas de Autenticación
@@ -97,7 +95,7 @@ def usuario_list(request):
     Lista de usuarios con filtros avanzados (Búsqueda, Rol, Estado) y paginación.
     """
     # 1. Consulta Base Optimizada
-    usuarios_qs = Usuario.objects.all().select_related('Roles', 'Direccion').order_by('id')
+    usuarios_qs = Usuario.objects.all().select_related('Roles', 'Direccion')
 
     # 2. Capturar parámetros de la URL
     q = request.GET.get('q', '').strip()
@@ -127,10 +125,9 @@ def usuario_list(request):
         elif estado == 'inactivo':
             usuarios_qs = usuarios_qs.filter(is_active=False)
 
-    # 4. Paginación (10 usuarios por página)
-    paginator = Paginator(usuarios_qs, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # 4. Paginación por cursor (10 usuarios por página, ordenados por id)
+    paginator = KeysetPaginator(usuarios_qs, ['id'], 10, contar='aprox')
+    page_obj = paginator.pagina(request.GET.get('cursor'))
 
     # 5. Obtener roles para el dropdown de filtros
     roles = Rol.objects.all()
@@ -209,36 +206,7 @@ def usuario_delete(request, pk):
 @permission_required('usuarios.view_usuario', raise_exception=True)
 def exportar_usuarios_excel(request):
     """
-    Genera un reporte Excel con todos los usuarios registrados.
+    Encarga el reporte Excel de usuarios (filtrado por la búsqueda del
+    listado) al worker de reportes.
     """
-    usuarios = Usuario.objects.all().order_by('id')
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Usuarios"
-
-    columnas = ["ID", "Nombre", "Apellido", "Email", "Run", "Fono", "Rol", "Dirección"]
-    for col_num, titulo in enumerate(columnas, 1):
-        c = ws.cell(row=1, column=col_num)
-        c.value = titulo
-        c.font = openpyxl.styles.Font(bold=True)
-
-    for row_num, usuario in enumerate(usuarios, 2):
-        ws.cell(row=row_num, column=1).value = usuario.id
-        ws.cell(row=row_num, column=2).value = usuario.first_name
-        ws.cell(row=row_num, column=3).value = usuario.last_name
-        ws.cell(row=row_num, column=4).value = usuario.email
-        ws.cell(row=row_num, column=5).value = usuario.run
-        ws.cell(row=row_num, column=6).value = usuario.fono
-        ws.cell(row=row_num, column=7).value = usuario.Roles.nombre if usuario.Roles else "Sin Rol"
-        ws.cell(row=row_num, column=8).value = f"{usuario.Direccion.calle} {usuario.Direccion.numero}" if usuario.Direccion else "Sin Dirección"
-
-    for col_num in range(1, len(columnas) + 1):
-        ws.column_dimensions[get_column_letter(col_num)].width = 20
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="usuarios.xlsx"'
-    wb.save(response)
-    return response
\ No newline at end of file
+    return solicitar_exportacion(request, 'usuarios', {'q': request.GET.get('q', '').strip()})